@@ -0,0 +1,160 @@
+"""Parse results shared across projects, keyed by file content."""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ai_code_compass.models import FileInfo, Reference, Symbol, SymbolType
+
+
+# Bump when parser output (or what the index saves of it) changes, so stale
+# parses are not reused and indexes saved before are re-parsed
+PARSE_VERSION = 2
+
+
+def default_blob_store_path() -> Path:
+    """Get the shared store location (~/.code-compass/blobs.db)."""
+    return Path.home() / ".code-compass" / "blobs.db"
+
+
+class BlobStore:
+    """
+    Content-addressed store of parsed files.
+    
+    Entries hold everything the parser derives from a file's bytes (symbols,
+    imports and, once some project asked for them, references), keyed by the
+    content hash and PARSE_VERSION, so identical files in other worktrees,
+    moved checkouts or vendored copies are parsed once per machine. Paths
+    are not stored; they are filled in on lookup.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Open (or create) a store.
+        
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Readers in worker processes and other projects' writers share the file
+        self.conn = sqlite3.connect(str(self.path), timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                symbols TEXT NOT NULL,
+                imports TEXT NOT NULL,
+                refs TEXT,
+                PRIMARY KEY (hash, version)
+            ) WITHOUT ROWID
+        """)
+        # References were added after the first release (NULL = not extracted)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(blobs)")}
+        if "refs" not in columns:
+            self.conn.execute("ALTER TABLE blobs ADD COLUMN refs TEXT")
+        self.conn.commit()
+    
+    def get(self, file_hash: str, path: str, refs: bool = False) -> Optional[FileInfo]:
+        """
+        Look up a parse by content hash.
+        
+        Args:
+            file_hash: Content hash of the file
+            path: Project-relative path to put into the result
+            refs: Also return the references (entries stored without them
+                count as missing)
+        
+        Returns:
+            FileInfo for path, or None if the content was never parsed
+        """
+        row = self.conn.execute(
+            "SELECT language, size, symbols, imports, refs FROM blobs WHERE hash = ? AND version = ?",
+            (file_hash, PARSE_VERSION)
+        ).fetchone()
+        if row is None or (refs and row[4] is None):
+            return None
+        
+        language, size, symbols, imports, stored_refs = row
+        return FileInfo(
+            path=path,
+            language=language,
+            hash=file_hash,
+            size=size,
+            symbols=[
+                Symbol(
+                    name=name,
+                    type=SymbolType(symbol_type),
+                    file_path=path,
+                    line_start=line_start,
+                    line_end=line_end,
+                    signature=signature,
+                    parent=parent,
+                    content_hash=content_hash
+                )
+                for name, symbol_type, line_start, line_end, signature, parent, content_hash
+                in json.loads(symbols)
+            ],
+            imports=json.loads(imports),
+            refs=[
+                Reference(name=name, file_path=path, line=line, expression=expression)
+                for name, line, expression in json.loads(stored_refs)
+            ] if refs else None
+        )
+    
+    def put_many(self, file_infos: Iterable[FileInfo]):
+        """
+        Store parses in one transaction.
+        
+        Existing entries are kept, except that references are added to
+        entries stored without them.
+        """
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO blobs (hash, version, language, size, symbols, imports, refs)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash, version) DO UPDATE SET refs = excluded.refs
+                WHERE blobs.refs IS NULL AND excluded.refs IS NOT NULL
+            """, [
+                (
+                    file_info.hash,
+                    PARSE_VERSION,
+                    file_info.language,
+                    file_info.size,
+                    json.dumps([
+                        [
+                            s.name, s.type.value, s.line_start, s.line_end,
+                            s.signature, s.parent, s.content_hash
+                        ]
+                        for s in file_info.symbols
+                    ]),
+                    json.dumps(file_info.imports),
+                    json.dumps([
+                        [r.name, r.line, r.expression] for r in file_info.refs
+                    ]) if file_info.refs is not None else None
+                )
+                for file_info in file_infos
+            ])
+    
+    def count(self) -> int:
+        """Number of stored parses (all versions)."""
+        return self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
@@ -1,11 +1,59 @@
 """SQLite-based caching layer for parsed code."""
 
+import heapq
 import json
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from .models import FileInfo, Symbol, SymbolType
+from .blobstore import PARSE_VERSION
+from .models import FileInfo, FileState, Reference, Symbol, SymbolType
+
+
+# RETURNING needs SQLite 3.35+; older versions look the id up separately
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Longest symbol name fully covered by the fallback trigram index
+MAX_TRIGRAM_POSITIONS = 1000
+
+# Match quality tiers for fuzzy symbol search (lower is better)
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_WORD_BOUNDARY = 2
+MATCH_SUBSTRING = 3
+
+_UPSERT_FILE_SQL = """
+    INSERT INTO files (
+        path, language, hash, size, imports, import_count, mtime_ns, stat_size, inode, generation, blob_id,
+        rpath
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        language = excluded.language,
+        hash = excluded.hash,
+        size = excluded.size,
+        imports = excluded.imports,
+        import_count = excluded.import_count,
+        indexed_at = CURRENT_TIMESTAMP,
+        mtime_ns = excluded.mtime_ns,
+        stat_size = excluded.stat_size,
+        inode = excluded.inode,
+        generation = excluded.generation,
+        blob_id = excluded.blob_id
+"""
+
+# Files joined with their symbols in source order, one row per symbol
+# (or per symbol-less file)
+_FILE_ROWS_SQL = """
+    SELECT f.id as file_id, f.path as file_path, f.language, f.hash, f.size, f.imports,
+           s.id as symbol_id, s.name, s.type, s.line_start, s.line_end, s.signature, s.parent,
+           s.content_hash
+    FROM files f
+    LEFT JOIN symbols s ON s.file_id = f.id
+    {where}
+    ORDER BY f.path, s.line_start
+"""
 
 
 class CacheManager:
@@ -22,6 +70,9 @@ class CacheManager:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.db_path = cache_dir / "index.db"
         self.conn: Optional[sqlite3.Connection] = None
+        self._batch_depth = 0
+        # Generation written by the current transaction (None = not advanced yet)
+        self._write_generation: Optional[int] = None
         self._init_db()
     
     def _init_db(self):
@@ -48,10 +99,34 @@ class CacheManager:
                 hash TEXT NOT NULL,
                 size INTEGER NOT NULL,
                 imports TEXT NOT NULL,
-                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                mtime_ns INTEGER,
+                stat_size INTEGER,
+                inode INTEGER,
+                generation INTEGER,
+                blob_id TEXT,
+                import_count INTEGER,
+                rpath TEXT
             )
         """)
         
+        # Stat, generation, blob, count and reversed path columns were added
+        # after the first release
+        self._ensure_columns("files", {
+            "mtime_ns": "INTEGER",
+            "stat_size": "INTEGER",
+            "inode": "INTEGER",
+            "generation": "INTEGER",
+            "blob_id": "TEXT",
+            "import_count": "INTEGER",
+            "rpath": "TEXT",
+        })
+        cursor.execute("SELECT id, path FROM files WHERE rpath IS NULL")
+        cursor.executemany(
+            "UPDATE files SET rpath = ? WHERE id = ?",
+            [(row['path'][::-1], row['id']) for row in cursor.fetchall()]
+        )
+        
         # Symbols table with full-text search
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS symbols (
@@ -63,10 +138,18 @@ class CacheManager:
                 line_end INTEGER NOT NULL,
                 signature TEXT NOT NULL,
                 parent TEXT,
+                content_hash TEXT,
+                generation INTEGER,
                 FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
             )
         """)
         
+        # Per-symbol change tracking was added after the first release
+        self._ensure_columns("symbols", {
+            "content_hash": "TEXT",
+            "generation": "INTEGER",
+        })
+        
         # Create indexes for fast lookup
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_symbols_name 
@@ -83,8 +166,242 @@ class CacheManager:
             ON files(path)
         """)
         
+        # Paths by suffix (a range scan on the reversed path)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_files_rpath
+            ON files(rpath)
+        """)
+        
+        # Files written after a generation
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_files_generation
+            ON files(generation)
+        """)
+        
+        # Symbols of a file in source order (bulk loading without a sort)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_symbols_file_line
+            ON symbols(file_id, line_start)
+        """)
+        
+        # Symbols written after a generation
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_symbols_generation
+            ON symbols(generation)
+        """)
+        
+        self.search_backend = self._init_search_index(cursor)
+        
+        # Index generation counters
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO meta (key, value)
+            VALUES ('generation', 0), ('graph_generation', -1), ('refs', 0)
+        """)
+        # Files saved before the version was recorded count as version 0
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM files) as saved")
+        cursor.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('parse_version', ?)",
+            (0 if cursor.fetchone()['saved'] else PARSE_VERSION,)
+        )
+        
+        # Resolved dependency graph and importance scores
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS edges (
+                src TEXT NOT NULL,
+                dst TEXT NOT NULL,
+                PRIMARY KEY (src, dst)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_edges_dst
+            ON edges(dst)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                path TEXT PRIMARY KEY,
+                score REAL NOT NULL
+            )
+        """)
+        
+        # Files deleted since the stored graph was computed
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS removed_files (
+                path TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            )
+        """)
+        
+        # Last deletion of each symbol ('' parent for top-level symbols)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS removed_symbols (
+                file_path TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                name TEXT NOT NULL,
+                type TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                PRIMARY KEY (file_path, parent, name, type)
+            )
+        """)
+        
+        # Names each file imports with `from ... import name`
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS imported_names (
+                file_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_imported_names_name
+            ON imported_names(name, file_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_imported_names_file
+            ON imported_names(file_id)
+        """)
+        
+        # Name and attribute references (filled only with references enabled)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS refs (
+                file_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                expression TEXT NOT NULL,
+                FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_refs_name
+            ON refs(name, file_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_refs_file
+            ON refs(file_id)
+        """)
+        
         self.conn.commit()
     
+    def _init_search_index(self, cursor: sqlite3.Cursor) -> str:
+        """
+        Create the substring index used by search_symbols.
+        
+        Uses an FTS5 trigram table when SQLite supports it, otherwise a plain
+        trigram table. Both are kept in sync with symbols by triggers.
+        
+        Returns:
+            'fts5' or 'trigram'
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row['name'] for row in cursor.fetchall()}
+        
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+                    name, content='symbols', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # No FTS5 or no trigram tokenizer (SQLite < 3.34)
+            cursor.execute("DROP TRIGGER IF EXISTS symbols_fts_insert")
+            cursor.execute("DROP TRIGGER IF EXISTS symbols_fts_delete")
+            cursor.execute("DROP TRIGGER IF EXISTS symbols_fts_update")
+            self._init_trigram_table(cursor, triggers)
+            return 'trigram'
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbols_fts_insert AFTER INSERT ON symbols BEGIN
+                INSERT INTO symbols_fts(rowid, name) VALUES (new.id, new.name);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbols_fts_delete AFTER DELETE ON symbols BEGIN
+                INSERT INTO symbols_fts(symbols_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbols_fts_update AFTER UPDATE OF name ON symbols BEGIN
+                INSERT INTO symbols_fts(symbols_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO symbols_fts(rowid, name) VALUES (new.id, new.name);
+            END
+        """)
+        
+        if "symbols_fts_insert" not in triggers:
+            # New table, or triggers were dropped by a build without FTS5
+            cursor.execute("INSERT INTO symbols_fts(symbols_fts) VALUES ('rebuild')")
+        return 'fts5'
+    
+    def _init_trigram_table(self, cursor: sqlite3.Cursor, triggers: set[str]):
+        """Create the fallback trigram table and its triggers."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symbol_trigrams (
+                trigram TEXT NOT NULL,
+                symbol_id INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_symbol_trigrams
+            ON symbol_trigrams(trigram, symbol_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_symbol_trigrams_symbol
+            ON symbol_trigrams(symbol_id)
+        """)
+        
+        # Triggers cannot use recursive CTEs, so trigram offsets come from a table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS trigram_positions (n INTEGER PRIMARY KEY)
+        """)
+        cursor.execute("SELECT COUNT(*) FROM trigram_positions")
+        if cursor.fetchone()[0] < MAX_TRIGRAM_POSITIONS:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO trigram_positions (n) VALUES (?)",
+                [(n,) for n in range(1, MAX_TRIGRAM_POSITIONS + 1)]
+            )
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbol_trigrams_insert AFTER INSERT ON symbols BEGIN
+                INSERT INTO symbol_trigrams (trigram, symbol_id)
+                SELECT DISTINCT substr(lower(new.name), n, 3), new.id
+                FROM trigram_positions WHERE n <= length(new.name) - 2;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbol_trigrams_delete AFTER DELETE ON symbols BEGIN
+                DELETE FROM symbol_trigrams WHERE symbol_id = old.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS symbol_trigrams_update AFTER UPDATE OF name ON symbols BEGIN
+                DELETE FROM symbol_trigrams WHERE symbol_id = old.id;
+                INSERT INTO symbol_trigrams (trigram, symbol_id)
+                SELECT DISTINCT substr(lower(new.name), n, 3), new.id
+                FROM trigram_positions WHERE n <= length(new.name) - 2;
+            END
+        """)
+        
+        if "symbol_trigrams_insert" not in triggers:
+            cursor.execute("DELETE FROM symbol_trigrams")
+            cursor.execute("""
+                INSERT INTO symbol_trigrams (trigram, symbol_id)
+                SELECT DISTINCT substr(lower(s.name), p.n, 3), s.id
+                FROM symbols s JOIN trigram_positions p ON p.n <= length(s.name) - 2
+            """)
+    
+    def _ensure_columns(self, table: str, columns: dict[str, str]):
+        """Add columns missing from a table created by an older version."""
+        cursor = self.conn.cursor()
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row['name'] for row in cursor.fetchall()}
+        for name, decl in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    
     def get_file_hash(self, file_path: str) -> Optional[str]:
         """Get cached hash for a file."""
         cursor = self.conn.cursor()
@@ -95,69 +412,556 @@ class CacheManager:
         row = cursor.fetchone()
         return row['hash'] if row else None
     
+    def get_imports(self, paths: Optional[Iterable[str]] = None) -> dict[str, list[dict]]:
+        """
+        Get file imports without loading symbols.
+        
+        Args:
+            paths: Files to load (default: every file)
+        """
+        cursor = self.conn.cursor()
+        if paths is None:
+            cursor.execute("SELECT path, imports FROM files ORDER BY path")
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            paths = list(paths)
+            # Stay below SQLite's bound parameter limit
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT path, imports FROM files WHERE path IN ({placeholders})",
+                    chunk
+                )
+                rows.extend(cursor.fetchall())
+            rows.sort(key=lambda row: row['path'])
+        return {row['path']: json.loads(row['imports']) for row in rows}
+    
+    def get_file_states(self, paths: Optional[Iterable[str]] = None) -> dict[str, FileState]:
+        """
+        Get hash, stat metadata and counts of files in a single query.
+        
+        Args:
+            paths: Files to look up (default: every file); unknown paths are skipped
+        """
+        query = """
+            SELECT f.path, f.hash, f.mtime_ns, f.stat_size, f.inode, f.import_count, f.blob_id,
+                   (SELECT COUNT(*) FROM symbols s WHERE s.file_id = f.id) as symbol_count,
+                   -- Rows saved before import_count existed
+                   CASE WHEN f.import_count IS NULL THEN f.imports END as imports
+            FROM files f
+        """
+        cursor = self.conn.cursor()
+        if paths is None:
+            cursor.execute(query)
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            paths = list(paths)
+            # Stay below SQLite's bound parameter limit
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(query + f" WHERE f.path IN ({placeholders})", chunk)
+                rows.extend(cursor.fetchall())
+        
+        return {
+            row['path']: FileState(
+                hash=row['hash'],
+                mtime_ns=row['mtime_ns'],
+                size=row['stat_size'],
+                inode=row['inode'],
+                symbol_count=row['symbol_count'],
+                import_count=(
+                    row['import_count'] if row['import_count'] is not None
+                    else len(json.loads(row['imports']))
+                ),
+                blob_id=row['blob_id']
+            )
+            for row in rows
+        }
+    
+    def find_module_files(self, modules: Iterable[str]) -> list[str]:
+        """
+        Get the files defining dotted modules, or modules ending with them.
+        
+        'a.b' matches a/b.py, a/b/__init__.py and any x/.../a/b.py or
+        x/.../a/b/__init__.py, each looked up with an index range scan.
+        
+        Returns:
+            Matching paths in sorted order
+        """
+        cursor = self.conn.cursor()
+        found = set()
+        forms = set()
+        for module in modules:
+            if not module:
+                # The root package has no suffix matches
+                cursor.execute("SELECT path FROM files WHERE path = '__init__.py'")
+                found.update(row['path'] for row in cursor.fetchall())
+                continue
+            base = module.replace(".", "/")
+            forms.update((base + ".py", base + "/__init__.py"))
+        
+        for form in forms:
+            cursor.execute("SELECT path FROM files WHERE path = ?", (form,))
+            found.update(row['path'] for row in cursor.fetchall())
+            suffix = ("/" + form)[::-1]
+            upper = suffix[:-1] + chr(ord(suffix[-1]) + 1)
+            cursor.execute("SELECT path FROM files WHERE rpath >= ? AND rpath < ?", (suffix, upper))
+            found.update(row['path'] for row in cursor.fetchall())
+        return sorted(found)
+    
+    def list_paths(self, prefix: str = "") -> list[str]:
+        """
+        Get cached file paths in sorted order.
+        
+        Args:
+            prefix: Only paths starting with this string (e.g. 'src/'),
+                answered by a range scan on the path index
+        """
+        cursor = self.conn.cursor()
+        if not prefix:
+            cursor.execute("SELECT path FROM files ORDER BY path")
+        else:
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            cursor.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ? ORDER BY path",
+                (prefix, upper)
+            )
+        return [row['path'] for row in cursor.fetchall()]
+    
+    def update_file_stat(self, file_path: str, stat_key: Optional[tuple], blob_id: Optional[str] = None):
+        """
+        Record fresh stat metadata for a file whose content is unchanged.
+        
+        Args:
+            file_path: Path of the file
+            stat_key: (mtime_ns, size, inode) of the file on disk, or None
+            blob_id: Git blob id of the content (default: keep the stored one)
+        """
+        mtime_ns, size, inode = stat_key or (None, None, None)
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE files SET mtime_ns = ?, stat_size = ?, inode = ?, blob_id = COALESCE(?, blob_id)
+            WHERE path = ?
+        """, (mtime_ns, size, inode, blob_id, file_path))
+        self._commit()
+    
     def is_file_cached(self, file_path: str, current_hash: str) -> bool:
         """Check if file is cached and unchanged."""
         cached_hash = self.get_file_hash(file_path)
         return cached_hash == current_hash if cached_hash else False
     
-    def save_file(self, file_info: FileInfo):
-        """Save or update file information in cache."""
+    @contextmanager
+    def batch(self):
+        """
+        Group writes into a single transaction.
+        
+        Commits once when the outermost batch exits and rolls back if it
+        raises. Batches may be nested.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.rollback()
+                self._write_generation = None
+            raise
+        self._batch_depth -= 1
+        self._commit()
+    
+    def _commit(self):
+        """Commit unless inside a batch."""
+        if self._batch_depth == 0:
+            self.conn.commit()
+            self._write_generation = None
+    
+    def _bump_generation(self, cursor: sqlite3.Cursor) -> int:
+        """
+        Advance the index generation once per write transaction.
+        
+        Returns:
+            The generation written by the current transaction
+        """
+        if self._write_generation is None:
+            cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            cursor.execute("SELECT value FROM meta WHERE key = 'generation'")
+            self._write_generation = cursor.fetchone()[0]
+        return self._write_generation
+    
+    def _get_meta(self, key: str) -> int:
+        """Read a counter from the meta table."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        return cursor.fetchone()['value']
+    
+    def get_generation(self) -> int:
+        """
+        Get the index generation.
+        
+        The generation advances whenever files or symbols change (once per
+        transaction), so derived data stamped with it can detect staleness.
+        """
+        return self._get_meta('generation')
+    
+    def refs_enabled(self) -> bool:
+        """Check whether files are saved with their references."""
+        return bool(self._get_meta('refs'))
+    
+    def set_refs_enabled(self, enabled: bool):
+        """
+        Turn reference extraction on or off for this index.
+        
+        Turning it off drops the stored references. Turning it on does not
+        fill them in: call it once every file was saved with references.
+        Symbol rankings change either way, so the generation advances.
+        """
+        cursor = self.conn.cursor()
+        self._bump_generation(cursor)
+        cursor.execute("UPDATE meta SET value = ? WHERE key = 'refs'", (int(enabled),))
+        if not enabled:
+            cursor.execute("DELETE FROM refs")
+        self._commit()
+    
+    def get_parse_version(self) -> int:
+        """Get the PARSE_VERSION every file of the index was saved with (0 = unknown)."""
+        return self._get_meta('parse_version')
+    
+    def set_parse_version(self, version: int):
+        """Record that every file was saved by a given PARSE_VERSION."""
         cursor = self.conn.cursor()
+        cursor.execute("UPDATE meta SET value = ? WHERE key = 'parse_version'", (version,))
+        self._commit()
+    
+    def get_graph_generation(self) -> int:
+        """Get the generation the stored edges and scores were computed for (-1 = never)."""
+        return self._get_meta('graph_generation')
+    
+    def save_graph(self, edges: Iterable[tuple[str, str]], scores: dict[str, float], generation: int):
+        """
+        Replace the stored dependency edges and importance scores.
         
-        # Check if file exists
+        Args:
+            edges: Resolved (importing file, imported file) pairs
+            scores: Importance score per file
+            generation: Index generation the graph was computed from
+        """
+        cursor = self.conn.cursor()
+        with self.batch():
+            cursor.execute("DELETE FROM edges")
+            cursor.executemany("INSERT INTO edges (src, dst) VALUES (?, ?)", edges)
+            cursor.execute("DELETE FROM scores")
+            cursor.executemany("INSERT INTO scores (path, score) VALUES (?, ?)", scores.items())
+            self._set_graph_generation(cursor, generation)
+    
+    def update_graph(
+        self,
+        added_edges: Iterable[tuple[str, str]],
+        removed_edges: Iterable[tuple[str, str]],
+        scores: Optional[dict[str, float]],
+        generation: int
+    ):
+        """
+        Apply an edge delta to the stored graph and replace the scores.
+        
+        Args:
+            added_edges: Edges to insert
+            removed_edges: Edges to delete
+            scores: Importance score per file (files missing from it are
+                dropped), or None to keep the stored scores
+            generation: Index generation the graph was computed from
+        """
+        cursor = self.conn.cursor()
+        with self.batch():
+            cursor.executemany("DELETE FROM edges WHERE src = ? AND dst = ?", removed_edges)
+            cursor.executemany("INSERT OR IGNORE INTO edges (src, dst) VALUES (?, ?)", added_edges)
+            if scores is not None:
+                cursor.execute("SELECT path FROM scores")
+                stale = [(row['path'],) for row in cursor.fetchall() if row['path'] not in scores]
+                cursor.executemany("DELETE FROM scores WHERE path = ?", stale)
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO scores (path, score) VALUES (?, ?)",
+                    scores.items()
+                )
+            self._set_graph_generation(cursor, generation)
+    
+    def _set_graph_generation(self, cursor: sqlite3.Cursor, generation: int):
+        """Stamp the stored graph and forget tombstones it already reflects."""
         cursor.execute(
-            "SELECT id FROM files WHERE path = ?",
-            (file_info.path,)
+            "UPDATE meta SET value = ? WHERE key = 'graph_generation'",
+            (generation,)
         )
-        existing = cursor.fetchone()
+        cursor.execute("DELETE FROM removed_files WHERE generation <= ?", (generation,))
+    
+    def get_changes_since(self, generation: int) -> tuple[list[str], list[str]]:
+        """
+        Get files written or deleted after a generation.
         
-        if existing:
-            # Update existing file
-            file_id = existing['id']
-            cursor.execute("""
-                UPDATE files 
-                SET hash = ?, size = ?, language = ?, imports = ?, indexed_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                file_info.hash,
-                file_info.size,
-                file_info.language,
-                json.dumps(file_info.imports),
-                file_id
-            ))
-            
-            # Delete old symbols
-            cursor.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+        Returns:
+            (changed paths, removed paths); a path deleted and then re-added
+            is reported as changed only
+        """
+        cursor = self.conn.cursor()
+        # Two lookups so both can use idx_files_generation
+        cursor.execute("SELECT path FROM files WHERE generation > ?", (generation,))
+        changed = [row['path'] for row in cursor.fetchall()]
+        cursor.execute("SELECT path FROM files WHERE generation IS NULL")
+        changed.extend(row['path'] for row in cursor.fetchall())
+        changed.sort()
+        
+        cursor.execute("""
+            SELECT path FROM removed_files
+            WHERE generation > ? AND path NOT IN (SELECT path FROM files)
+            ORDER BY path
+        """, (generation,))
+        removed = [row['path'] for row in cursor.fetchall()]
+        return changed, removed
+    
+    def get_symbol_changes_since(
+        self,
+        generation: int
+    ) -> tuple[list[Symbol], list[tuple[str, Optional[str], str, SymbolType]]]:
+        """
+        Get symbols added, changed or removed after a generation.
+        
+        Only symbols whose signature or source changed count as changed;
+        symbols that merely moved keep their generation.
+        
+        Returns:
+            (changed symbols in file and line order, removed symbols as
+            (file_path, parent, name, type) tuples that no longer exist)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT s.*, f.path as file_path
+            FROM symbols s
+            JOIN files f ON s.file_id = f.id
+            WHERE s.generation > ?
+            ORDER BY f.path, s.line_start
+        """, (generation,))
+        changed = [_row_to_symbol(row, row['file_path']) for row in cursor.fetchall()]
+        
+        cursor.execute("""
+            SELECT r.file_path, r.parent, r.name, r.type
+            FROM removed_symbols r
+            WHERE r.generation > ? AND NOT EXISTS (
+                SELECT 1 FROM symbols s JOIN files f ON s.file_id = f.id
+                WHERE f.path = r.file_path AND s.name = r.name AND s.type = r.type
+                    AND COALESCE(s.parent, '') = r.parent
+            )
+            ORDER BY r.file_path, r.parent, r.name
+        """, (generation,))
+        removed = [
+            (row['file_path'], row['parent'] or None, row['name'], SymbolType(row['type']))
+            for row in cursor.fetchall()
+        ]
+        return changed, removed
+    
+    def get_edges(self, sources: Optional[Iterable[str]] = None) -> list[tuple[str, str]]:
+        """
+        Get stored dependency edges as (src, dst) pairs.
+        
+        Args:
+            sources: Only edges leaving these files (default: all edges)
+        """
+        cursor = self.conn.cursor()
+        if sources is None:
+            cursor.execute("SELECT src, dst FROM edges")
+            return [(row['src'], row['dst']) for row in cursor.fetchall()]
+        
+        edges = []
+        sources = list(sources)
+        # Stay below SQLite's bound parameter limit
+        for i in range(0, len(sources), 500):
+            chunk = sources[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT src, dst FROM edges WHERE src IN ({placeholders})", chunk)
+            edges.extend((row['src'], row['dst']) for row in cursor.fetchall())
+        return edges
+    
+    def get_scores(self, paths: Optional[Iterable[str]] = None) -> dict[str, float]:
+        """
+        Get stored importance scores.
+        
+        Args:
+            paths: Files to look up (default: every file); unscored paths are skipped
+        """
+        cursor = self.conn.cursor()
+        if paths is None:
+            cursor.execute("SELECT path, score FROM scores ORDER BY path")
+            return {row['path']: row['score'] for row in cursor.fetchall()}
+        
+        scores = {}
+        paths = list(paths)
+        # Stay below SQLite's bound parameter limit
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT path, score FROM scores WHERE path IN ({placeholders})", chunk)
+            scores.update((row['path'], row['score']) for row in cursor.fetchall())
+        return scores
+    
+    def save_file(
+        self,
+        file_info: FileInfo,
+        stat_key: Optional[tuple] = None,
+        blob_id: Optional[str] = None
+    ):
+        """
+        Save or update file information in cache.
+        
+        Args:
+            file_info: Parsed file information
+            stat_key: Optional (mtime_ns, size, inode) of the file on disk
+            blob_id: Optional git blob id of the parsed content
+        """
+        self._write_file(self.conn.cursor(), file_info, stat_key, blob_id)
+        self._commit()
+    
+    def save_files(self, file_infos: Iterable[FileInfo], batch_size: int = 1000) -> int:
+        """
+        Save many files, committing once per batch_size files.
+        
+        Returns:
+            Number of files saved
+        """
+        cursor = self.conn.cursor()
+        count = 0
+        with self.batch():
+            for file_info in file_infos:
+                self._write_file(cursor, file_info, None)
+                count += 1
+                if count % batch_size == 0 and self._batch_depth == 1:
+                    self.conn.commit()
+                    self._write_generation = None
+        return count
+    
+    def _write_file(
+        self,
+        cursor: sqlite3.Cursor,
+        file_info: FileInfo,
+        stat_key: Optional[tuple],
+        blob_id: Optional[str] = None
+    ):
+        """Upsert the files row and replace its symbols (no commit)."""
+        generation = self._bump_generation(cursor)
+        mtime_ns, stat_size, inode = stat_key or (None, None, None)
+        params = (
+            file_info.path,
+            file_info.language,
+            file_info.hash,
+            file_info.size,
+            json.dumps(file_info.imports),
+            len(file_info.imports),
+            mtime_ns,
+            stat_size,
+            inode,
+            generation,
+            blob_id,
+            file_info.path[::-1]
+        )
+        
+        if _HAS_RETURNING:
+            cursor.execute(_UPSERT_FILE_SQL + " RETURNING id", params)
+            file_id = cursor.fetchone()[0]
         else:
-            # Insert new file
-            cursor.execute("""
-                INSERT INTO files (path, language, hash, size, imports)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                file_info.path,
-                file_info.language,
-                file_info.hash,
-                file_info.size,
-                json.dumps(file_info.imports)
-            ))
-            file_id = cursor.lastrowid
-        
-        # Insert symbols
+            cursor.execute(_UPSERT_FILE_SQL, params)
+            cursor.execute("SELECT id FROM files WHERE path = ?", (file_info.path,))
+            file_id = cursor.fetchone()[0]
+        
+        self._write_symbols(cursor, file_id, file_info, generation)
+        
+        cursor.execute("DELETE FROM imported_names WHERE file_id = ?", (file_id,))
+        imported = {
+            name
+            for imp in file_info.imports if isinstance(imp, dict)
+            for name in imp.get('names', ())
+        }
+        cursor.executemany(
+            "INSERT INTO imported_names (file_id, name) VALUES (?, ?)",
+            [(file_id, name) for name in sorted(imported)]
+        )
+        
+        # References belong to the old content either way
+        cursor.execute("DELETE FROM refs WHERE file_id = ?", (file_id,))
+        if file_info.refs:
+            cursor.executemany(
+                "INSERT INTO refs (file_id, name, line, expression) VALUES (?, ?, ?, ?)",
+                [(file_id, ref.name, ref.line, ref.expression) for ref in file_info.refs]
+            )
+    
+    def _write_symbols(self, cursor: sqlite3.Cursor, file_id: int, file_info: FileInfo, generation: int):
+        """
+        Apply only the symbol inserts, updates and deletes a save needs.
+        
+        Stored symbols are matched to the new ones by (type, parent, name) in
+        source order. Matches with the same content hash and signature keep
+        their row and generation (moved ones only get new line numbers);
+        other matches are updated in place and stamped with the generation.
+        """
+        cursor.execute("""
+            SELECT id, name, type, parent, line_start, line_end, signature, content_hash
+            FROM symbols WHERE file_id = ? ORDER BY line_start
+        """, (file_id,))
+        stored: dict[tuple, list[sqlite3.Row]] = {}
+        for row in cursor.fetchall():
+            stored.setdefault((row['type'], row['parent'], row['name']), []).append(row)
+        
+        inserts = []
+        updates = []
+        moves = []
         for symbol in file_info.symbols:
-            cursor.execute("""
-                INSERT INTO symbols (file_id, name, type, line_start, line_end, signature, parent)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                file_id,
-                symbol.name,
-                symbol.type.value,
-                symbol.line_start,
-                symbol.line_end,
-                symbol.signature,
-                symbol.parent
-            ))
+            matches = stored.get((symbol.type.value, symbol.parent, symbol.name))
+            if not matches:
+                inserts.append((
+                    file_id,
+                    symbol.name,
+                    symbol.type.value,
+                    symbol.line_start,
+                    symbol.line_end,
+                    symbol.signature,
+                    symbol.parent,
+                    symbol.content_hash,
+                    generation
+                ))
+                continue
+            row = matches.pop(0)
+            if row['content_hash'] != symbol.content_hash or row['signature'] != symbol.signature:
+                updates.append((
+                    symbol.line_start,
+                    symbol.line_end,
+                    symbol.signature,
+                    symbol.content_hash,
+                    generation,
+                    row['id']
+                ))
+            elif (row['line_start'], row['line_end']) != (symbol.line_start, symbol.line_end):
+                moves.append((symbol.line_start, symbol.line_end, row['id']))
         
-        self.conn.commit()
+        deleted = [row for rows in stored.values() for row in rows]
+        if deleted:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO removed_symbols (file_path, parent, name, type, generation)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (file_info.path, row['parent'] or "", row['name'], row['type'], generation)
+                for row in deleted
+            ])
+            cursor.executemany("DELETE FROM symbols WHERE id = ?", [(row['id'],) for row in deleted])
+        cursor.executemany("""
+            UPDATE symbols SET line_start = ?, line_end = ?, signature = ?, content_hash = ?, generation = ?
+            WHERE id = ?
+        """, updates)
+        cursor.executemany("UPDATE symbols SET line_start = ?, line_end = ? WHERE id = ?", moves)
+        cursor.executemany("""
+            INSERT INTO symbols
+                (file_id, name, type, line_start, line_end, signature, parent, content_hash, generation)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, inserts)
     
     def get_file(self, file_path: str) -> Optional[FileInfo]:
         """Retrieve file information from cache."""
@@ -180,18 +984,7 @@ class CacheManager:
         )
         symbol_rows = cursor.fetchall()
         
-        symbols = [
-            Symbol(
-                name=row['name'],
-                type=SymbolType(row['type']),
-                file_path=file_path,
-                line_start=row['line_start'],
-                line_end=row['line_end'],
-                signature=row['signature'],
-                parent=row['parent']
-            )
-            for row in symbol_rows
-        ]
+        symbols = [_row_to_symbol(row, file_path) for row in symbol_rows]
         
         return FileInfo(
             path=file_row['path'],
@@ -204,11 +997,102 @@ class CacheManager:
     
     def get_all_files(self) -> list[FileInfo]:
         """Retrieve all cached files."""
+        return list(self.iter_files())
+    
+    def iter_files(self) -> Iterator[FileInfo]:
+        """
+        Stream all cached files, ordered by path.
+        
+        Files and their symbols are loaded with a single ordered join and
+        built in one pass, so only one FileInfo is held at a time.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(_FILE_ROWS_SQL.format(where=""))
+        yield from _group_file_rows(cursor)
+    
+    def get_files(
+        self,
+        paths: Iterable[str],
+        max_symbols_per_file: Optional[int] = None
+    ) -> dict[str, FileInfo]:
+        """
+        Retrieve several files with their symbols.
+        
+        Args:
+            paths: Files to load (unknown paths are skipped)
+            max_symbols_per_file: Keep only the N best symbols of each file
+                (see rank_symbols), in source order
+        
+        Returns:
+            Mapping of path to FileInfo
+        """
+        cursor = self.conn.cursor()
+        files = {}
+        paths = list(paths)
+        # Stay below SQLite's bound parameter limit
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(_FILE_ROWS_SQL.format(where=f"WHERE f.path IN ({placeholders})"), chunk)
+            for file_info in _group_file_rows(cursor):
+                files[file_info.path] = file_info
+        
+        if max_symbols_per_file is not None:
+            capped = [f for f in files.values() if len(f.symbols) > max_symbols_per_file]
+            uses = self.get_name_uses(capped)
+            for file_info in capped:
+                top = rank_symbols(file_info.symbols, uses.get(file_info.path, {}))[:max_symbols_per_file]
+                file_info.symbols = sorted(top, key=lambda s: s.line_start)
+        return files
+    
+    def get_name_uses(self, file_infos: Iterable[FileInfo]) -> dict[str, dict[str, int]]:
+        """
+        Count how many other files use each symbol name of some files.
+        
+        Uses come from the references when they are enabled, else from
+        `from ... import name` statements.
+        
+        Returns:
+            Mapping of path to {symbol name: number of other files using it}
+        """
+        file_infos = list(file_infos)
+        names = sorted({symbol.name for f in file_infos for symbol in f.symbols})
+        table = "refs" if self.refs_enabled() else "imported_names"
         cursor = self.conn.cursor()
-        cursor.execute("SELECT path FROM files ORDER BY path")
-        paths = [row['path'] for row in cursor.fetchall()]
         
-        return [self.get_file(path) for path in paths]
+        totals = {}
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT name, COUNT(DISTINCT file_id) as count FROM {table}
+                WHERE name IN ({placeholders})
+                GROUP BY name
+            """, chunk)
+            totals.update((row['name'], row['count']) for row in cursor.fetchall())
+        
+        # Files using their own symbols do not count
+        own = set()
+        paths = [f.path for f in file_infos]
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT DISTINCT f.path, u.name
+                FROM files f
+                JOIN {table} u ON u.file_id = f.id
+                JOIN symbols s ON s.file_id = f.id AND s.name = u.name
+                WHERE f.path IN ({placeholders})
+            """, chunk)
+            own.update((row['path'], row['name']) for row in cursor.fetchall())
+        
+        return {
+            f.path: {
+                symbol.name: totals.get(symbol.name, 0) - ((f.path, symbol.name) in own)
+                for symbol in f.symbols
+            }
+            for f in file_infos
+        }
     
     def find_symbol(self, name: str) -> list[Symbol]:
         """Find all symbols with given name."""
@@ -222,49 +1106,142 @@ class CacheManager:
         """, (name,))
         
         rows = cursor.fetchall()
-        return [
-            Symbol(
-                name=row['name'],
-                type=SymbolType(row['type']),
-                file_path=row['file_path'],
-                line_start=row['line_start'],
-                line_end=row['line_end'],
-                signature=row['signature'],
-                parent=row['parent']
-            )
-            for row in rows
-        ]
+        return [_row_to_symbol(row, row['file_path']) for row in rows]
     
-    def search_symbols(self, pattern: str) -> list[Symbol]:
-        """Search symbols by name pattern (case-insensitive)."""
+    def find_refs(self, name: str) -> list[Reference]:
+        """Find all references to a name, by file and line."""
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT s.*, f.path as file_path
-            FROM symbols s
-            JOIN files f ON s.file_id = f.id
-            WHERE s.name LIKE ?
-            ORDER BY f.path, s.line_start
-        """, (f"%{pattern}%",))
-        
-        rows = cursor.fetchall()
+            SELECT r.name, r.line, r.expression, f.path as file_path
+            FROM refs r
+            JOIN files f ON r.file_id = f.id
+            WHERE r.name = ?
+            ORDER BY f.path, r.line
+        """, (name,))
         return [
-            Symbol(
+            Reference(
                 name=row['name'],
-                type=SymbolType(row['type']),
                 file_path=row['file_path'],
-                line_start=row['line_start'],
-                line_end=row['line_end'],
-                signature=row['signature'],
-                parent=row['parent']
+                line=row['line'],
+                expression=row['expression']
             )
-            for row in rows
+            for row in cursor.fetchall()
         ]
     
+    def search_symbols(self, pattern: str, limit: Optional[int] = None) -> list[Symbol]:
+        """
+        Search symbols by name substring (case-insensitive).
+        
+        Candidates come from the trigram index; results are ranked by match
+        quality: exact > prefix > word boundary (snake_case/camelCase) >
+        substring, then shorter names first.
+        
+        Args:
+            pattern: Substring to look for
+            limit: Maximum number of results (default: all)
+        """
+        if not pattern:
+            return []
+        
+        cursor = self.conn.cursor()
+        if len(pattern) < 3:
+            # Too short for trigrams: scan with an escaped LIKE
+            escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            cursor.execute("""
+                SELECT s.*, f.path as file_path
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE s.name LIKE ? ESCAPE '\\'
+            """, (f"%{escaped}%",))
+        elif self.search_backend == 'fts5':
+            cursor.execute("""
+                SELECT s.*, f.path as file_path
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE s.id IN (SELECT rowid FROM symbols_fts WHERE symbols_fts MATCH ?)
+            """, ('"' + pattern.replace('"', '""') + '"',))
+        else:
+            grams = sorted({pattern.lower()[i:i + 3] for i in range(len(pattern) - 2)})
+            placeholders = ", ".join("?" * len(grams))
+            cursor.execute(f"""
+                SELECT s.*, f.path as file_path
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE s.id IN (
+                    SELECT symbol_id FROM symbol_trigrams
+                    WHERE trigram IN ({placeholders})
+                    GROUP BY symbol_id
+                    HAVING COUNT(*) = ?
+                )
+            """, (*grams, len(grams)))
+        
+        # Trigram hits may not be contiguous; rank_match also verifies the substring
+        ranked = []
+        for row in cursor.fetchall():
+            rank = rank_match(row['name'], pattern)
+            if rank is not None:
+                key = (rank, len(row['name']), row['file_path'], row['line_start'])
+                ranked.append((key, row))
+        
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, ranked, key=lambda item: item[0])
+        else:
+            ranked.sort(key=lambda item: item[0])
+        
+        return [_row_to_symbol(row, row['file_path']) for _, row in ranked]
+    
     def delete_file(self, file_path: str):
-        """Remove file from cache."""
+        """Remove file and its symbols from cache."""
+        self.delete_files([file_path])
+    
+    def delete_files(self, file_paths: Iterable[str]) -> int:
+        """
+        Remove files, their symbols, imported names and references from
+        cache in one transaction.
+        
+        Dependent rows are deleted explicitly: foreign keys are not
+        enforced, so their ON DELETE CASCADE never fires.
+        
+        Returns:
+            Number of files that were cached
+        """
+        file_paths = list(file_paths)
+        if not file_paths:
+            return 0
+        
         cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM files WHERE path = ?", (file_path,))
-        self.conn.commit()
+        deleted = 0
+        with self.batch():
+            generation = self._bump_generation(cursor)
+            # Stay below SQLite's bound parameter limit
+            for i in range(0, len(file_paths), 500):
+                chunk = file_paths[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"""
+                    INSERT OR REPLACE INTO removed_symbols (file_path, parent, name, type, generation)
+                    SELECT f.path, COALESCE(s.parent, ''), s.name, s.type, ?
+                    FROM symbols s JOIN files f ON s.file_id = f.id
+                    WHERE f.path IN ({placeholders})
+                """, [generation, *chunk])
+                cursor.execute(f"""
+                    DELETE FROM symbols
+                    WHERE file_id IN (SELECT id FROM files WHERE path IN ({placeholders}))
+                """, chunk)
+                cursor.execute(f"""
+                    DELETE FROM imported_names
+                    WHERE file_id IN (SELECT id FROM files WHERE path IN ({placeholders}))
+                """, chunk)
+                cursor.execute(f"""
+                    DELETE FROM refs
+                    WHERE file_id IN (SELECT id FROM files WHERE path IN ({placeholders}))
+                """, chunk)
+                cursor.execute(f"""
+                    INSERT OR REPLACE INTO removed_files (path, generation)
+                    SELECT path, ? FROM files WHERE path IN ({placeholders})
+                """, [generation, *chunk])
+                cursor.execute(f"DELETE FROM files WHERE path IN ({placeholders})", chunk)
+                deleted += cursor.rowcount
+        return deleted
     
     def get_stats(self) -> dict:
         """Get cache statistics."""
@@ -300,9 +1277,17 @@ class CacheManager:
     def clear(self):
         """Clear all cache data."""
         cursor = self.conn.cursor()
+        self._bump_generation(cursor)
         cursor.execute("DELETE FROM symbols")
+        cursor.execute("DELETE FROM imported_names")
+        cursor.execute("DELETE FROM refs")
         cursor.execute("DELETE FROM files")
-        self.conn.commit()
+        cursor.execute("DELETE FROM edges")
+        cursor.execute("DELETE FROM scores")
+        cursor.execute("DELETE FROM removed_files")
+        cursor.execute("DELETE FROM removed_symbols")
+        cursor.execute("UPDATE meta SET value = -1 WHERE key = 'graph_generation'")
+        self._commit()
     
     def close(self):
         """Close database connection."""
@@ -317,3 +1302,104 @@ class CacheManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit."""
         self.close()
+
+
+def _group_file_rows(rows: Iterable[sqlite3.Row]) -> Iterator[FileInfo]:
+    """Build FileInfo objects from _FILE_ROWS_SQL rows ordered by file."""
+    current: Optional[FileInfo] = None
+    current_id = None
+    for row in rows:
+        if row['file_id'] != current_id:
+            if current is not None:
+                yield current
+            current_id = row['file_id']
+            current = FileInfo(
+                path=row['file_path'],
+                language=row['language'],
+                hash=row['hash'],
+                size=row['size'],
+                symbols=[],
+                imports=json.loads(row['imports'])
+            )
+        if row['symbol_id'] is not None:
+            current.symbols.append(_row_to_symbol(row, current.path))
+    
+    if current is not None:
+        yield current
+
+
+def _row_to_symbol(row: sqlite3.Row, file_path: str) -> Symbol:
+    """Build a Symbol from a symbols row."""
+    return Symbol(
+        name=row['name'],
+        type=SymbolType(row['type']),
+        file_path=file_path,
+        line_start=row['line_start'],
+        line_end=row['line_end'],
+        signature=row['signature'],
+        parent=row['parent'],
+        content_hash=row['content_hash']
+    )
+
+
+def rank_symbols(symbols: list[Symbol], uses: dict[str, int]) -> list[Symbol]:
+    """
+    Order a file's symbols from most to least worth showing.
+    
+    Symbols used by more other files come first. Methods rank with their
+    class (right after it), so a method is never kept without its class.
+    Ties go to public names (dunder methods count as public), then to
+    source order.
+    
+    Args:
+        symbols: Symbols of one file
+        uses: Number of other files using each name
+    """
+    def key(symbol: Symbol) -> tuple:
+        group = symbol.parent or symbol.name
+        private = symbol.name.startswith("_") and not (
+            symbol.name.startswith("__") and symbol.name.endswith("__")
+        )
+        return (
+            -uses.get(group, 0),
+            symbol.parent is not None,
+            -uses.get(symbol.name, 0),
+            private,
+            symbol.line_start
+        )
+    
+    return sorted(symbols, key=key)
+
+
+def rank_match(name: str, pattern: str) -> Optional[int]:
+    """
+    Classify how well a symbol name matches a search pattern.
+    
+    Returns:
+        MATCH_EXACT, MATCH_PREFIX, MATCH_WORD_BOUNDARY, MATCH_SUBSTRING,
+        or None if the pattern does not occur in the name (case-insensitive)
+    """
+    lowered = name.lower()
+    needle = pattern.lower()
+    if lowered == needle:
+        return MATCH_EXACT
+    if lowered.startswith(needle):
+        return MATCH_PREFIX
+    
+    start = lowered.find(needle)
+    if start == -1:
+        return None
+    
+    while start != -1:
+        prev, cur = name[start - 1], name[start]
+        following = name[start + 1] if start + 1 < len(name) else ""
+        if (
+            prev in "_." or
+            (cur.isupper() and not prev.isupper()) or
+            # Last capital of an acronym: HTTPServer -> Server
+            (cur.isupper() and prev.isupper() and following.islower())
+        ):
+            return MATCH_WORD_BOUNDARY
+        start = lowered.find(needle, start + 1)
+    
+    return MATCH_SUBSTRING
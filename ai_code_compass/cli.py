@@ -4,10 +4,22 @@ import sys
 import time
 import click
 from pathlib import Path
+from typing import Optional
+from ai_code_compass.blobstore import default_blob_store_path
+from ai_code_compass.git import changed_files
 from ai_code_compass.map_generator import MapGenerator
+from ai_code_compass.daemon import DaemonClient, IndexDaemon
 from ai_code_compass import __version__
 
 
+def _open_index(project_path: Path):
+    """Use the project's running daemon if there is one, else open the index."""
+    client = DaemonClient.for_project(project_path)
+    if client is not None:
+        return client
+    return MapGenerator(project_path)
+
+
 @click.group()
 @click.version_option(version=__version__, prog_name="code-compass")
 def cli():
@@ -18,9 +30,42 @@ def cli():
 @cli.command()
 @click.argument('path', type=click.Path(exists=True), default='.')
 @click.option('--force', is_flag=True, help='Force re-index all files')
+@click.option('--jobs', '-j', type=int, default=1, help='Parallel parse workers (0 = all CPU cores)')
+@click.option('--verify-hashes', is_flag=True, help='Hash every file even if its mtime/size/inode are unchanged')
+@click.option('--git', 'use_git', is_flag=True, help='List files and detect changes with git (clean files are not read)')
+@click.option('--shared-cache', is_flag=True,
+              help='Reuse parses of identical files from other projects (~/.code-compass/blobs.db)')
+@click.option('--files', 'files', type=click.File('r'), default=None,
+              help="Only re-index the paths listed in this file, one per line ('-' = stdin)")
+@click.option('--refs/--no-refs', default=None,
+              help='Record name and attribute references for find --refs (kept for later runs)')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
-def index(path: str, force: bool, verbose: bool):
+def index(
+    path: str,
+    force: bool,
+    jobs: int,
+    verify_hashes: bool,
+    use_git: bool,
+    shared_cache: bool,
+    files,
+    refs: Optional[bool],
+    verbose: bool
+):
     """Index a project's code."""
+    if files is not None:
+        # index_paths only syncs the listed paths, with the index settings
+        given = [
+            flag for flag, value in (
+                ("--force", force),
+                ("--verify-hashes", verify_hashes),
+                ("--git", use_git),
+                ("--refs/--no-refs", refs is not None),
+            )
+            if value
+        ]
+        if given:
+            raise click.UsageError(f"{', '.join(given)} cannot be combined with --files")
+    
     project_path = Path(path).resolve()
     
     click.echo(f"🔍 Indexing project: {project_path}")
@@ -29,10 +74,18 @@ def index(path: str, force: bool, verbose: bool):
         click.echo("⚡ Force mode: re-indexing all files")
     
     try:
-        generator = MapGenerator(project_path)
+        blob_store = default_blob_store_path() if shared_cache else None
+        generator = MapGenerator(project_path, blob_store=blob_store)
         
         start_time = time.time()
-        stats = generator.index(force=force)
+        if files is not None:
+            # Relative paths are taken relative to the working directory
+            paths = [Path(line.strip()).resolve() for line in files if line.strip()]
+            stats = generator.index_paths(paths, jobs=jobs)
+        else:
+            stats = generator.index(
+                force=force, jobs=jobs, verify_hashes=verify_hashes, git=use_git, refs=refs
+            )
         elapsed = time.time() - start_time
         
         # Display results
@@ -41,7 +94,11 @@ def index(path: str, force: bool, verbose: bool):
         click.echo(f"   Total files: {stats['total_files']}")
         click.echo(f"   Parsed: {stats['parsed_files']}")
         click.echo(f"   Cached (unchanged): {stats['cached_files']}")
+        if stats['reused_files']:
+            click.echo(f"   Reused (shared cache): {stats['reused_files']}")
         click.echo(f"   Failed: {stats['failed_files']}")
+        if stats['pruned_files']:
+            click.echo(f"   Pruned (deleted): {stats['pruned_files']}")
         click.echo(f"   Symbols: {stats['total_symbols']:,}")
         click.echo(f"   Imports: {stats['total_imports']:,}")
         
@@ -62,15 +119,26 @@ def index(path: str, force: bool, verbose: bool):
 @cli.command()
 @click.option('--path', type=click.Path(exists=True), default='.', help='Project path')
 @click.option('--format', type=click.Choice(['text', 'json']), default='text', help='Output format')
-@click.option('--top', type=float, default=0.2, help='Top percentage of files (0.0-1.0)')
-@click.option('--max-symbols', type=int, default=50, help='Max symbols per file')
+@click.option('--top', type=float, default=None, help='Top percentage of files (0.0-1.0, default: 0.2)')
+@click.option('--max-symbols', type=int, default=50, help='Max symbols per file (the most used ones are kept)')
+@click.option('--max-tokens', type=int, default=None, help='Token budget; reduces detail, then drops files to fit')
+@click.option('--focus', multiple=True,
+              help='File, directory or symbol being worked on; ranks its neighbourhood first (repeatable)')
 @click.option('--output', '-o', type=click.Path(), help='Output file (default: stdout)')
-def map(path: str, format: str, top: float, max_symbols: int, output: str):
+def map(
+    path: str,
+    format: str,
+    top: Optional[float],
+    max_symbols: int,
+    max_tokens: Optional[int],
+    focus: tuple,
+    output: str
+):
     """Generate a code map."""
     project_path = Path(path).resolve()
     
     try:
-        generator = MapGenerator(project_path)
+        generator = _open_index(project_path)
         
         # Check if project is indexed
         stats = generator.get_stats()
@@ -78,13 +146,19 @@ def map(path: str, format: str, top: float, max_symbols: int, output: str):
             click.echo("⚠️  No files indexed. Run 'code-compass index' first.", err=True)
             sys.exit(1)
         
-        click.echo(f"🗺️  Generating map (top {top*100:.0f}%, format={format})...")
+        if max_tokens is not None:
+            click.echo(f"🗺️  Generating map (budget {max_tokens:,} tokens, format={format})...")
+        else:
+            click.echo(f"🗺️  Generating map (top {(top or 0.2)*100:.0f}%, format={format})...")
         
         start_time = time.time()
         repo_map = generator.generate_map(
             top_percent=top,
             max_symbols_per_file=max_symbols,
-            format=format
+            format=format,
+            max_tokens=max_tokens,
+            # Existing paths are taken relative to the working directory
+            focus=[str(Path(f).resolve()) if Path(f).exists() else f for f in focus] or None
         )
         elapsed = time.time() - start_time
         
@@ -109,18 +183,33 @@ def map(path: str, format: str, top: float, max_symbols: int, output: str):
 @click.option('--path', type=click.Path(exists=True), default='.', help='Project path')
 @click.option('--fuzzy', is_flag=True, help='Fuzzy search')
 @click.option('--show-signature', '-s', is_flag=True, help='Show full signature')
-def find(name: str, path: str, fuzzy: bool, show_signature: bool):
+@click.option('--refs', is_flag=True, help='List references instead (needs index --refs)')
+def find(name: str, path: str, fuzzy: bool, show_signature: bool, refs: bool):
     """Find symbol definitions."""
     project_path = Path(path).resolve()
     
     try:
-        generator = MapGenerator(project_path)
+        generator = _open_index(project_path)
+        
+        if refs:
+            click.echo(f"🔎 Finding references: {name}")
+            references = generator.find_references(name)
+            if not references:
+                click.echo(f"❌ No references found to '{name}'")
+                sys.exit(1)
+            
+            click.echo(f"\n✅ Found {len(references)} reference(s):\n")
+            for ref in references:
+                click.echo(f"📄 {ref.file_path}:{ref.line}  {ref.expression}")
+            
+            generator.close()
+            return
         
         click.echo(f"🔎 Finding symbol: {name}")
         if fuzzy:
             click.echo("   (fuzzy search enabled)")
         
-        results = generator.find_symbol(name, fuzzy=fuzzy)
+        results = generator.find_symbols(name, fuzzy=fuzzy)
         
         if not results:
             click.echo(f"❌ No symbols found matching '{name}'")
@@ -128,15 +217,45 @@ def find(name: str, path: str, fuzzy: bool, show_signature: bool):
         
         click.echo(f"\n✅ Found {len(results)} result(s):\n")
         
-        for file_info, symbol_name in results:
-            # Find the symbol
-            symbol = next((s for s in file_info.symbols if s.name == symbol_name), None)
-            if symbol:
-                click.echo(f"📄 {file_info.path}")
-                click.echo(f"   {symbol.type.value}: {symbol.name}")
-                if show_signature:
-                    click.echo(f"   {symbol.signature}")
-                click.echo()
+        for symbol in results:
+            click.echo(f"📄 {symbol.file_path}")
+            click.echo(f"   {symbol.type.value}: {symbol.name}")
+            if show_signature:
+                click.echo(f"   {symbol.signature}")
+            click.echo()
+        
+        generator.close()
+        
+    except Exception as e:
+        click.echo(f"❌ Error: {e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('paths', nargs=-1)
+@click.option('--path', type=click.Path(exists=True), default='.', help='Project path')
+@click.option('--depth', type=int, default=None, help='Maximum number of import hops (default: unlimited)')
+@click.option('--git-diff', 'git_diff', default=None, metavar='REV',
+              help='Also start from the files changed since REV (e.g. main...)')
+def impacted(paths: tuple, path: str, depth: Optional[int], git_diff: Optional[str]):
+    """List the files that (transitively) import the given files."""
+    project_path = Path(path).resolve()
+    
+    try:
+        # Paths are taken relative to the working directory
+        sources = [Path(p).resolve() for p in paths]
+        if git_diff is not None:
+            sources += [project_path / p for p in changed_files(project_path, git_diff)]
+        if not sources:
+            click.echo("❌ Error: give file paths or --git-diff", err=True)
+            sys.exit(1)
+        
+        generator = _open_index(project_path)
+        
+        results = generator.impacted(sources, depth=depth)
+        for file_path, distance in sorted(results.items(), key=lambda item: (item[1], item[0])):
+            click.echo(f"{distance}\t{file_path}")
+        click.echo(f"\n✅ {len(results)} file(s) impacted", err=True)
         
         generator.close()
         
@@ -152,7 +271,7 @@ def stats(path: str):
     project_path = Path(path).resolve()
     
     try:
-        generator = MapGenerator(project_path)
+        generator = _open_index(project_path)
         
         stats = generator.get_stats()
         
@@ -189,5 +308,63 @@ def clear(path: str):
         sys.exit(1)
 
 
+@cli.command()
+@click.argument('path', type=click.Path(exists=True), default='.')
+@click.option('--debounce', type=float, default=0.2, help='Seconds of quiet before re-indexing a burst of changes')
+@click.option('--poll', is_flag=True, help='Poll file stats instead of using inotify')
+@click.option('--interval', type=float, default=1.0, help='Seconds between polls (with --poll or without inotify)')
+def watch(path: str, debounce: float, poll: bool, interval: float):
+    """Keep the index up to date as files change."""
+    project_path = Path(path).resolve()
+    
+    def report(changed: set, stats: dict):
+        click.echo(
+            f"🔄 {len(changed)} change(s): {stats['parsed_files']} parsed, "
+            f"{stats['pruned_files']} removed, {stats['failed_files']} failed"
+        )
+    
+    try:
+        generator = MapGenerator(project_path)
+        click.echo(f"👀 Watching {project_path} (Ctrl+C to stop)")
+        
+        try:
+            generator.watch(debounce=debounce, polling=poll, interval=interval, on_update=report)
+        except KeyboardInterrupt:
+            click.echo("\n👋 Stopped watching")
+        finally:
+            generator.close()
+        
+    except Exception as e:
+        click.echo(f"❌ Error: {e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True), default='.')
+def serve(path: str):
+    """Serve the index over a unix socket (used by find/map/stats)."""
+    project_path = Path(path).resolve()
+    
+    try:
+        daemon = IndexDaemon(project_path)
+        # Load the scores before the first request
+        daemon.generator.get_importance()
+        
+        click.echo(f"🚀 Serving {project_path}")
+        click.echo(f"   Socket: {daemon.socket_path}")
+        click.echo("   Press Ctrl+C to stop")
+        
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            click.echo("\n👋 Daemon stopped")
+        finally:
+            daemon.close()
+        
+    except Exception as e:
+        click.echo(f"❌ Error: {e}", err=True)
+        sys.exit(1)
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,311 @@
+"""Long-running index server on a unix socket."""
+
+import json
+import os
+import selectors
+import socket
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from ai_code_compass.formatter import SymbolFormatter
+from ai_code_compass.map_generator import MapGenerator, default_cache_dir
+from ai_code_compass.models import Reference, Symbol, SymbolType
+
+
+# Socket file name inside the project's cache directory
+SOCKET_NAME = "daemon.sock"
+
+# Rendered maps kept per index generation
+MAX_CACHED_MAPS = 64
+
+# Seconds a client may take to accept a response before it is dropped
+SEND_TIMEOUT = 5.0
+
+
+class DaemonError(Exception):
+    """Raised when the daemon cannot be reached or reports an error."""
+
+
+def socket_path(project_root: Path, cache_dir: Optional[Path] = None) -> Path:
+    """Get the socket path of a project's daemon."""
+    if cache_dir is None:
+        cache_dir = default_cache_dir(project_root)
+    return Path(cache_dir) / SOCKET_NAME
+
+
+class IndexDaemon:
+    """
+    Answer map/find/stats requests from a hot MapGenerator.
+    
+    The SQLite connection, the importance scores and recently rendered maps
+    stay in memory between requests. Every request checks the index
+    generation, so writes by a separate `code-compass index` run are picked
+    up on the next request.
+    
+    Protocol: one JSON object per line in each direction. Requests look like
+    {"method": "map", "params": {...}}; responses are {"ok": true,
+    "result": ...} or {"ok": false, "error": "..."}. Clients may keep their
+    connection open; requests from all connections are answered in turn by
+    one thread, which owns the SQLite connection.
+    """
+    
+    def __init__(self, project_root: Path, cache_dir: Optional[Path] = None):
+        """
+        Initialize daemon.
+        
+        Args:
+            project_root: Root directory of the project
+            cache_dir: Directory for cache storage (default: ~/.code-compass/<project_hash>)
+        """
+        self.generator = MapGenerator(project_root, cache_dir=cache_dir)
+        self.socket_path = socket_path(self.generator.project_root, self.generator.cache_dir)
+        self._stopping = False
+        # Rendered maps of the current generation, keyed by parameters
+        self._maps: dict[str, str] = {}
+        self._maps_generation = -1
+    
+    def handle(self, request: dict) -> dict:
+        """Dispatch one decoded request and build its response."""
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Request must be a JSON object"}
+        method = request.get("method")
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            return {"ok": False, "error": "Request params must be a JSON object"}
+        handler = getattr(self, f"_do_{method}", None) if isinstance(method, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"Unknown method: {method!r}"}
+        try:
+            return {"ok": True, "result": handler(**params)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    
+    def _do_ping(self) -> dict:
+        return {"project_root": str(self.generator.project_root), "pid": os.getpid()}
+    
+    def _do_map(self, **params) -> str:
+        generation = self.generator.cache.get_generation()
+        if generation != self._maps_generation or len(self._maps) >= MAX_CACHED_MAPS:
+            self._maps = {}
+            self._maps_generation = generation
+        
+        key = json.dumps(params, sort_keys=True)
+        if key not in self._maps:
+            self._maps[key] = self.generator.generate_map(**params)
+        return self._maps[key]
+    
+    def _do_find(self, name: str, fuzzy: bool = False) -> list[dict]:
+        return [
+            dict(SymbolFormatter.to_dict(s), content_hash=s.content_hash)
+            for s in self.generator.find_symbols(name, fuzzy=fuzzy)
+        ]
+    
+    def _do_find_references(self, name: str) -> list[dict]:
+        return [asdict(ref) for ref in self.generator.find_references(name)]
+    
+    def _do_impacted(self, paths: list[str], depth: Optional[int] = None) -> dict[str, int]:
+        return self.generator.impacted(paths, depth=depth)
+    
+    def _do_stats(self) -> dict:
+        stats = self.generator.get_stats()
+        stats["cache_dir"] = str(self.generator.cache_dir)
+        return stats
+    
+    def _do_shutdown(self) -> bool:
+        # The serve loop exits once this response is sent
+        self._stopping = True
+        return True
+    
+    def serve_forever(self):
+        """Bind the socket and answer requests until shut down."""
+        if self.socket_path.exists():
+            with DaemonClient(self.socket_path) as client:
+                if client.is_alive():
+                    raise DaemonError(f"A daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not exit cleanly
+            self.socket_path.unlink()
+        
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(str(self.socket_path))
+            listener.listen()
+        except OSError:
+            listener.close()
+            raise
+        listener.setblocking(False)
+        
+        # Single thread multiplexing every connection: requests share one
+        # SQLite connection and an idle client cannot block the others
+        selector = selectors.DefaultSelector()
+        selector.register(listener, selectors.EVENT_READ)
+        pending: dict[socket.socket, bytes] = {}
+        self._stopping = False
+        try:
+            while not self._stopping:
+                for key, _ in selector.select(timeout=0.5):
+                    if key.fileobj is listener:
+                        try:
+                            conn, _ = listener.accept()
+                        except BlockingIOError:
+                            continue
+                        conn.settimeout(SEND_TIMEOUT)
+                        selector.register(conn, selectors.EVENT_READ)
+                        pending[conn] = b""
+                    elif not self._serve_connection(key.fileobj, pending):
+                        selector.unregister(key.fileobj)
+                        del pending[key.fileobj]
+                        key.fileobj.close()
+        finally:
+            for conn in pending:
+                conn.close()
+            selector.close()
+            listener.close()
+            self.socket_path.unlink(missing_ok=True)
+    
+    def _serve_connection(self, conn: socket.socket, pending: dict[socket.socket, bytes]) -> bool:
+        """
+        Answer the complete requests a readable connection has sent.
+        
+        Returns:
+            False once the connection is closed or broken
+        """
+        try:
+            data = conn.recv(65536)
+        except OSError:
+            return False
+        if not data:
+            return False
+        
+        *lines, pending[conn] = (pending[conn] + data).split(b"\n")
+        for line in lines:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid JSON: {e}"}
+            else:
+                response = self.handle(request)
+            try:
+                conn.sendall(json.dumps(response).encode() + b"\n")
+            except (BrokenPipeError, ConnectionResetError, socket.timeout):
+                # The client went away (or stopped reading) mid-response
+                return False
+        return True
+    
+    def close(self):
+        """Close the cache connection."""
+        self.generator.close()
+
+
+class DaemonClient:
+    """Client for a running IndexDaemon."""
+    
+    def __init__(self, path: Path, timeout: float = 30.0):
+        """
+        Initialize client (the connection is opened lazily).
+        
+        Args:
+            path: Socket path of the daemon
+            timeout: Seconds to wait for a response
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+    
+    @classmethod
+    def for_project(cls, project_root: Path) -> Optional["DaemonClient"]:
+        """Get a client if a daemon is serving the project, else None."""
+        client = cls(socket_path(project_root))
+        if not client.path.exists() or not client.is_alive():
+            return None
+        return client
+    
+    @property
+    def cache_dir(self) -> Path:
+        """Cache directory of the served project."""
+        return self.path.parent
+    
+    def generate_map(self, **params) -> str:
+        """Same as MapGenerator.generate_map, answered by the daemon."""
+        return self.call("map", **params)
+    
+    def find_symbols(self, name: str, fuzzy: bool = False) -> list[Symbol]:
+        """Same as MapGenerator.find_symbols, answered by the daemon."""
+        return [
+            Symbol(
+                name=item['name'],
+                type=SymbolType(item['type']),
+                file_path=item['file_path'],
+                line_start=item['line_start'],
+                line_end=item['line_end'],
+                signature=item['signature'],
+                parent=item['parent'],
+                content_hash=item.get('content_hash')
+            )
+            for item in self.call("find", name=name, fuzzy=fuzzy)
+        ]
+    
+    def find_references(self, name: str) -> list[Reference]:
+        """Same as MapGenerator.find_references, answered by the daemon."""
+        return [Reference(**item) for item in self.call("find_references", name=name)]
+    
+    def impacted(self, paths: list, depth: Optional[int] = None) -> dict[str, int]:
+        """Same as MapGenerator.impacted, answered by the daemon."""
+        return self.call("impacted", paths=[str(p) for p in paths], depth=depth)
+    
+    def get_stats(self) -> dict:
+        """Same as MapGenerator.get_stats, answered by the daemon."""
+        return self.call("stats")
+    
+    def is_alive(self) -> bool:
+        """Check whether the daemon answers."""
+        try:
+            self.call("ping")
+            return True
+        except DaemonError:
+            return False
+    
+    def call(self, method: str, **params):
+        """
+        Send one request and wait for its result.
+        
+        Raises:
+            DaemonError: If the daemon is unreachable or the request failed
+        """
+        try:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(self.timeout)
+                self._sock.connect(str(self.path))
+                self._reader = self._sock.makefile("rb")
+            self._sock.sendall(json.dumps({"method": method, "params": params}).encode() + b"\n")
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise DaemonError(f"Cannot reach daemon at {self.path}: {e}") from e
+        
+        if not line:
+            self.close()
+            raise DaemonError(f"Daemon at {self.path} closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown error"))
+        return response["result"]
+    
+    def close(self):
+        """Close the connection."""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
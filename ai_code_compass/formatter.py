@@ -1,7 +1,7 @@
 """Formatters for converting data models to various output formats."""
 
 import json
-from .models import Symbol, RepoMap, SymbolType
+from .models import FileInfo, Symbol, RepoMap, SymbolType
 
 
 class RepoMapFormatter:
@@ -25,15 +25,20 @@ class RepoMapFormatter:
         lines.append(f"# Repository Map (Top {repo_map.included_files} files, {repo_map.included_files/repo_map.total_files*100:.0f}%)\n")
         
         for file_info, score in repo_map.files:
-            lines.append(f"\n## {file_info.path} (importance: {score:.3f})")
-            lines.append("⋮...")
-            for symbol in file_info.symbols:
-                lines.append(SymbolFormatter.to_map_line(symbol))
-            if len(file_info.symbols) > 0:
-                lines.append("⋮...")
+            lines.append(RepoMapFormatter.file_to_text(file_info, score))
         
         return "\n".join(lines)
     
+    @staticmethod
+    def file_to_text(file_info: FileInfo, score: float) -> str:
+        """Convert one file's section of the text map."""
+        lines = [f"\n## {file_info.path} (importance: {score:.3f})", "⋮..."]
+        for symbol in file_info.symbols:
+            lines.append(SymbolFormatter.to_map_line(symbol))
+        if len(file_info.symbols) > 0:
+            lines.append("⋮...")
+        return "\n".join(lines)
+    
     @staticmethod
     def to_json(repo_map: RepoMap) -> str:
         """
@@ -48,14 +53,18 @@ class RepoMapFormatter:
         }
         
         for file_info, score in repo_map.files:
-            file_data = {
-                'path': file_info.path,
-                'importance': score,
-                'symbols': [SymbolFormatter.to_dict(s) for s in file_info.symbols]
-            }
-            data['files'].append(file_data)
+            data['files'].append(RepoMapFormatter.file_to_dict(file_info, score))
         
         return json.dumps(data, indent=2)
+    
+    @staticmethod
+    def file_to_dict(file_info: FileInfo, score: float) -> dict:
+        """Convert one file's entry of the JSON map."""
+        return {
+            'path': file_info.path,
+            'importance': score,
+            'symbols': [SymbolFormatter.to_dict(s) for s in file_info.symbols]
+        }
 
 
 class SymbolFormatter:
@@ -75,6 +84,15 @@ class SymbolFormatter:
         indent = "│  " if symbol.parent else "│"
         return f"{indent}{symbol.signature}"
     
+    @staticmethod
+    def to_short_signature(symbol: Symbol) -> str:
+        """
+        Convert Symbol to its kind and name only (e.g. "class Parser",
+        "def parse_file"), used for low-detail maps.
+        """
+        keyword = "class" if symbol.type == SymbolType.CLASS else "def"
+        return f"{keyword} {symbol.name}"
+    
     @staticmethod
     def to_dict(symbol: Symbol) -> dict:
         """
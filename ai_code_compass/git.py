@@ -0,0 +1,104 @@
+"""Change detection from a git work tree."""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+
+# git ls-files modes whose blob is not the file's content
+_SYMLINK_MODE = "120000"
+_GITLINK_MODE = "160000"
+
+
+class GitError(Exception):
+    """Raised when git is unavailable or the project is not in a work tree."""
+
+
+@dataclass
+class GitSnapshot:
+    """Tracked and changed files of a project (project-relative paths)."""
+    blobs: dict[str, str]               # Clean tracked file -> blob id in the git index
+    dirty: set[str]                     # Modified, staged, deleted, conflicted or untracked files
+
+
+def git_snapshot(project_root: Path) -> GitSnapshot:
+    """
+    List the project's files from the git index and `git status`.
+    
+    Clean files come with the blob id git already stored for them, so
+    callers can detect content changes without reading the file. Anything
+    `git status` reports (including untracked, non-ignored files) is dirty
+    and has to be read from disk.
+    
+    Raises:
+        GitError: If git is missing or project_root is not inside a work tree
+    """
+    # Status paths are relative to the repository root, ls-files paths to
+    # the working directory
+    prefix = os.fsdecode(_run_git(project_root, "rev-parse", "--show-prefix")).strip()
+    
+    dirty = set()
+    status = _run_git(
+        project_root, "--no-optional-locks", "status", "--porcelain", "-z",
+        "--untracked-files=all", "--no-renames", "--", "."
+    )
+    for entry in status.split(b"\0"):
+        if len(entry) > 3:
+            # "XY path"
+            path = os.fsdecode(entry[3:])
+            if path.startswith(prefix):
+                dirty.add(path[len(prefix):])
+    
+    blobs = {}
+    for entry in _run_git(project_root, "ls-files", "-s", "-z").split(b"\0"):
+        if not entry:
+            continue
+        # "<mode> <blob> <stage>\t<path>"
+        info, _, path = entry.partition(b"\t")
+        mode, blob, stage = os.fsdecode(info).split()
+        path = os.fsdecode(path)
+        if mode == _GITLINK_MODE or path in dirty:
+            continue
+        if stage != "0" or mode == _SYMLINK_MODE:
+            # Merge conflict, or a blob holding the link target
+            dirty.add(path)
+            continue
+        blobs[path] = blob
+    
+    return GitSnapshot(blobs=blobs, dirty=dirty)
+
+
+def changed_files(project_root: Path, rev: str) -> list[str]:
+    """
+    List the project's files that differ between rev and the work tree.
+    
+    Args:
+        project_root: Directory inside a git work tree
+        rev: Commit, branch or range understood by `git diff` (e.g. "main...")
+    
+    Returns:
+        Project-relative paths of added, modified and deleted files
+    
+    Raises:
+        GitError: If git is missing, project_root is not inside a work tree
+            or rev is unknown
+    """
+    output = _run_git(project_root, "diff", "--name-only", "-z", "--no-renames", "--relative", rev, "--", ".")
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+def _run_git(project_root: Path, *args: str) -> bytes:
+    """Run a git command in project_root and return its stdout."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(project_root), *args],
+            capture_output=True,
+            check=True
+        )
+    except FileNotFoundError as e:
+        raise GitError("git executable not found") from e
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode(errors="replace").strip()
+        raise GitError(message or f"git {' '.join(args)} failed") from e
+    return result.stdout
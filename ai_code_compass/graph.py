@@ -1,10 +1,11 @@
 """Dependency graph construction and analysis."""
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 from .models import FileInfo
+from .ranking import CSRGraph, pagerank
 
 
 class DependencyGraph:
@@ -15,11 +16,24 @@ class DependencyGraph:
         self.edges: dict[str, set[str]] = defaultdict(set)
         # Reverse index: file_path -> [files_that_import_it]
         self.reverse_edges: dict[str, set[str]] = defaultdict(set)
+        # Files without any edges still take part in ranking
+        self.nodes: set[str] = set()
+        # Integer-indexed view for ranking, rebuilt after modifications
+        self._csr: Optional[CSRGraph] = None
+    
+    def add_node(self, file_path: str):
+        """Add a file, even if it has no dependencies."""
+        if file_path not in self.nodes:
+            self.nodes.add(file_path)
+            self._csr = None
     
     def add_edge(self, from_file: str, to_file: str):
         """Add a dependency edge."""
         self.edges[from_file].add(to_file)
         self.reverse_edges[to_file].add(from_file)
+        self.nodes.add(from_file)
+        self.nodes.add(to_file)
+        self._csr = None
     
     def get_dependencies(self, file_path: str) -> set[str]:
         """Get all files that this file depends on."""
@@ -29,47 +43,85 @@ class DependencyGraph:
         """Get all files that depend on this file."""
         return self.reverse_edges.get(file_path, set())
     
-    def compute_importance(self) -> dict[str, float]:
+    def get_transitive_dependents(
+        self,
+        file_paths: Iterable[str],
+        depth: Optional[int] = None
+    ) -> dict[str, int]:
         """
-        Compute importance score for each file using simplified PageRank.
+        Get every file that depends on the given files, directly or not.
         
-        Files that are imported by many other files are considered more important.
+        Breadth-first search over the reverse edges from all files at once.
+        
+        Args:
+            file_paths: Files to start from
+            depth: Maximum number of import hops (default: unlimited)
+        
+        Returns:
+            Mapping of file path to its hop distance; the given files
+            themselves have distance 0
+        """
+        distances = {path: 0 for path in file_paths}
+        frontier = deque(distances)
+        while frontier:
+            path = frontier.popleft()
+            distance = distances[path] + 1
+            if depth is not None and distance > depth:
+                continue
+            for dependent in self.reverse_edges.get(path, ()):
+                if dependent not in distances:
+                    distances[dependent] = distance
+                    frontier.append(dependent)
+        return distances
+    
+    def to_csr(self) -> CSRGraph:
+        """Get the integer-indexed CSR view of the graph (cached)."""
+        if self._csr is None:
+            self._csr = CSRGraph(
+                sorted(self.nodes),
+                ((src, dst) for src, deps in self.edges.items() for dst in deps)
+            )
+        return self._csr
+    
+    def compute_importance(
+        self,
+        damping: float = 0.85,
+        tol: float = 1e-6,
+        max_iter: int = 100,
+        initial: Optional[dict[str, float]] = None,
+        personalization: Optional[dict[str, float]] = None
+    ) -> dict[str, float]:
         """
-        # Initialize: each node starts with score 1.0
-        all_files = set(self.edges.keys()) | set(self.reverse_edges.keys())
+        Compute importance score for each file using PageRank.
         
-        # Handle edge case: no files or single file with no imports
-        if not all_files:
-            return {}
+        Files that are imported by many other files are considered more important.
+        Scores average 1.0; iteration stops once the mean change per file
+        drops below tol.
         
-        if len(all_files) == 1:
-            # Single file: return score 1.0
-            return {list(all_files)[0]: 1.0}
-        
-        # Check if there are any edges at all
-        has_edges = any(len(deps) > 0 for deps in self.edges.values())
-        if not has_edges:
-            # No imports: all files have equal importance
-            return {file: 1.0 for file in all_files}
-        
-        scores = {file: 1.0 for file in all_files}
-        
-        # Iterate 10 times (usually converges quickly)
-        for _ in range(10):
-            new_scores = {}
-            for file in all_files:
-                # Score = 0.15 + 0.85 * Σ(score_of_dependent / out_degree_of_dependent)
-                incoming_score = 0.0
-                for dependent in self.reverse_edges.get(file, set()):
-                    out_degree = len(self.edges.get(dependent, set()))
-                    if out_degree > 0:
-                        incoming_score += scores[dependent] / out_degree
-                
-                new_scores[file] = 0.15 + 0.85 * incoming_score
-            
-            scores = new_scores
+        Args:
+            damping: Probability of following an import edge
+            tol: Convergence tolerance
+            max_iter: Maximum number of iterations
+            initial: Previous scores to start from (warm start); files
+                missing from it start at 1.0
+            personalization: Restart weight per file (personalized
+                PageRank); files missing from it get 0
+        """
+        if not self.nodes:
+            return {}
         
-        return scores
+        csr = self.to_csr()
+        start = None
+        if initial is not None:
+            start = [initial.get(node, 1.0) for node in csr.nodes]
+        restart = None
+        if personalization is not None:
+            restart = [personalization.get(node, 0.0) for node in csr.nodes]
+        scores = pagerank(
+            csr, damping=damping, tol=tol, max_iter=max_iter,
+            personalization=restart, initial=start
+        )
+        return dict(zip(csr.nodes, scores))
 
 
 class DependencyBuilder:
@@ -80,28 +132,94 @@ class DependencyBuilder:
         self.graph = DependencyGraph()
         # Module name -> file path mapping
         self.module_to_file: dict[str, str] = {}
+        # Dotted suffix -> best matching module name (e.g. "utils" -> "src.utils")
+        self.suffix_to_module: dict[str, str] = {}
+        # Memo of resolved (module, level, package) triples
+        self._resolved: dict[tuple[str, int, str], Optional[str]] = {}
     
     def build(self, files: list[FileInfo]) -> DependencyGraph:
         """Build dependency graph from file information."""
+        return self.build_from_imports({f.path: f.imports for f in files})
+    
+    def build_from_imports(self, imports: dict[str, list[dict]]) -> DependencyGraph:
+        """
+        Build dependency graph from the imports of each file.
         
+        Args:
+            imports: Mapping of file path to its import dicts
+        """
         # Step 1: Build module name to file path mapping
-        for file_info in files:
-            module_name = self._file_to_module(file_info.path)
-            self.module_to_file[module_name] = file_info.path
+        self.add_files(imports)
         
         # Step 2: Build edges based on imports
-        for file_info in files:
-            for imported_module in file_info.imports:
-                # Try to resolve the imported module to a file path
-                imported_file = self._resolve_import(
-                    imported_module,
-                    file_info.path
-                )
-                if imported_file:
-                    self.graph.add_edge(file_info.path, imported_file)
+        for path, file_imports in imports.items():
+            for imported_file in self.resolve_imports(path, file_imports):
+                self.graph.add_edge(path, imported_file)
         
         return self.graph
     
+    def add_files(self, paths: Iterable[str]):
+        """Register files as graph nodes and import targets."""
+        for path in paths:
+            module_name = self._file_to_module(path)
+            self.module_to_file[module_name] = path
+            self.graph.add_node(path)
+        self._build_suffix_index()
+    
+    def resolve_imports(self, path: str, file_imports: list[dict]) -> set[str]:
+        """
+        Resolve the imports of one file against the registered files.
+        
+        Returns:
+            Paths of the project files it imports
+        """
+        resolved = set()
+        for imported_module in file_imports:
+            # Try to resolve the imported module to a file path
+            imported_file = self._resolve_import(imported_module, path)
+            if imported_file:
+                resolved.add(imported_file)
+        return resolved
+    
+    def import_targets(self, imports: dict[str, list[dict]]) -> set[str]:
+        """
+        Get the module names some files' imports can resolve to.
+        
+        Registering just the files whose module is one of these names, or
+        ends with one (as a dotted suffix), resolves those imports exactly
+        as registering every file would.
+        
+        Args:
+            imports: Mapping of file path to its import dicts
+        """
+        targets = set()
+        for path, file_imports in imports.items():
+            for import_info in file_imports:
+                level = import_info['level']
+                if level == 0:
+                    targets.add(import_info['module'])
+                else:
+                    target = self._relative_target(
+                        import_info['module'], level, self._file_to_module(path)
+                    )
+                    if target is not None:
+                        targets.add(target)
+        return targets
+    
+    def _build_suffix_index(self):
+        """
+        Index every proper dotted suffix of every module name.
+        
+        When several modules share a suffix, the one with the fewest
+        segments wins, then the lexicographically smallest name.
+        """
+        self.suffix_to_module = {}
+        self._resolved = {}
+        for module in sorted(self.module_to_file, key=lambda m: (m.count("."), m)):
+            parts = module.split(".")
+            for i in range(1, len(parts)):
+                self.suffix_to_module.setdefault(".".join(parts[i:]), module)
+    
     def _file_to_module(self, file_path: str) -> str:
         """Convert file path to module name.
         
@@ -139,6 +257,15 @@ class DependencyBuilder:
         module_name = import_info['module']
         level = import_info['level']
         
+        # Absolute imports do not depend on the importing file
+        package = self._file_to_module(from_file) if level else ""
+        key = (module_name, level, package)
+        if key not in self._resolved:
+            self._resolved[key] = self._resolve_uncached(module_name, level, package)
+        return self._resolved[key]
+    
+    def _resolve_uncached(self, module_name: str, level: int, from_module: str) -> Optional[str]:
+        """Resolve an import without consulting the memo."""
         # Case 1: Absolute import (level=0)
         if level == 0:
             # Direct lookup
@@ -146,17 +273,32 @@ class DependencyBuilder:
                 return self.module_to_file[module_name]
             
             # Try partial matches (e.g., "utils" might match "src.utils")
-            for mod, file in self.module_to_file.items():
-                if mod.endswith("." + module_name) or mod == module_name:
-                    return file
+            suffix_match = self.suffix_to_module.get(module_name)
+            if suffix_match is not None:
+                return self.module_to_file[suffix_match]
             
             # Standard library or external package - ignore
             return None
         
         # Case 2: Relative import (level > 0)
+        resolved_module = self._relative_target(module_name, level, from_module)
+        if resolved_module is None:
+            return None
+        
+        # Look up in our mapping
+        if resolved_module in self.module_to_file:
+            return self.module_to_file[resolved_module]
+        
+        # Try to find __init__.py in the package
+        init_module = resolved_module + '.__init__'
+        if init_module in self.module_to_file:
+            return self.module_to_file[init_module]
+        
+        return None
+    
+    def _relative_target(self, module_name: str, level: int, from_module: str) -> Optional[str]:
+        """Get the module a relative import names, or None if it is invalid."""
         # Calculate the base package based on the importing file's location
-        from_path = Path(from_file)
-        from_module = self._file_to_module(from_file)
         
         # Special case: if from_module is empty string (root __init__.py)
         # then we're in the package root
@@ -185,18 +327,6 @@ class DependencyBuilder:
         
         # Add the imported module name if present
         if module_name:
-            resolved_module = '.'.join(base_parts + [module_name])
-        else:
-            # "from . import x" - just the base package
-            resolved_module = '.'.join(base_parts)
-        
-        # Look up in our mapping
-        if resolved_module in self.module_to_file:
-            return self.module_to_file[resolved_module]
-        
-        # Try to find __init__.py in the package
-        init_module = resolved_module + '.__init__'
-        if init_module in self.module_to_file:
-            return self.module_to_file[init_module]
-        
-        return None
+            return '.'.join(base_parts + [module_name])
+        # "from . import x" - just the base package
+        return '.'.join(base_parts)
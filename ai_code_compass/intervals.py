@@ -0,0 +1,43 @@
+"""Line-to-symbol lookup over the symbol intervals of a file."""
+
+from bisect import bisect_right
+from typing import Optional
+
+from ai_code_compass.models import Symbol
+
+
+class SymbolIntervals:
+    """
+    Find the innermost symbol containing a line of one file.
+    
+    Symbol spans nest (methods inside classes), so sorting them by start
+    line and linking each to its innermost enclosing symbol is enough: the
+    answer for a line is the last symbol starting at or before it, or the
+    nearest of its ancestors that still covers the line. A lookup is one
+    bisection plus a walk up at most the nesting depth.
+    """
+    
+    def __init__(self, symbols: list[Symbol]):
+        """
+        Build the lookup.
+        
+        Args:
+            symbols: Symbols of one file, in any order
+        """
+        self.symbols = sorted(symbols, key=lambda s: (s.line_start, -s.line_end))
+        self.starts = [s.line_start for s in self.symbols]
+        # Index of the innermost symbol enclosing each symbol (-1 = none)
+        self.enclosing: list[int] = []
+        stack: list[int] = []
+        for i, symbol in enumerate(self.symbols):
+            while stack and self.symbols[stack[-1]].line_end < symbol.line_start:
+                stack.pop()
+            self.enclosing.append(stack[-1] if stack else -1)
+            stack.append(i)
+    
+    def at(self, line: int) -> Optional[Symbol]:
+        """Get the innermost symbol whose span covers line, if any."""
+        i = bisect_right(self.starts, line) - 1
+        while i >= 0 and self.symbols[i].line_end < line:
+            i = self.enclosing[i]
+        return self.symbols[i] if i >= 0 else None
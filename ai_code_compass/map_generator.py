@@ -1,176 +1,871 @@
 """Map generator for creating repository maps."""
 
 import hashlib
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from itertools import islice, repeat
 from pathlib import Path
-from typing import Optional
-from ai_code_compass.models import FileInfo, RepoMap
+from typing import Callable, Iterable, Optional, Union
+from ai_code_compass.models import FileInfo, FileState, Reference, RepoMap, Symbol
 from ai_code_compass.parsers import PythonParser
+from ai_code_compass.parsers.python_parser import hash_source
+from ai_code_compass.blobstore import PARSE_VERSION, BlobStore
 from ai_code_compass.cache import CacheManager
-from ai_code_compass.graph import DependencyBuilder
+from ai_code_compass.git import GitError, git_snapshot
+from ai_code_compass.graph import DependencyBuilder, DependencyGraph
+from ai_code_compass.intervals import SymbolIntervals
+from ai_code_compass.walker import FileWalker
+from ai_code_compass.watcher import create_watcher
+from ai_code_compass.tokens import DETAIL_FILE, DETAIL_LEVELS, DETAIL_NAME, TokenCounter, count_tokens_rough
 from ai_code_compass.formatter import RepoMapFormatter, SymbolFormatter
 
+# Stat metadata of files modified within this window before an index run
+# is not stored, so same-tick edits are caught by hashing on the next run
+RACY_WINDOW_NS = 2_000_000_000
+
+# Number of files written per cache transaction during indexing
+WRITE_BATCH_SIZE = 500
+
+# Share of files in a map when neither top_percent nor a token budget is given
+DEFAULT_TOP_PERCENT = 0.2
+
+# Files whose line lookups are kept in memory
+MAX_CACHED_INTERVALS = 4096
+
+# impacted() results kept in memory
+MAX_CACHED_IMPACTS = 256
+
+# Above this fraction of added + removed edges, PageRank is solved from
+# scratch instead of warm-starting from the stored scores
+INCREMENTAL_MAX_EDGE_CHANGE = 0.1
+
+
+def default_cache_dir(project_root: Path) -> Path:
+    """Get the cache directory of a project: ~/.code-compass/<project path hash>."""
+    # Use user home directory to avoid permission issues
+    project_hash = hashlib.md5(str(Path(project_root).resolve()).encode()).hexdigest()[:8]
+    return Path.home() / ".code-compass" / project_hash
+
 
 class MapGenerator:
     """Generate repository maps with configurable options."""
     
-    def __init__(self, project_root: Path, cache_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        project_root: Path,
+        cache_dir: Optional[Path] = None,
+        blob_store: Optional[Path] = None
+    ):
         """
         Initialize map generator.
         
         Args:
             project_root: Root directory of the project
             cache_dir: Directory for cache storage (default: ~/.code-compass/<project_hash>)
+            blob_store: Parse store shared with other projects, e.g.
+                blobstore.default_blob_store_path() (default: none)
         """
         self.project_root = Path(project_root).resolve()
         
         if cache_dir is None:
-            # Use user home directory to avoid permission issues
-            from pathlib import Path as PathLib
-            home_dir = PathLib.home()
-            # Create a unique cache dir based on project path hash
-            project_hash = hashlib.md5(str(self.project_root).encode()).hexdigest()[:8]
-            cache_dir = home_dir / ".code-compass" / project_hash
+            cache_dir = default_cache_dir(self.project_root)
         
         self.cache_dir = Path(cache_dir)
         self.cache = CacheManager(self.cache_dir)
         self.parser = PythonParser()
+        self.walker = FileWalker(self.project_root)
+        self.blob_store = BlobStore(blob_store) if blob_store is not None else None
+        # (generation, scores) of the last get_importance call
+        self._importance: Optional[tuple[int, dict[str, float]]] = None
+        # (generation, graph) loaded from the stored edges for focused ranking
+        self._graph: Optional[tuple[int, DependencyGraph]] = None
+        # impacted() results for that graph, keyed by (files, depth)
+        self._impacted: dict[tuple[frozenset, Optional[int]], dict[str, int]] = {}
+        # Line lookups per file, valid for one index generation
+        self._intervals: dict[str, Optional[SymbolIntervals]] = {}
+        self._intervals_generation = -1
     
-    def index(self, force: bool = False) -> dict:
+    def index(
+        self,
+        force: bool = False,
+        jobs: int = 1,
+        verify_hashes: bool = False,
+        git: bool = False,
+        refs: Optional[bool] = None
+    ) -> dict:
         """
         Index all Python files in the project.
         
+        Files whose (mtime_ns, size, inode) match the cached stat metadata are
+        skipped without being opened; all other files are hashed, and only
+        files whose hash changed are parsed (or, with a blob store, copied
+        from the store if that content was parsed before). Cached files that were deleted
+        or are now excluded are pruned along with their symbols.
+        
+        With git=True, files are listed from the git index instead of walking
+        the tree. Clean tracked files whose blob id matches the one stored at
+        their last parse are skipped without any I/O; modified and untracked
+        files go through the stat/hash checks above. Outside a work tree, or
+        without a git binary, the tree is walked as usual.
+        
+        Reference extraction is a setting of the index: once enabled, every
+        later run (and index_paths/watch) keeps the references of changed
+        files up to date. Enabling it re-parses all files once, and the
+        setting is only stored when that run completes.
+        
+        An index saved by an older PARSE_VERSION (e.g. before symbol content
+        hashes or imported names were recorded) is re-parsed in full once.
+        
         Args:
-            force: If True, re-index all files even if cached
+            force: If True, re-parse all files, ignoring the index and the
+                blob store
+            jobs: Number of worker processes for reading and parsing
+                (1 = serial, 0 or less = one per CPU core)
+            verify_hashes: If True, hash every file even when its stat
+                metadata or blob id is unchanged
+            git: If True, use git to list files and detect changes
+            refs: Turn reference extraction on or off (None = keep the
+                current setting)
         
         Returns:
             Statistics about the indexing process
         """
-        # Find all Python files
-        py_files = list(self.project_root.rglob("*.py"))
-        py_files = [f for f in py_files if "__pycache__" not in str(f)]
-        py_files = [f for f in py_files if ".code-compass" not in str(f)]
+        enable_refs = bool(refs) and not self.cache.refs_enabled()
+        if refs is False and self.cache.refs_enabled():
+            self.cache.set_refs_enabled(False)
+        
+        known_states = {}
+        if not force and not enable_refs and self.cache.get_parse_version() >= PARSE_VERSION:
+            # Otherwise files saved so far lack references or newer data
+            known_states = self.cache.get_file_states()
+        
+        stats = self._index_all(known_states, jobs, verify_hashes, git, force, enable_refs)
+        
+        # Every file is now saved by this version (with references)
+        if self.cache.get_parse_version() != PARSE_VERSION:
+            self.cache.set_parse_version(PARSE_VERSION)
+        if enable_refs:
+            self.cache.set_refs_enabled(True)
+        return stats
+    
+    def _index_all(
+        self,
+        known_states: dict[str, FileState],
+        jobs: int,
+        verify_hashes: bool,
+        git: bool,
+        force: bool,
+        refs: bool
+    ) -> dict:
+        """Index every project file, listed by git or by walking the tree."""
+        refs = refs or self.cache.refs_enabled()
+        if git:
+            try:
+                snapshot = git_snapshot(self.project_root)
+            except GitError as e:
+                print(f"⚠️  git unavailable ({e}), walking the tree instead")
+            else:
+                rel_paths = self.walker.filter_paths(snapshot.blobs.keys() | snapshot.dirty)
+                py_files = [
+                    self.project_root / rel_path for rel_path in sorted(rel_paths)
+                    # Dirty files may have been deleted
+                    if rel_path in snapshot.blobs or (self.project_root / rel_path).is_file()
+                ]
+                return self._index_files(
+                    py_files, known_states, jobs, verify_hashes, prune=True,
+                    blob_ids=snapshot.blobs, reuse_parses=not force, refs=refs
+                )
+        return self._index_files(
+            self.walker, known_states, jobs, verify_hashes, prune=True,
+            reuse_parses=not force, refs=refs
+        )
+    
+    def watch(
+        self,
+        debounce: float = 0.2,
+        polling: bool = False,
+        interval: float = 1.0,
+        on_update: Optional[Callable[[set[str], dict], None]] = None
+    ):
+        """
+        Keep the index up to date until interrupted.
+        
+        Changes are picked up with inotify (or stat polling where inotify is
+        unavailable), debounced, and only the touched files and directories
+        are re-indexed; removed files are pruned and the stored graph and
+        scores are refreshed incrementally.
+        
+        Args:
+            debounce: Seconds without events that close a batch of changes
+            polling: Use stat polling even if inotify is available
+            interval: Seconds between polls when polling
+            on_update: Called with (changed paths, stats) after each batch
+        """
+        # Watch first so changes made during the catch-up index are not lost
+        with create_watcher(self.walker, polling=polling, interval=interval) as watcher:
+            self.index()
+            for changed in watcher.batches(debounce=debounce):
+                stats = self._sync_paths(sorted(changed))
+                if on_update is not None:
+                    on_update(changed, stats)
+    
+    def index_paths(self, paths: Iterable[Union[str, Path]], jobs: int = 1) -> dict:
+        """
+        Re-index only the given files and directories.
+        
+        Meant for editors and hooks that know what they touched: nothing
+        else is walked or stat'ed, deleted paths are pruned, and the stored
+        graph is updated from the touched files' edges only. Edits that
+        leave those edges unchanged touch no other file's data; changed
+        edges re-rank the whole stored graph (warm-started).
+        
+        Args:
+            paths: Absolute or project-relative paths; paths outside the
+                project are ignored
+            jobs: Number of worker processes for reading and parsing
+        
+        Returns:
+            Statistics about the indexing process
+        """
+        rel_paths = set()
+        for path in paths:
+            path = Path(path)
+            if not path.is_absolute():
+                path = self.project_root / path
+            try:
+                rel_path = Path(os.path.normpath(path)).relative_to(self.project_root).as_posix()
+            except ValueError:
+                continue
+            rel_paths.add("" if rel_path == "." else rel_path)
+        return self._sync_paths(sorted(rel_paths), jobs=jobs)
+    
+    def _sync_paths(self, rel_paths: Iterable[str], jobs: int = 1) -> dict:
+        """
+        Bring the index up to date for specific paths only.
+        
+        Each path may name a file or a directory, which is synced
+        recursively ('' is the whole project). Accepted files that exist are
+        re-indexed if their stat metadata or hash changed; cached files that
+        no longer exist, or are no longer accepted by the walker, are pruned.
+        
+        Args:
+            rel_paths: Project-relative paths
+            jobs: Number of worker processes for reading and parsing
+        
+        Returns:
+            Statistics about the indexing process
+        """
+        candidates: dict[str, Path] = {}
+        missing: set[str] = set()
+        for rel_path in rel_paths:
+            path = self.project_root / rel_path
+            if path.is_dir():
+                found = {self._relative_path(p): p for p in self.walker.walk(path)}
+                candidates.update(found)
+                prefix = rel_path.rstrip("/") + "/" if rel_path else ""
+                missing.update(p for p in self.cache.list_paths(prefix) if p not in found)
+            elif path.is_file() and self.walker.accepts(path):
+                candidates[rel_path] = path
+            else:
+                missing.add(rel_path)
+                missing.update(self.cache.list_paths(rel_path + "/"))
+        missing.difference_update(candidates)
+        
+        known_states = self.cache.get_file_states(list(candidates) + sorted(missing))
+        removed = [rel_path for rel_path in sorted(missing) if rel_path in known_states]
+        py_files = [candidates[rel_path] for rel_path in sorted(candidates)]
+        return self._index_files(py_files, known_states, jobs, verify_hashes=False, removed=removed)
+    
+    def _index_files(
+        self,
+        py_files: Iterable[Path],
+        known_states: dict[str, FileState],
+        jobs: int,
+        verify_hashes: bool,
+        removed: Iterable[str] = (),
+        prune: bool = False,
+        blob_ids: Optional[dict[str, str]] = None,
+        reuse_parses: bool = True,
+        refs: Optional[bool] = None
+    ) -> dict:
+        """
+        Index the given files, prune removed ones and refresh the graph.
         
+        Args:
+            py_files: Absolute paths of the files to check
+            known_states: Cached state of (at least) those files
+            jobs: Number of worker processes for reading and parsing
+            verify_hashes: Hash files even when their stat metadata is unchanged
+            removed: Cached paths to delete from the index
+            prune: Also delete every cached path not among py_files
+            blob_ids: Git blob ids of clean tracked files
+            reuse_parses: Look up new content in the blob store before parsing
+            refs: Extract references (default: the index setting)
+        
+        Returns:
+            Statistics about the indexing process
+        """
         stats = {
-            'total_files': len(py_files),
+            'total_files': 0,
             'parsed_files': 0,
             'cached_files': 0,
             'failed_files': 0,
+            'reused_files': 0,
+            'pruned_files': 0,
             'total_symbols': 0,
             'total_imports': 0
         }
         
+        # Files modified this recently may change again within the same
+        # mtime tick, so their stat metadata is not trusted next time
+        racy_after_ns = time.time_ns() - RACY_WINDOW_NS
+        
+        pending_files = []
+        pending_hashes = []
+        pending_stats = []
+        pending_blobs = []
+        adopted_blobs = []
+        seen = set()
+        
+        # Files may come lazily from the walker
         for py_file in py_files:
+            stats['total_files'] += 1
+            rel_path = self._relative_path(py_file)
+            seen.add(rel_path)
+            state = known_states.get(rel_path)
+            blob_id = blob_ids.get(rel_path) if blob_ids else None
+            if state and not verify_hashes and blob_id is not None and state.blob_id == blob_id:
+                # Clean in git and unchanged since it was parsed: no I/O at all
+                self._count_cached(stats, state)
+                continue
+            
             try:
-                # Check if file is cached and unchanged
-                if not force:
-                    # Get current file hash (try multiple encodings)
-                    content = None
-                    for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'gbk']:
-                        try:
-                            content = py_file.read_text(encoding=encoding)
-                            break
-                        except (UnicodeDecodeError, LookupError):
-                            continue
-                    
-                    if content is None:
-                        # Skip this file if we can't read it
-                        stats['failed_files'] += 1
-                        continue
-                    
-                    current_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-                    
-                    # Check cache
-                    rel_path = str(py_file.relative_to(self.project_root))
-                    if self.cache.is_file_cached(rel_path, current_hash):
-                        stats['cached_files'] += 1
-                        cached_file = self.cache.get_file(rel_path)
-                        if cached_file:
-                            stats['total_symbols'] += len(cached_file.symbols)
-                            stats['total_imports'] += len(cached_file.imports)
-                        continue
-                
-                # Parse file
-                file_info = self.parser.parse_file(py_file, self.project_root)
-                
-                if file_info:
-                    # Save to cache
-                    self.cache.save_file(file_info)
-                    stats['parsed_files'] += 1
-                    stats['total_symbols'] += len(file_info.symbols)
-                    stats['total_imports'] += len(file_info.imports)
-                else:
-                    stats['failed_files'] += 1
-                    
-            except Exception as e:
+                current_stat = _stat_key(py_file, racy_after_ns)
+            except OSError as e:
                 print(f"⚠️  Error indexing {py_file}: {e}")
                 stats['failed_files'] += 1
+                continue
+            
+            if (state and not verify_hashes and current_stat is not None
+                    and state.stat_key == current_stat):
+                # Unchanged on disk: skip without reading or hashing
+                self._count_cached(stats, state)
+                if blob_id is not None:
+                    # Parsed content is this blob: no stat needed next time
+                    adopted_blobs.append((rel_path, current_stat, blob_id))
+                continue
+            
+            # Hash stored in the cache (None = not cached)
+            pending_files.append(py_file)
+            pending_hashes.append(state.hash if state else None)
+            pending_stats.append(current_stat)
+            # A file changing right now may no longer match the blob git saw
+            pending_blobs.append(blob_id if current_stat is not None else None)
+        
+        # Workers only read, hash and parse; this process is the single writer
+        results = zip(
+            self._ingest(pending_files, pending_hashes, jobs, reuse_parses, refs),
+            pending_stats,
+            pending_blobs
+        )
+        while True:
+            # One transaction per WRITE_BATCH_SIZE files
+            chunk = list(islice(results, WRITE_BATCH_SIZE))
+            if not chunk:
+                break
+            new_parses = []
+            with self.cache.batch():
+                for (status, rel_path, file_info), current_stat, blob_id in chunk:
+                    if status == 'cached':
+                        # Same content, new stat (e.g. touched): remember the stat
+                        self.cache.update_file_stat(rel_path, current_stat, blob_id=blob_id)
+                        self._count_cached(stats, known_states[rel_path])
+                    elif status in ('parsed', 'reused'):
+                        # Save to cache
+                        self.cache.save_file(file_info, stat_key=current_stat, blob_id=blob_id)
+                        if status == 'parsed':
+                            stats['parsed_files'] += 1
+                            new_parses.append(file_info)
+                        else:
+                            stats['reused_files'] += 1
+                        stats['total_symbols'] += len(file_info.symbols)
+                        stats['total_imports'] += len(file_info.imports)
+                    else:
+                        stats['failed_files'] += 1
+            if self.blob_store is not None and new_parses:
+                self.blob_store.put_many(new_parses)
+        
+        if adopted_blobs:
+            with self.cache.batch():
+                for rel_path, current_stat, blob_id in adopted_blobs:
+                    self.cache.update_file_stat(rel_path, current_stat, blob_id=blob_id)
+        
+        removed = list(removed)
+        if prune:
+            removed.extend(rel_path for rel_path in self.cache.list_paths() if rel_path not in seen)
+        if removed:
+            stats['pruned_files'] = self.cache.delete_files(removed)
+        
+        # Resolve edges and rank once here, so maps can read stored scores
+        self._sync_graph()
         
         return stats
     
+    @staticmethod
+    def _count_cached(stats: dict, state: FileState):
+        """Add an unchanged file to the indexing statistics."""
+        stats['cached_files'] += 1
+        stats['total_symbols'] += state.symbol_count
+        stats['total_imports'] += state.import_count
+    
+    def _ingest(
+        self,
+        py_files: list[Path],
+        known_hashes: list[Optional[str]],
+        jobs: int,
+        reuse_parses: bool = True,
+        refs: Optional[bool] = None
+    ):
+        """Yield ingest results in input order, serially or from a process pool."""
+        if jobs <= 0:
+            jobs = os.cpu_count() or 1
+        jobs = min(jobs, len(py_files))
+        store = self.blob_store if reuse_parses else None
+        if refs is None:
+            refs = self.cache.refs_enabled()
+        
+        if jobs <= 1:
+            for py_file, known_hash in zip(py_files, known_hashes):
+                yield _ingest_file(py_file, self.project_root, known_hash, store, refs)
+            return
+        
+        # Large chunks keep IPC overhead low; results still come back in order
+        chunksize = max(1, min(256, len(py_files) // (jobs * 4)))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(
+                _ingest_file,
+                py_files,
+                repeat(self.project_root),
+                known_hashes,
+                # Workers open their own connection to the store
+                repeat(store.path if store is not None else None),
+                repeat(refs),
+                chunksize=chunksize
+            )
+    
+    def get_importance(self) -> dict[str, float]:
+        """
+        Get the importance score of every indexed file.
+        
+        Scores are stored in the index together with the resolved edges and
+        the index generation they were computed from. When files changed
+        since, only their imports are re-resolved and PageRank restarts from
+        the stored scores, unless the edge change set is large.
+        
+        Returns:
+            Mapping of file path to importance score
+        """
+        generation = self.cache.get_generation()
+        if self._importance is None or self._importance[0] != generation:
+            self._sync_graph()
+        if self._importance is None or self._importance[0] != generation:
+            self._importance = (generation, self.cache.get_scores())
+        return self._importance[1]
+    
+    def get_focused_importance(self, focus: Iterable[str]) -> dict[str, float]:
+        """
+        Rank files with a PageRank personalized to a focus set.
+        
+        Random walks restart only at the focus files, so they and the files
+        they (transitively) import rank first, and files out of their reach
+        score 0. The stored graph is reused; nothing is re-resolved.
+        
+        Args:
+            focus: File paths (absolute or project-relative), directories,
+                or symbol names ('name' or 'Class.name')
+        
+        Returns:
+            Mapping of file path to focused importance score
+        
+        Raises:
+            ValueError: If no focus entry matches an indexed file or symbol
+        """
+        focus = list(focus)
+        focus_files = self._match_files(focus, symbols=True)
+        if not focus_files:
+            raise ValueError(f"No indexed file or symbol matches the focus: {', '.join(map(str, focus))}")
+        
+        graph = self._stored_graph()
+        return graph.compute_importance(personalization=dict.fromkeys(focus_files, 1.0))
+    
+    def impacted(
+        self,
+        paths: Iterable[Union[str, Path]],
+        depth: Optional[int] = None
+    ) -> dict[str, int]:
+        """
+        Find every file that (transitively) imports the given files.
+        
+        Runs a breadth-first search over the reverse of the stored graph.
+        Results are memoized per index generation, so repeated queries (e.g.
+        CI test selection for the same change set) are dictionary lookups.
+        
+        Args:
+            paths: Changed files or directories (absolute or
+                project-relative); paths that are not indexed are ignored
+            depth: Maximum number of import hops (default: unlimited)
+        
+        Returns:
+            Mapping of file path to hop distance, including the given
+            files themselves at distance 0
+        """
+        sources = frozenset(self._match_files(paths, symbols=False))
+        graph = self._stored_graph()
+        
+        key = (sources, depth)
+        if key not in self._impacted:
+            if len(self._impacted) >= MAX_CACHED_IMPACTS:
+                self._impacted = {}
+            self._impacted[key] = graph.get_transitive_dependents(sources, depth=depth)
+        return dict(self._impacted[key])
+    
+    def _stored_graph(self) -> DependencyGraph:
+        """Get the dependency graph of the stored edges (cached per generation)."""
+        importance = self.get_importance()
+        generation = self.cache.get_generation()
+        if self._graph is None or self._graph[0] != generation:
+            graph = DependencyGraph()
+            for path in importance:
+                graph.add_node(path)
+            for src, dst in self.cache.get_edges():
+                graph.add_edge(src, dst)
+            self._graph = (generation, graph)
+            self._impacted = {}
+        return self._graph[1]
+    
+    def _match_files(self, items: Iterable[Union[str, Path]], symbols: bool) -> set[str]:
+        """
+        Map file paths, directories and (optionally) symbol names to
+        indexed file paths; entries matching nothing are skipped.
+        """
+        known = self.get_importance()
+        files = set()
+        for item in items:
+            item = str(item)
+            path = Path(item)
+            if path.is_absolute():
+                try:
+                    item = path.relative_to(self.project_root).as_posix()
+                except ValueError:
+                    continue
+            
+            if item in known:
+                files.add(item)
+                continue
+            
+            # Directory: every indexed file below it
+            directory = item.strip("/")
+            under = self.cache.list_paths(directory + "/" if directory not in ("", ".") else "")
+            if under:
+                files.update(under)
+                continue
+            
+            if symbols:
+                # Symbol: the files defining it
+                matches = self.cache.find_symbol(item)
+                if not matches and "." in item:
+                    parent, _, name = item.rpartition(".")
+                    matches = [s for s in self.cache.find_symbol(name) if s.parent == parent]
+                files.update(symbol.file_path for symbol in matches)
+        
+        return files
+    
+    def _sync_graph(self):
+        """
+        Bring the stored edges and scores up to the index generation.
+        
+        Scores are only loaded when they have to be recomputed; the cached
+        scores carry over when the update leaves them unchanged.
+        """
+        generation = self.cache.get_generation()
+        graph_generation = self.cache.get_graph_generation()
+        if graph_generation == generation:
+            return
+        
+        importance = self._update_graph(generation, graph_generation)
+        if importance is not None:
+            self._importance = (generation, importance)
+        elif self._importance is not None and self._importance[0] == graph_generation:
+            self._importance = (generation, self._importance[1])
+    
+    def _update_graph(self, generation: int, graph_generation: int) -> Optional[dict[str, float]]:
+        """
+        Update the stored graph from graph_generation to generation.
+        
+        Returns:
+            The new scores, or None if the stored ones are still valid
+        """
+        if graph_generation < 0:
+            return self._rank_full(generation)
+        
+        changed, removed = self.cache.get_changes_since(graph_generation)
+        builder = DependencyBuilder(self.project_root)
+        
+        if not removed and len(self.cache.get_scores(changed)) == len(changed):
+            # Same files: only the changed files' own imports need resolving,
+            # against just the files those imports can name
+            imports = self.cache.get_imports(changed)
+            builder.add_files(self.cache.find_module_files(builder.import_targets(imports)))
+            resolved = {
+                (path, dst)
+                for path, file_imports in imports.items()
+                for dst in builder.resolve_imports(path, file_imports)
+            }
+            stale = set(self.cache.get_edges(sources=changed))
+            if resolved == stale:
+                # Content changed but the graph did not: scores stay valid
+                self.cache.update_graph([], [], None, generation)
+                return None
+            
+            previous = self.cache.get_scores()
+            old_edges = set(self.cache.get_edges())
+            new_edges = (old_edges - stale) | resolved
+            graph = DependencyGraph()
+            for path in previous:
+                graph.add_node(path)
+            for src, dst in new_edges:
+                graph.add_edge(src, dst)
+        else:
+            # New or deleted modules can change how any import resolves
+            previous = self.cache.get_scores()
+            if not previous:
+                return self._rank_full(generation)
+            old_edges = set(self.cache.get_edges())
+            graph = builder.build_from_imports(self.cache.get_imports())
+            new_edges = {(src, dst) for src, targets in graph.edges.items() for dst in targets}
+        
+        added_edges = new_edges - old_edges
+        removed_edges = old_edges - new_edges
+        
+        if not added_edges and not removed_edges and graph.nodes == previous.keys():
+            self.cache.update_graph([], [], None, generation)
+            return None
+        
+        if len(added_edges) + len(removed_edges) > INCREMENTAL_MAX_EDGE_CHANGE * max(1, len(old_edges)):
+            importance = graph.compute_importance()
+        else:
+            importance = graph.compute_importance(initial=previous)
+        
+        self.cache.update_graph(added_edges, removed_edges, importance, generation)
+        return importance
+    
+    def _rank_full(self, generation: int) -> dict[str, float]:
+        """Resolve every import, rank from scratch and store the result."""
+        builder = DependencyBuilder(self.project_root)
+        graph = builder.build_from_imports(self.cache.get_imports())
+        importance = graph.compute_importance()
+        
+        edges = [(src, dst) for src, targets in graph.edges.items() for dst in targets]
+        self.cache.save_graph(edges, importance, generation)
+        return importance
+    
+    def _relative_path(self, py_file: Path) -> str:
+        """Convert an absolute file path to the cache key used for it."""
+        return str(py_file.relative_to(self.project_root))
+    
     def generate_map(
         self,
-        top_percent: float = 0.2,
+        top_percent: Optional[float] = None,
         max_symbols_per_file: int = 50,
-        format: str = 'text'
+        format: str = 'text',
+        max_tokens: Optional[int] = None,
+        token_counter: Optional[Callable[[str], int]] = None,
+        focus: Optional[Iterable[str]] = None
     ) -> str:
         """
         Generate repository map.
         
         Args:
-            top_percent: Percentage of top files to include (0.0-1.0)
-            max_symbols_per_file: Maximum symbols to show per file
+            top_percent: Percentage of top files to include (0.0-1.0;
+                default 0.2, or 1.0 when a token budget is given)
+            max_symbols_per_file: Maximum symbols to show per file; the ones
+                other files use most are kept
             format: Output format ('text' or 'json')
+            max_tokens: Token budget for the whole map. Detail is reduced
+                (signatures -> names only -> file headers only), starting
+                with the least important files, before files are dropped
+            token_counter: Function counting the tokens in a string
+                (default: characters / 4); results are cached
+            focus: Files, directories or symbols being worked on. Files are
+                ranked by PageRank personalized to them instead of globally;
+                files they cannot reach (such as their importers) follow in
+                global order
         
         Returns:
             Repository map as string
         """
-        # Get all files from cache
-        all_files = self.cache.get_all_files()
+        # Rank from the stored scores; no symbols are loaded yet
+        importance = self.get_importance()
         
-        if not all_files:
+        if not importance:
             return "No files indexed. Run 'code-compass index' first."
+        total_files = len(importance)
         
-        # Build dependency graph
-        builder = DependencyBuilder(self.project_root)
-        graph = builder.build(all_files)
+        if top_percent is None:
+            top_percent = DEFAULT_TOP_PERCENT if max_tokens is None else 1.0
         
-        # Compute importance
-        importance = graph.compute_importance()
+        # Select top files
+        top_count = min(len(importance), max(1, int(total_files * top_percent)))
+        if focus:
+            # Focused scores first; the global score orders the files the
+            # focus does not reach, which include everything importing it
+            focused = self.get_focused_importance(focus)
+            top_paths = heapq.nlargest(
+                top_count, importance, key=lambda path: (focused[path], importance[path])
+            )
+            top_files = [(path, focused[path]) for path in top_paths]
+        else:
+            top_files = heapq.nlargest(top_count, importance.items(), key=lambda x: x[1])
         
-        # Sort by importance
-        sorted_files = sorted(importance.items(), key=lambda x: x[1], reverse=True)
+        if max_tokens is not None:
+            if not isinstance(token_counter, TokenCounter):
+                token_counter = TokenCounter(token_counter or count_tokens_rough)
+            return self._fit_token_budget(
+                top_files, total_files, max_tokens, max_symbols_per_file, format, token_counter
+            )
         
-        # Select top files
-        top_count = max(1, int(len(all_files) * top_percent))
-        top_files = sorted_files[:top_count]
+        # Load symbols for the selected files only, keeping the most used
+        selected = self.cache.get_files(
+            (path for path, _ in top_files),
+            max_symbols_per_file=max_symbols_per_file
+        )
         
         # Create RepoMap
         repo_map = RepoMap(
             files=[],
-            total_files=len(all_files),
+            total_files=total_files,
             included_files=top_count
         )
         
         for file_path, score in top_files:
-            file_info = next((f for f in all_files if f.path == file_path), None)
+            file_info = selected.get(file_path)
             if file_info:
-                # Limit symbols per file
-                limited_file = FileInfo(
-                    path=file_info.path,
-                    language=file_info.language,
-                    hash=file_info.hash,
-                    size=file_info.size,
-                    symbols=file_info.symbols[:max_symbols_per_file],
-                    imports=file_info.imports
-                )
-                repo_map.files.append((limited_file, score))
+                repo_map.files.append((file_info, score))
+        
+        return _render(repo_map, format)
+    
+    def _fit_token_budget(
+        self,
+        ranked: list[tuple[str, float]],
+        total_files: int,
+        max_tokens: int,
+        max_symbols_per_file: int,
+        format: str,
+        count: TokenCounter
+    ) -> str:
+        """
+        Render the most detailed map of the highest ranked files that fits.
+        
+        Candidate maps form a sequence of decreasing size: starting from
+        full signatures for every file, files are degraded to names only
+        (least important first), then to headers only, then dropped. The
+        per-file cost of each detail level is counted once, as rendered
+        inside the document, so the first map within budget is estimated by
+        binary search over prefix sums. Rendered maps then confirm it,
+        galloping away from the estimate, so only O(log k) maps are rendered
+        when it is off.
+        """
+        def render_file(file_info: FileInfo, score: float) -> str:
+            # A file as it appears in the document, with its separator
+            if format == 'json':
+                entry = json.dumps(RepoMapFormatter.file_to_dict(file_info, score), indent=2)
+                return ",\n    " + entry.replace("\n", "\n    ")
+            return "\n" + RepoMapFormatter.file_to_text(file_info, score)
+        
+        # Header-only costs bound how many files can fit, before loading symbols
+        budget = max_tokens - count(_render(RepoMap([], total_files, len(ranked)), format))
+        candidates = []
+        used = 0
+        for path, score in ranked:
+            used += count(render_file(_file_stub(path), score))
+            if used > budget:
+                break
+            candidates.append((path, score))
+        
+        selected = self.cache.get_files(
+            (path for path, _ in candidates),
+            max_symbols_per_file=max_symbols_per_file
+        )
+        
+        # variants[i][level] is file i rendered at DETAIL_LEVELS[level]
+        variants = []
+        prefix = [[0], [0], [0]]
+        for path, score in candidates:
+            file_info = selected.get(path)
+            if file_info is None:
+                continue
+            levels = tuple(_with_detail(file_info, detail) for detail in DETAIL_LEVELS)
+            variants.append((levels, score))
+            for level, variant in enumerate(levels):
+                prefix[level].append(prefix[level][-1] + count(render_file(variant, score)))
+        
+        k = len(variants)
         
-        # Format output
-        formatter = RepoMapFormatter()
-        if format == 'json':
-            return formatter.to_json(repo_map)
+        def cost(step: int) -> int:
+            return sum(prefix[level][end] - prefix[level][start]
+                       for level, start, end in _detail_plan(step, k))
+        
+        # First (most detailed) step whose estimated cost fits
+        lo, hi = 0, 3 * k
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cost(mid) <= budget:
+                hi = mid
+            else:
+                lo = mid + 1
+        
+        outputs = {}
+        
+        def render(step: int) -> str:
+            if step not in outputs:
+                files = [
+                    (variants[i][0][level], variants[i][1])
+                    for level, start, end in _detail_plan(step, k)
+                    for i in range(start, end)
+                ]
+                outputs[step] = _render(RepoMap(files, total_files, len(files)), format)
+            return outputs[step]
+        
+        def fits(step: int) -> bool:
+            return count(render(step)) <= max_tokens
+        
+        # Bracket the first fitting step as (bad, good] by galloping from the
+        # estimate, then bisect. The last step (no files) is the fallback.
+        last = 3 * k
+        bad, good, stride = -1, last, 1
+        if fits(lo):
+            good = lo
+            while good - stride > bad and fits(good - stride):
+                good -= stride
+                stride *= 2
+            bad = max(bad, good - stride)
         else:
-            return formatter.to_text(repo_map)
+            bad = lo
+            while bad + stride < last and not fits(bad + stride):
+                bad += stride
+                stride *= 2
+            good = min(last, bad + stride)
+        while good - bad > 1:
+            mid = (bad + good) // 2
+            if fits(mid):
+                good = mid
+            else:
+                bad = mid
+        return render(good)
     
     def find_symbol(self, name: str, fuzzy: bool = False) -> list[tuple[FileInfo, str]]:
         """
@@ -197,6 +892,94 @@ class MapGenerator:
         
         return results
     
+    def find_symbols(self, name: str, fuzzy: bool = False) -> list[Symbol]:
+        """
+        Find symbols by name without loading their files.
+        
+        Args:
+            name: Symbol name to search for
+            fuzzy: If True, use ranked substring matching
+        """
+        if fuzzy:
+            return self.cache.search_symbols(name)
+        return self.cache.find_symbol(name)
+    
+    def find_references(self, name: str) -> list[Reference]:
+        """
+        Find where a name is used, from the stored references.
+        
+        A dotted name such as 'CacheManager.save_file' is looked up by its
+        last part: receivers are not type-checked, so every `x.save_file`
+        counts.
+        
+        Args:
+            name: Name or dotted name to look for
+        
+        Raises:
+            ValueError: If references are not enabled for this index
+        """
+        if not self.cache.refs_enabled():
+            raise ValueError("References are not indexed; run 'code-compass index --refs' first")
+        return self.cache.find_refs(name.rpartition(".")[2])
+    
+    def symbol_at(self, path: Union[str, Path], line: int) -> Optional[Symbol]:
+        """
+        Find the innermost symbol containing a line.
+        
+        Args:
+            path: File path (absolute or project-relative)
+            line: 1-based line number
+        
+        Returns:
+            The method, function or class covering the line, or None
+        """
+        return self.symbols_at([(path, line)])[0]
+    
+    def symbols_at(self, locations: Iterable[tuple[Union[str, Path], int]]) -> list[Optional[Symbol]]:
+        """
+        Find the innermost symbol containing each (path, line) pair.
+        
+        Meant for whole tracebacks and diffs: the symbols of all files
+        involved are loaded in one query and each lookup is a bisection.
+        Per-file lookups are kept until the index changes.
+        
+        Args:
+            locations: (path, line) pairs; paths may be absolute or
+                project-relative
+        
+        Returns:
+            One symbol (or None) per location, in input order
+        """
+        generation = self.cache.get_generation()
+        if generation != self._intervals_generation or len(self._intervals) >= MAX_CACHED_INTERVALS:
+            self._intervals = {}
+            self._intervals_generation = generation
+        
+        queries = []
+        for path, line in locations:
+            path = Path(path)
+            if path.is_absolute():
+                try:
+                    path = path.relative_to(self.project_root)
+                except ValueError:
+                    # Outside the project (e.g. a library frame)
+                    queries.append((None, line))
+                    continue
+            queries.append((path.as_posix(), line))
+        
+        missing = {path for path, _ in queries if path is not None and path not in self._intervals}
+        if missing:
+            files = self.cache.get_files(sorted(missing))
+            for path in missing:
+                file_info = files.get(path)
+                self._intervals[path] = SymbolIntervals(file_info.symbols) if file_info else None
+        
+        results = []
+        for path, line in queries:
+            intervals = self._intervals.get(path) if path is not None else None
+            results.append(intervals.at(line) if intervals is not None else None)
+        return results
+    
     def get_stats(self) -> dict:
         """Get indexing statistics."""
         return self.cache.get_stats()
@@ -206,5 +989,128 @@ class MapGenerator:
         self.cache.clear()
     
     def close(self):
-        """Close cache connection."""
+        """Close cache (and blob store) connections."""
         self.cache.close()
+        if self.blob_store is not None:
+            self.blob_store.close()
+
+
+def _render(repo_map: RepoMap, format: str) -> str:
+    """Format a RepoMap as text or JSON."""
+    formatter = RepoMapFormatter()
+    if format == 'json':
+        return formatter.to_json(repo_map)
+    return formatter.to_text(repo_map)
+
+
+def _file_stub(path: str) -> FileInfo:
+    """A symbol-less FileInfo, enough to render a file header."""
+    return FileInfo(path=path, language="", hash="", size=0, symbols=[], imports=[])
+
+
+def _with_detail(file_info: FileInfo, detail: str) -> FileInfo:
+    """Copy of a file reduced to a map detail level."""
+    if detail == DETAIL_FILE:
+        return replace(file_info, symbols=[])
+    if detail == DETAIL_NAME:
+        return replace(file_info, symbols=[
+            replace(symbol, signature=SymbolFormatter.to_short_signature(symbol))
+            for symbol in file_info.symbols
+        ])
+    return file_info
+
+
+def _detail_plan(step: int, k: int) -> list[tuple[int, int, int]]:
+    """
+    Detail levels of the k top files at a step of the budget search.
+    
+    Steps 0..k degrade files to names only from the least important up,
+    steps k..2k degrade them to headers only, and steps 2k..3k drop them.
+    
+    Returns:
+        (level index, start, end) ranges over the ranked files
+    """
+    if step <= k:
+        return [(0, 0, k - step), (1, k - step, k)]
+    if step <= 2 * k:
+        return [(1, 0, 2 * k - step), (2, 2 * k - step, k)]
+    return [(2, 0, 3 * k - step)]
+
+
+def _stat_key(py_file: Path, racy_after_ns: int) -> Optional[tuple]:
+    """
+    Get the (mtime_ns, size, inode) tuple used to skip unchanged files.
+    
+    Returns None for files modified too recently to trust their mtime.
+    """
+    st = os.stat(py_file)
+    if st.st_mtime_ns >= racy_after_ns:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _ingest_file(
+    py_file: Path,
+    project_root: Path,
+    known_hash: Optional[str],
+    blob_store: Union[BlobStore, Path, None] = None,
+    refs: bool = False
+) -> tuple:
+    """
+    Read, hash and (if changed) parse a single file.
+    
+    The file is read once; the raw bytes are hashed once and, when the hash
+    differs from the cached one, looked up in the blob store or handed
+    straight to the parser.
+    Defined at module level so it can run in worker processes.
+    
+    Args:
+        py_file: Absolute path to the Python file
+        project_root: Project root directory
+        known_hash: Hash stored in the cache, or None if not cached
+        blob_store: Shared parse store, or its path in worker processes
+        refs: Also collect name and attribute references
+    
+    Returns:
+        Compact (status, rel_path, file_info) tuple where status is
+        'cached', 'parsed', 'reused' (taken from the blob store) or
+        'failed' and file_info is set when parsed or reused
+    """
+    rel_path = str(py_file.relative_to(project_root))
+    try:
+        source = py_file.read_bytes()
+        current_hash = hash_source(source)
+        if current_hash == known_hash:
+            return ('cached', rel_path, None)
+        
+        if blob_store is not None:
+            if not isinstance(blob_store, BlobStore):
+                blob_store = _worker_blob_store(blob_store)
+            file_info = blob_store.get(current_hash, rel_path, refs=refs)
+            if file_info is not None:
+                return ('reused', rel_path, file_info)
+        
+        # Parse file from the bytes already in memory
+        file_info = PythonParser().parse_file(
+            py_file, project_root, source=source, file_hash=current_hash, refs=refs
+        )
+        if file_info:
+            return ('parsed', rel_path, file_info)
+        return ('failed', rel_path, None)
+    
+    except Exception as e:
+        print(f"⚠️  Error indexing {py_file}: {e}")
+        return ('failed', rel_path, None)
+
+
+# Blob store connections opened by worker processes, keyed by (pid, path)
+# so a forked worker never reuses its parent's connection
+_worker_blob_stores: dict[tuple[int, Path], BlobStore] = {}
+
+
+def _worker_blob_store(path: Path) -> BlobStore:
+    """Get this process's connection to a blob store."""
+    key = (os.getpid(), path)
+    if key not in _worker_blob_stores:
+        _worker_blob_stores[key] = BlobStore(path)
+    return _worker_blob_stores[key]
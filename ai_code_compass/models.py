@@ -22,6 +22,16 @@ class Symbol:
     line_end: int               # Ending line number
     signature: str              # Full signature (with params and return type)
     parent: Optional[str]       # Parent symbol (class name for methods)
+    content_hash: Optional[str] = None  # Hash of the signature and source span
+
+
+@dataclass
+class Reference:
+    """A use of a name or attribute in a source file."""
+    name: str                   # Referenced name (last part of an attribute chain)
+    file_path: str              # File path (relative to project root)
+    line: int                   # Line number of the reference
+    expression: str             # Dotted expression as written (e.g. self.cache.save_file)
 
 
 @dataclass
@@ -33,12 +43,30 @@ class FileInfo:
     size: int                   # File size in bytes
     symbols: list[Symbol]       # All symbols in this file
     imports: list[dict]         # List of imported modules with metadata (module, level, type)
+    refs: Optional[list[Reference]] = None  # Name and attribute references (None = not extracted)
     
     def is_changed(self, current_hash: str) -> bool:
         """Check if file has changed since last index."""
         return self.hash != current_hash
 
 
+@dataclass
+class FileState:
+    """Change-detection state of an indexed file."""
+    hash: str                           # Content hash stored at last parse
+    mtime_ns: Optional[int]             # Modification time (ns) when last seen
+    size: Optional[int]                 # On-disk size in bytes when last seen
+    inode: Optional[int]                # Inode number when last seen
+    symbol_count: int = 0               # Number of cached symbols
+    import_count: int = 0               # Number of cached imports
+    blob_id: Optional[str] = None       # Git blob id of the parsed content, if known
+    
+    @property
+    def stat_key(self) -> tuple:
+        """(mtime_ns, size, inode) tuple comparable with a fresh stat."""
+        return (self.mtime_ns, self.size, self.inode)
+
+
 @dataclass
 class RepoMap:
     """Generated repository map."""
@@ -5,45 +5,94 @@ import hashlib
 from pathlib import Path
 from typing import Optional
 
-from ..models import FileInfo, Symbol, SymbolType
+from ..models import FileInfo, Reference, Symbol, SymbolType
+
+
+# Encodings tried, in order, when decoding source files
+ENCODINGS = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'gbk']
+
+# Names not recorded as references (method receivers)
+IGNORED_REFS = frozenset({'self', 'cls'})
+
+
+def hash_source(source: bytes) -> str:
+    """Compute the content hash of raw file bytes."""
+    return hashlib.sha256(source).hexdigest()
+
+
+def hash_symbol(signature: str, span: list[str]) -> str:
+    """
+    Compute the content hash of a symbol from its signature and source lines.
+    
+    The line numbers are not part of the hash, so a symbol that only moved
+    keeps its hash.
+    """
+    digest = hashlib.blake2b(signature.encode(), digest_size=8)
+    for line in span:
+        digest.update(b"\n")
+        digest.update(line.encode(errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def decode_source(source: bytes) -> Optional[str]:
+    """
+    Decode raw file bytes, trying multiple encodings.
+    
+    Returns:
+        Decoded text without BOM, or None if no encoding works
+    """
+    for encoding in ENCODINGS:
+        try:
+            content = source.decode(encoding)
+            break
+        except (UnicodeDecodeError, LookupError):
+            continue
+    else:
+        return None
+    
+    # Remove BOM if present
+    if content.startswith('\ufeff'):
+        content = content[1:]
+    return content
 
 
 class PythonParser:
     """Parser for Python source files."""
     
-    def parse_file(self, file_path: Path, project_root: Path) -> Optional[FileInfo]:
+    def parse_file(
+        self,
+        file_path: Path,
+        project_root: Path,
+        source: Optional[bytes] = None,
+        file_hash: Optional[str] = None,
+        refs: bool = False
+    ) -> Optional[FileInfo]:
         """
         Parse a single Python file.
         
         Args:
             file_path: Absolute path to the Python file
             project_root: Project root directory
+            source: Raw file content if already read (avoids a second read)
+            file_hash: Hash of source if already computed
+            refs: Also collect name and attribute references (a second,
+                full pass over the tree, function bodies included)
             
         Returns:
             FileInfo object or None if parsing fails
         """
         try:
-            # Read file content with multiple encoding attempts
-            content = None
-            encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'gbk']
-            
-            for encoding in encodings:
-                try:
-                    content = file_path.read_text(encoding=encoding)
-                    break
-                except (UnicodeDecodeError, LookupError):
-                    continue
+            if source is None:
+                source = file_path.read_bytes()
+            if file_hash is None:
+                file_hash = hash_source(source)
             
+            # Decode file content with multiple encoding attempts
+            content = decode_source(source)
             if content is None:
                 print(f"⚠️  Could not decode {file_path} with any supported encoding")
                 return None
             
-            # Remove BOM if present
-            if content.startswith('\ufeff'):
-                content = content[1:]
-            
-            file_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-            
             # Parse AST
             try:
                 tree = ast.parse(content, filename=str(file_path))
@@ -54,22 +103,25 @@ class PythonParser:
                     path=str(file_path.relative_to(project_root)),
                     language="python",
                     hash=file_hash,
-                    size=len(content),
+                    size=len(source),
                     symbols=[],
-                    imports=[]
+                    imports=[],
+                    refs=[] if refs else None
                 )
             
             # Extract symbols and imports
-            visitor = PythonVisitor(file_path, project_root)
+            visitor = PythonVisitor(file_path, project_root, content.split("\n"))
             visitor.visit(tree)
             
+            rel_path = str(file_path.relative_to(project_root))
             return FileInfo(
-                path=str(file_path.relative_to(project_root)),
+                path=rel_path,
                 language="python",
                 hash=file_hash,
-                size=len(content),
+                size=len(source),
                 symbols=visitor.symbols,
-                imports=visitor.imports
+                imports=visitor.imports,
+                refs=collect_references(tree, rel_path) if refs else None
             )
             
         except Exception as e:
@@ -77,12 +129,57 @@ class PythonParser:
             return None
 
 
+def collect_references(tree: ast.AST, file_path: str) -> list[Reference]:
+    """
+    Collect every name and attribute read in a module.
+    
+    `a.b.c` yields references to `c`, `b` and `a` (each with the dotted
+    expression up to it), and `from m import x` a reference to `x`.
+    Duplicates on the same line are dropped.
+    
+    Args:
+        tree: Parsed module
+        file_path: Path to put into the references (relative to project root)
+    """
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load) and node.id not in IGNORED_REFS:
+                found.append((node.id, node.lineno, node.id))
+        elif isinstance(node, ast.Attribute):
+            if isinstance(node.ctx, ast.Load):
+                found.append((node.attr, node.lineno, _dotted(node)))
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * (node.level or 0) + (node.module or "")
+            separator = "" if module.endswith(".") else "."
+            for alias in node.names:
+                if alias.name != "*":
+                    found.append((alias.name, node.lineno, module + separator + alias.name))
+    
+    return [
+        Reference(name=name, file_path=file_path, line=line, expression=expression)
+        for name, line, expression in sorted(set(found), key=lambda ref: (ref[1], ref[0], ref[2]))
+    ]
+
+
+def _dotted(node: ast.AST) -> str:
+    """Render a Name/Attribute chain; other receivers become `(...)`."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    parts.append(node.id if isinstance(node, ast.Name) else "(...)")
+    return ".".join(reversed(parts))
+
+
 class PythonVisitor(ast.NodeVisitor):
     """AST visitor to extract symbols and imports."""
     
-    def __init__(self, file_path: Path, project_root: Path):
+    def __init__(self, file_path: Path, project_root: Path, lines: Optional[list[str]] = None):
         self.file_path = file_path
         self.project_root = project_root
+        # Source lines for per-symbol hashes (None = symbols are not hashed)
+        self.lines = lines
         self.symbols: list[Symbol] = []
         self.imports: list[str] = []
         self.current_class: Optional[str] = None
@@ -108,7 +205,8 @@ class PythonVisitor(ast.NodeVisitor):
             line_start=node.lineno,
             line_end=node.end_lineno or node.lineno,
             signature=signature,
-            parent=None
+            parent=None,
+            content_hash=self._hash_span(signature, node)
         )
         self.symbols.append(symbol)
         
@@ -184,12 +282,21 @@ class PythonVisitor(ast.NodeVisitor):
             line_start=node.lineno,
             line_end=node.end_lineno or node.lineno,
             signature=signature,
-            parent=self.current_class
+            parent=self.current_class,
+            content_hash=self._hash_span(signature, node)
         )
         self.symbols.append(symbol)
         
         # Don't traverse function body (we don't need it)
     
+    def _hash_span(self, signature: str, node: ast.AST) -> Optional[str]:
+        """Hash a definition's signature and source lines (decorators included)."""
+        if self.lines is None:
+            return None
+        start = min([node.lineno] + [dec.lineno for dec in node.decorator_list])
+        end = node.end_lineno or node.lineno
+        return hash_symbol(signature, self.lines[start - 1:end])
+    
     def visit_Import(self, node: ast.Import):
         """Visit import statement."""
         for alias in node.names:
@@ -211,7 +318,8 @@ class PythonVisitor(ast.NodeVisitor):
         self.imports.append({
             'module': module,
             'level': level,
-            'type': 'from'
+            'type': 'from',
+            'names': [alias.name for alias in node.names if alias.name != '*']
         })
     
     def _get_name(self, node) -> str:
@@ -0,0 +1,46 @@
+"""Token counting for budgeted repository maps."""
+
+from typing import Callable
+
+
+# Map detail levels, from most to least detailed
+DETAIL_SIGNATURE = "signature"      # Full symbol signatures
+DETAIL_NAME = "name"                # Symbol kind and name only
+DETAIL_FILE = "file"                # File header only
+DETAIL_LEVELS = (DETAIL_SIGNATURE, DETAIL_NAME, DETAIL_FILE)
+
+
+def count_tokens_rough(text: str) -> int:
+    """Rough token count (1 token ≈ 4 characters for English)."""
+    return len(text) // 4
+
+
+class TokenCounter:
+    """
+    Caching wrapper around a token counting function.
+    
+    Map fitting counts the same lines many times, so results are memoized
+    per string. Any callable taking a string and returning an int can be
+    plugged in, e.g. a tiktoken encoder's ``lambda s: len(enc.encode(s))``.
+    """
+    
+    def __init__(self, count: Callable[[str], int] = count_tokens_rough, max_entries: int = 100_000):
+        """
+        Initialize counter.
+        
+        Args:
+            count: Function returning the number of tokens in a string
+            max_entries: Cache size limit (the cache is reset when full)
+        """
+        self.count = count
+        self.max_entries = max_entries
+        self._cache: dict[str, int] = {}
+    
+    def __call__(self, text: str) -> int:
+        """Count the tokens in text."""
+        tokens = self._cache.get(text)
+        if tokens is None:
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+            tokens = self._cache[text] = self.count(text)
+        return tokens
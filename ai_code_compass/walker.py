@@ -0,0 +1,448 @@
+"""Fast source file discovery with directory pruning."""
+
+import fnmatch
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+# Directories that never contain project sources worth indexing
+DEFAULT_EXCLUDE_DIRS = {
+    ".git", ".hg", ".svn",
+    ".venv",
+    "node_modules", "__pycache__",
+    ".tox", ".nox", ".eggs",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    ".code-compass",
+}
+
+# Build output and environments, excluded only at the project root: nested
+# directories with these names can be real packages (virtualenvs elsewhere
+# are recognised by their pyvenv.cfg)
+ROOT_EXCLUDE_DIRS = {"build", "dist", "venv", ".env", "site-packages"}
+
+# Glob patterns for excluded directory names
+DEFAULT_EXCLUDE_GLOBS = ["*.egg-info"]
+
+
+class IgnoreRule:
+    """A single compiled .gitignore-style pattern."""
+    
+    def __init__(self, base: str, regex: re.Pattern, negate: bool, dir_only: bool):
+        self.base = base            # Directory the pattern is relative to ('' or 'a/b/')
+        self.regex = regex          # Compiled pattern, matched against the relative path
+        self.negate = negate        # '!pattern' re-includes a path
+        self.dir_only = dir_only    # 'pattern/' only matches directories
+    
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """Check whether the rule applies to a project-relative path."""
+        if self.dir_only and not is_dir:
+            return False
+        if not rel_path.startswith(self.base):
+            return False
+        return self.regex.fullmatch(rel_path[len(self.base):]) is not None
+
+
+def compile_pattern(pattern: str, base: str = "") -> Optional[IgnoreRule]:
+    """
+    Compile a .gitignore-style pattern.
+    
+    Supports negation (!), directory-only patterns (trailing /), anchoring
+    (leading or inner /), *, ?, [...] and ** wildcards.
+    
+    Args:
+        pattern: Pattern line (without trailing newline)
+        base: Directory the pattern is relative to ('' or ending with '/')
+    
+    Returns:
+        IgnoreRule or None for blank lines and comments
+    """
+    pattern = pattern.rstrip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    
+    negate = False
+    if pattern.startswith("!"):
+        negate = True
+        pattern = pattern[1:]
+    elif pattern.startswith("\\"):
+        # Escaped leading '#' or '!'
+        pattern = pattern[1:]
+    
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    
+    # A slash anywhere but the end anchors the pattern to its base directory
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    
+    regex = ""
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 2] == "**":
+                if pattern[i + 2:i + 3] == "/":
+                    # '**/' matches zero or more directories
+                    regex += "(?:.*/)?"
+                    i += 3
+                else:
+                    regex += ".*"
+                    i += 2
+                continue
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(c)
+            else:
+                chars = pattern[i + 1:end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += "[" + chars.replace("\\", "\\\\") + "]"
+                i = end + 1
+                continue
+        elif c == "\\" and i + 1 < n:
+            regex += re.escape(pattern[i + 1])
+            i += 2
+            continue
+        else:
+            regex += re.escape(c)
+        i += 1
+    
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    
+    return IgnoreRule(base, re.compile(regex), negate, dir_only)
+
+
+def literal_dirs(patterns: Iterable[str]) -> set[str]:
+    """
+    Get the directories anchored patterns spell out before any wildcard.
+    
+    'src/build/**' names 'src' and 'src/build'; unanchored patterns such
+    as '*.py' or 'build/' name nothing.
+    """
+    dirs = set()
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith(("#", "!")):
+            continue
+        pattern = pattern.rstrip("/")
+        if "/" not in pattern:
+            continue
+        literal = re.split(r"[*?\[\\]", pattern.lstrip("/"))[0]
+        parts = literal.split("/")
+        if literal != pattern.lstrip("/"):
+            # The last part runs into a wildcard
+            parts = parts[:-1]
+        for i in range(1, len(parts) + 1):
+            if parts[i - 1]:
+                dirs.add("/".join(parts[:i]))
+    return dirs
+
+
+def is_ignored(rules: list[IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    """Apply rules in order; the last matching rule wins."""
+    ignored = False
+    for rule in rules:
+        if rule.matches(rel_path, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def load_project_config(project_root: Path) -> dict:
+    """
+    Read the [tool.code-compass] section of pyproject.toml.
+    
+    Recognised keys:
+        include: Patterns a file (or one of its directories) must match
+        exclude: Additional .gitignore-style patterns to skip
+        gitignore: Whether to honour .gitignore files (default: true)
+    
+    Returns an empty dict if there is no config or no TOML parser.
+    """
+    pyproject = project_root / "pyproject.toml"
+    if tomllib is None or not pyproject.is_file():
+        return {}
+    
+    try:
+        with open(pyproject, "rb") as f:
+            data = tomllib.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read {pyproject}: {e}")
+        return {}
+    
+    return data.get("tool", {}).get("code-compass", {})
+
+
+class FileWalker:
+    """
+    Walk a project tree with os.scandir, pruning excluded directories.
+    
+    Excluded directories (VCS metadata, virtualenvs, caches, build output,
+    anything matched by .gitignore or the pyproject exclude list) are
+    skipped before descending into them. Paths are yielded lazily.
+    
+    Directories an include pattern spells out (e.g. 'src/build/**') are
+    walked even if a default name rule would prune them.
+    """
+    
+    def __init__(
+        self,
+        project_root: Path,
+        extensions: tuple = (".py",),
+        config: Optional[dict] = None
+    ):
+        """
+        Initialize walker.
+        
+        Args:
+            project_root: Root directory of the project
+            extensions: File suffixes to yield
+            config: [tool.code-compass] settings (default: read pyproject.toml)
+        """
+        self.project_root = Path(project_root)
+        self.extensions = tuple(extensions)
+        # A config passed in is kept; otherwise pyproject.toml can be re-read
+        self._config_from_project = config is None
+        self._apply_config(load_project_config(self.project_root) if config is None else config)
+    
+    def reload_config(self):
+        """Re-read [tool.code-compass] from pyproject.toml (unless a config was passed in)."""
+        if self._config_from_project:
+            self._apply_config(load_project_config(self.project_root))
+    
+    def is_config_file(self, rel_path: str) -> bool:
+        """Check whether a project-relative file decides what the walker yields."""
+        if rel_path == "pyproject.toml":
+            return self._config_from_project
+        return self.use_gitignore and rel_path.rpartition("/")[2] == ".gitignore"
+    
+    def _apply_config(self, config: dict):
+        """Compile the [tool.code-compass] settings."""
+        self.use_gitignore = config.get("gitignore", True)
+        
+        self.exclude_rules = [
+            rule for rule in (compile_pattern(p) for p in config.get("exclude", []))
+            if rule
+        ]
+        self.include_rules = [
+            rule for rule in (compile_pattern(p) for p in config.get("include", []))
+            if rule
+        ]
+        self.include_dirs = literal_dirs(config.get("include", []))
+    
+    def __iter__(self) -> Iterator[Path]:
+        """Yield matching files, depth-first in sorted order."""
+        return self.walk()
+    
+    def walk(self, start: Optional[Path] = None, directories: bool = False) -> Iterator[Path]:
+        """
+        Walk the project, or one of its subdirectories.
+        
+        Args:
+            start: Directory to walk (default: the project root); nothing is
+                yielded if it is excluded
+            directories: Yield the visited directories instead of files
+        """
+        rel_dir = ""
+        rules: list[IgnoreRule] = []
+        if start is not None:
+            rel_dir = self._relative(start)
+            rel_dir = rel_dir + "/" if rel_dir else ""
+            rules = self._inherited_rules(rel_dir)
+            if rules is None:
+                return
+        
+        stack = [(os.path.join(self.project_root, rel_dir), rel_dir, rules)]
+        
+        while stack:
+            dir_path, rel_dir, rules = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            
+            names = {entry.name for entry in entries}
+            if rel_dir and "pyvenv.cfg" in names:
+                # Virtualenv with a non-standard name
+                continue
+            
+            if directories:
+                yield Path(dir_path)
+            
+            if self.use_gitignore and ".gitignore" in names:
+                rules = rules + self._read_gitignore(dir_path, rel_dir)
+            
+            subdirs = []
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._is_excluded_dir(entry.name, rel_path, rules):
+                            subdirs.append((entry.path, rel_path + "/", rules))
+                    elif directories:
+                        continue
+                    elif entry.name.endswith(self.extensions) and entry.is_file():
+                        if self._accepts_file(rel_path, rules):
+                            yield Path(entry.path)
+                except OSError:
+                    continue
+            
+            # Reversed so the stack pops directories in sorted order
+            stack.extend(reversed(subdirs))
+    
+    def accepts(self, path: Path) -> bool:
+        """
+        Check whether a full walk would yield a file.
+        
+        Only the file's own directories are inspected, so this is cheap
+        enough to call per changed file. The file itself need not exist.
+        """
+        try:
+            rel_path = self._relative(path)
+        except ValueError:
+            # Outside the project
+            return False
+        if not rel_path.endswith(self.extensions):
+            return False
+        
+        parent = rel_path.rpartition("/")[0]
+        rel_dir = parent + "/" if parent else ""
+        rules = self._inherited_rules(rel_dir)
+        if rules is None:
+            return False
+        
+        dir_path = os.path.join(self.project_root, rel_dir)
+        if rel_dir and os.path.exists(os.path.join(dir_path, "pyvenv.cfg")):
+            return False
+        if self.use_gitignore:
+            rules = rules + self._read_gitignore(dir_path, rel_dir)
+        return self._accepts_file(rel_path, rules)
+    
+    def filter_paths(self, rel_paths: Iterable[str]) -> Iterator[str]:
+        """
+        Yield the project-relative file paths a full walk would yield.
+        
+        Like accepts() for many files at once (e.g. a git file listing):
+        each directory's rules are computed once and nothing is listed.
+        The files themselves are not checked for existence.
+        """
+        dir_rules: dict[str, Optional[list[IgnoreRule]]] = {}
+        for rel_path in rel_paths:
+            if not rel_path.endswith(self.extensions):
+                continue
+            parent = rel_path.rpartition("/")[0]
+            rules = self._dir_rules(parent + "/" if parent else "", dir_rules)
+            if rules is not None and self._accepts_file(rel_path, rules):
+                yield rel_path
+    
+    def _dir_rules(
+        self,
+        rel_dir: str,
+        memo: dict[str, Optional[list[IgnoreRule]]]
+    ) -> Optional[list[IgnoreRule]]:
+        """
+        Rules that apply to the entries of rel_dir ('' or ending with '/'),
+        including its own .gitignore, memoized per directory.
+        
+        Returns:
+            The rules, or None if rel_dir or one of its ancestors is pruned
+        """
+        if rel_dir in memo:
+            return memo[rel_dir]
+        
+        dir_path = os.path.join(self.project_root, rel_dir)
+        if not rel_dir:
+            rules: Optional[list[IgnoreRule]] = []
+        else:
+            parent, _, name = rel_dir[:-1].rpartition("/")
+            rules = self._dir_rules(parent + "/" if parent else "", memo)
+            if rules is not None and (
+                self._is_excluded_dir(name, rel_dir[:-1], rules)
+                or os.path.exists(os.path.join(dir_path, "pyvenv.cfg"))
+            ):
+                rules = None
+        if rules is not None and self.use_gitignore:
+            rules = rules + self._read_gitignore(dir_path, rel_dir)
+        
+        memo[rel_dir] = rules
+        return rules
+    
+    def _relative(self, path: Path) -> str:
+        """Project-relative POSIX path ('' for the root); ValueError if outside."""
+        rel_path = Path(path).relative_to(self.project_root).as_posix()
+        return "" if rel_path == "." else rel_path
+    
+    def _inherited_rules(self, rel_dir: str) -> Optional[list[IgnoreRule]]:
+        """
+        Collect the .gitignore rules that apply to the entries of rel_dir
+        from its ancestors ('' or ending with '/').
+        
+        Returns:
+            The rules, or None if rel_dir or one of its ancestors is pruned
+        """
+        rules: list[IgnoreRule] = []
+        current = ""
+        for name in rel_dir.split("/")[:-1]:
+            dir_path = os.path.join(self.project_root, current)
+            if current and os.path.exists(os.path.join(dir_path, "pyvenv.cfg")):
+                return None
+            if self.use_gitignore:
+                rules = rules + self._read_gitignore(dir_path, current)
+            if self._is_excluded_dir(name, current + name, rules):
+                return None
+            current = current + name + "/"
+        return rules
+    
+    def _read_gitignore(self, dir_path: str, rel_dir: str) -> list[IgnoreRule]:
+        """Compile the .gitignore file of a directory."""
+        try:
+            with open(os.path.join(dir_path, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        return [rule for rule in (compile_pattern(line, rel_dir) for line in lines) if rule]
+    
+    def _is_excluded_dir(self, name: str, rel_path: str, rules: list[IgnoreRule]) -> bool:
+        """Check whether a directory should be pruned."""
+        if rel_path not in self.include_dirs and (
+            name in DEFAULT_EXCLUDE_DIRS
+            or (name in ROOT_EXCLUDE_DIRS and rel_path == name)
+            or any(fnmatch.fnmatch(name, pattern) for pattern in DEFAULT_EXCLUDE_GLOBS)
+        ):
+            return True
+        return is_ignored(rules + self.exclude_rules, rel_path, is_dir=True)
+    
+    def _accepts_file(self, rel_path: str, rules: list[IgnoreRule]) -> bool:
+        """Check ignore and include rules for a file."""
+        if is_ignored(rules + self.exclude_rules, rel_path, is_dir=False):
+            return False
+        if not self.include_rules:
+            return True
+        
+        # Included if the file or any of its parent directories matches
+        parts = rel_path.split("/")
+        candidates = [("/".join(parts[:i]), True) for i in range(1, len(parts))]
+        candidates.append((rel_path, False))
+        return any(
+            rule.matches(path, is_dir)
+            for rule in self.include_rules
+            for path, is_dir in candidates
+        )
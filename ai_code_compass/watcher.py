@@ -0,0 +1,266 @@
+"""Filesystem watchers reporting changed paths in debounced batches."""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ai_code_compass.walker import FileWalker
+
+
+# inotify event bits (<sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Events that can change the set or content of source files
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+# struct inotify_event header: wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher(ABC):
+    """
+    Base class for watchers.
+    
+    Subclasses report project-relative paths of changed files and
+    directories; a directory path means its whole subtree should be
+    synced, and '' means the whole project. A changed .gitignore or
+    pyproject.toml reloads the walker's config and is reported as ''.
+    """
+    
+    def __init__(self, walker: FileWalker):
+        """
+        Initialize watcher.
+        
+        Args:
+            walker: Walker deciding which directories and files are watched
+        """
+        self.walker = walker
+        self.project_root = Path(walker.project_root)
+    
+    @abstractmethod
+    def read_events(self, timeout: Optional[float]) -> set[str]:
+        """
+        Wait for changes.
+        
+        Args:
+            timeout: Seconds to wait (None = until something changes)
+        
+        Returns:
+            Changed paths (empty on timeout)
+        """
+    
+    def batches(self, debounce: float = 0.2, max_delay: float = 2.0) -> Iterator[set[str]]:
+        """
+        Yield changed paths in batches.
+        
+        A batch is closed once no event arrived for `debounce` seconds, so
+        bursts (git checkout, formatters rewriting many files) are handled
+        in one pass, but never later than `max_delay` after its first event.
+        """
+        while True:
+            changed = self.read_events(None)
+            if not changed:
+                continue
+            deadline = time.monotonic() + max_delay
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more = self.read_events(min(debounce, remaining))
+                if not more:
+                    break
+                changed |= more
+            yield changed
+    
+    def close(self):
+        """Release watcher resources."""
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+
+class InotifyWatcher(Watcher):
+    """Linux inotify watcher (via ctypes) with one watch per walked directory."""
+    
+    def __init__(self, walker: FileWalker):
+        super().__init__(walker)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        # Watch descriptor -> project-relative directory ('' or 'a/b/')
+        self._dirs: dict[int, str] = {}
+        try:
+            self._add_tree(self.project_root)
+        except OSError:
+            self.close()
+            raise
+    
+    def _add_tree(self, directory: Path):
+        """Watch a directory and every non-excluded directory below it."""
+        for dir_path in self.walker.walk(directory, directories=True):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached (see fs.inotify.max_user_watches)")
+                # Directory vanished in the meantime
+                continue
+            rel_dir = dir_path.relative_to(self.project_root).as_posix()
+            self._dirs[wd] = "" if rel_dir == "." else rel_dir + "/"
+    
+    def read_events(self, timeout: Optional[float]) -> set[str]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                changed |= self._handle_event(wd, mask, name)
+        return changed
+    
+    def _handle_event(self, wd: int, mask: int, name: str) -> set[str]:
+        """Translate one inotify event into changed paths."""
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped: resync everything
+            return {""}
+        if mask & IN_IGNORED:
+            # Watch removed (directory deleted or moved away)
+            self._dirs.pop(wd, None)
+            return set()
+        
+        rel_dir = self._dirs.get(wd)
+        if rel_dir is None:
+            return set()
+        rel_path = rel_dir + name
+        
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(self.project_root / rel_path)
+            return {rel_path}
+        if self.walker.is_config_file(rel_path):
+            # Other files may be (un)ignored now: watch newly walked directories
+            self.walker.reload_config()
+            self._add_tree(self.project_root)
+            return {""}
+        if name.endswith(self.walker.extensions):
+            return {rel_path}
+        return set()
+    
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(Watcher):
+    """
+    Portable watcher comparing (mtime_ns, size, inode) between walks.
+    
+    The .gitignore files of walked directories and pyproject.toml are
+    stat'ed too, so config changes are noticed.
+    """
+    
+    def __init__(self, walker: FileWalker, interval: float = 1.0):
+        """
+        Initialize watcher.
+        
+        Args:
+            walker: Walker deciding which files are watched
+            interval: Seconds between walks
+        """
+        super().__init__(walker)
+        self.interval = interval
+        self._snapshot = self._scan()
+    
+    def _scan(self) -> dict[str, tuple]:
+        """Stat every walked file and config file."""
+        config_files = []
+        if self.walker.is_config_file("pyproject.toml"):
+            config_files.append(self.project_root / "pyproject.toml")
+        if self.walker.use_gitignore:
+            config_files.extend(d / ".gitignore" for d in self.walker.walk(directories=True))
+        
+        snapshot = {}
+        for path in [*self.walker, *config_files]:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rel_path = path.relative_to(self.project_root).as_posix()
+            snapshot[rel_path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return snapshot
+    
+    def read_events(self, timeout: Optional[float]) -> set[str]:
+        while True:
+            time.sleep(self.interval if timeout is None else timeout)
+            snapshot = self._scan()
+            previous, self._snapshot = self._snapshot, snapshot
+            changed = {
+                rel_path for rel_path in previous.keys() | snapshot.keys()
+                if previous.get(rel_path) != snapshot.get(rel_path)
+            }
+            if any(self.walker.is_config_file(rel_path) for rel_path in changed):
+                # Other files may be (un)ignored now: walk again with new rules
+                self.walker.reload_config()
+                self._snapshot = self._scan()
+                return {""}
+            if changed or timeout is not None:
+                return changed
+
+
+def create_watcher(walker: FileWalker, polling: bool = False, interval: float = 1.0) -> Watcher:
+    """
+    Create the best available watcher.
+    
+    Uses inotify on Linux and falls back to polling elsewhere, or when
+    inotify cannot be initialized (e.g. the watch limit is reached).
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(walker)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(walker, interval=interval)
+
+
+def _load_libc() -> ctypes.CDLL:
+    """Load libc with the inotify functions typed."""
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_init1.restype = ctypes.c_int
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_add_watch.restype = ctypes.c_int
+    return libc
@@ -3,8 +3,15 @@
 import tempfile
 from pathlib import Path
 
-from ai_code_compass.cache import CacheManager
-from ai_code_compass.models import FileInfo, Symbol, SymbolType
+from ai_code_compass.cache import (
+    CacheManager,
+    rank_match,
+    MATCH_EXACT,
+    MATCH_PREFIX,
+    MATCH_WORD_BOUNDARY,
+    MATCH_SUBSTRING,
+)
+from ai_code_compass.models import FileInfo, Reference, Symbol, SymbolType
 
 
 def test_cache_initialization():
@@ -364,6 +371,397 @@ def test_clear_cache():
         cache.close()
 
 
+def test_get_all_files_bulk():
+    """Test bulk loading of files with and without symbols."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = Path(tmpdir) / ".code-compass"
+        cache = CacheManager(cache_dir)
+        
+        for path, names in [("b.py", ["z", "a"]), ("a.py", []), ("c.py", ["only"])]:
+            cache.save_file(FileInfo(
+                path=path,
+                language="python",
+                hash=f"h-{path}",
+                size=100,
+                symbols=[
+                    Symbol(
+                        name=name,
+                        type=SymbolType.FUNCTION,
+                        file_path=path,
+                        line_start=10 - i,
+                        line_end=10 - i,
+                        signature=f"def {name}():",
+                        parent=None
+                    )
+                    for i, name in enumerate(names)
+                ],
+                imports=[{'module': 'os', 'level': 0, 'type': 'import'}]
+            ))
+        
+        files = cache.get_all_files()
+        assert [f.path for f in files] == ["a.py", "b.py", "c.py"]
+        assert files == [cache.get_file(f.path) for f in files]
+        
+        # Symbols come back in source order
+        assert files[0].symbols == []
+        assert [s.name for s in files[1].symbols] == ["a", "z"]
+        assert files[1].imports == [{'module': 'os', 'level': 0, 'type': 'import'}]
+        
+        # Generator variant streams the same files
+        assert list(cache.iter_files()) == files
+        
+        cache.close()
+
+
+class TrigramCacheManager(CacheManager):
+    """Cache manager forced onto the non-FTS5 trigram fallback."""
+    
+    def _init_search_index(self, cursor):
+        self._init_trigram_table(cursor, set())
+        return 'trigram'
+
+
+def _save_search_fixture(cache):
+    """Save symbols with different match qualities for 'user'."""
+    names = ["get_user", "User", "superuser", "UserManager", "userspace", "loadUser", "unrelated"]
+    cache.save_file(FileInfo(
+        path="users.py",
+        language="python",
+        hash="h1",
+        size=100,
+        symbols=[
+            Symbol(
+                name=name,
+                type=SymbolType.FUNCTION,
+                file_path="users.py",
+                line_start=i + 1,
+                line_end=i + 1,
+                signature=f"def {name}():",
+                parent=None
+            )
+            for i, name in enumerate(names)
+        ],
+        imports=[]
+    ))
+
+
+def test_search_symbols_ranking():
+    """Test fuzzy search ranking with both index backends."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for cache_class in (CacheManager, TrigramCacheManager):
+            cache = cache_class(Path(tmpdir) / cache_class.__name__)
+            _save_search_fixture(cache)
+            
+            results = [s.name for s in cache.search_symbols("user")]
+            assert results == [
+                "User",          # exact
+                "userspace",     # prefix
+                "UserManager",   # prefix
+                "get_user",      # snake_case boundary
+                "loadUser",      # camelCase boundary
+                "superuser",     # substring
+            ], (cache.search_backend, results)
+            
+            assert [s.name for s in cache.search_symbols("user", limit=2)] == ["User", "userspace"]
+            
+            # Index stays in sync when symbols are deleted
+            cache.clear()
+            assert cache.search_symbols("user") == []
+            
+            # Short patterns fall back to an escaped scan
+            _save_search_fixture(cache)
+            assert [s.name for s in cache.search_symbols("_u")] == ["get_user"]
+            
+            cache.close()
+
+
+def test_rank_match():
+    """Test match quality classification."""
+    assert rank_match("Parser", "parser") == MATCH_EXACT
+    assert rank_match("parse_file", "parse") == MATCH_PREFIX
+    assert rank_match("PythonParser", "parser") == MATCH_WORD_BOUNDARY
+    assert rank_match("HTTPServer", "server") == MATCH_WORD_BOUNDARY
+    assert rank_match("get_file_hash", "file") == MATCH_WORD_BOUNDARY
+    assert rank_match("profile", "file") == MATCH_SUBSTRING
+    assert rank_match("profile", "xyz") is None
+
+
+def test_generation_and_graph():
+    """Test generation counter and stored edges/scores."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        assert cache.get_generation() == 0
+        assert cache.get_graph_generation() == -1
+        
+        def make(path):
+            return FileInfo(path=path, language="python", hash=path, size=1, symbols=[], imports=[])
+        
+        # One batch advances the generation once
+        with cache.batch():
+            cache.save_file(make("a.py"))
+            cache.save_file(make("b.py"))
+        assert cache.get_generation() == 1
+        
+        # Stat-only updates keep it
+        cache.update_file_stat("a.py", (1, 2, 3))
+        assert cache.get_generation() == 1
+        
+        cache.save_graph([("a.py", "b.py")], {"a.py": 0.5, "b.py": 1.5}, 1)
+        assert cache.get_graph_generation() == 1
+        assert cache.get_edges() == [("a.py", "b.py")]
+        assert cache.get_scores() == {"a.py": 0.5, "b.py": 1.5}
+        
+        # A rolled back batch does not count
+        try:
+            with cache.batch():
+                cache.save_file(make("c.py"))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert cache.get_generation() == 1
+        
+        cache.delete_file("a.py")
+        assert cache.get_generation() == 2
+        
+        cache.clear()
+        assert cache.get_generation() == 3
+        assert cache.get_edges() == []
+        assert cache.get_scores() == {}
+        
+        cache.close()
+
+
+def test_file_states():
+    """Test reading change-detection state without decoding imports."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        cache.save_file(FileInfo(
+            path="a.py", language="python", hash="h", size=1,
+            symbols=[
+                Symbol(name="f", type=SymbolType.FUNCTION, file_path="a.py",
+                       line_start=1, line_end=2, signature="def f():", parent=None)
+            ],
+            imports=[{'module': 'os', 'level': 0, 'type': 'import'}] * 3
+        ), stat_key=(10, 1, 7))
+        
+        state = cache.get_file_states()["a.py"]
+        assert (state.hash, state.stat_key) == ("h", (10, 1, 7))
+        assert (state.symbol_count, state.import_count) == (1, 3)
+        
+        # Rows written before import_count existed are counted from the JSON
+        cache.conn.execute("UPDATE files SET import_count = NULL")
+        assert cache.get_file_states(["a.py"])["a.py"].import_count == 3
+        
+        cache.close()
+
+
+def test_get_files_capped():
+    """Test loading selected files with a per-file symbol cap."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        
+        for i in range(3):
+            path = f"mod_{i}.py"
+            cache.save_file(FileInfo(
+                path=path, language="python", hash=str(i), size=1,
+                symbols=[
+                    Symbol(
+                        name=f"func_{n}", type=SymbolType.FUNCTION, file_path=path,
+                        line_start=n * 10, line_end=n * 10 + 5,
+                        signature=f"def func_{n}():", parent=None
+                    )
+                    # Saved out of source order
+                    for n in (4, 2, 3, 1, 0)
+                ],
+                imports=[]
+            ))
+        
+        files = cache.get_files(["mod_2.py", "mod_0.py", "missing.py"], max_symbols_per_file=2)
+        assert sorted(files) == ["mod_0.py", "mod_2.py"]
+        assert [s.name for s in files["mod_2.py"].symbols] == ["func_0", "func_1"]
+        
+        files = cache.get_files(["mod_1.py"])
+        assert len(files["mod_1.py"].symbols) == 5
+        assert files["mod_1.py"] == cache.get_file("mod_1.py")
+        
+        assert cache.get_files(["mod_1.py"], max_symbols_per_file=0)["mod_1.py"].symbols == []
+        
+        cache.close()
+
+
+def test_get_files_ranked():
+    """Test that capped files keep their most used symbols."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        
+        def symbol(name, line, symbol_type=SymbolType.FUNCTION, parent=None):
+            return Symbol(
+                name=name, type=symbol_type, file_path="lib.py",
+                line_start=line, line_end=line, signature=f"def {name}():", parent=parent
+            )
+        
+        cache.save_file(FileInfo(
+            path="lib.py", language="python", hash="1", size=1,
+            symbols=[
+                symbol("_helper", 1),
+                symbol("first", 2),
+                symbol("Engine", 3, SymbolType.CLASS),
+                symbol("__init__", 4, SymbolType.METHOD, "Engine"),
+                symbol("_stop", 5, SymbolType.METHOD, "Engine"),
+                symbol("run", 6, SymbolType.METHOD, "Engine"),
+                symbol("last", 7),
+            ],
+            imports=[]
+        ))
+        for i, names in enumerate((["Engine", "last"], ["Engine"], ["_helper"])):
+            cache.save_file(FileInfo(
+                path=f"user_{i}.py", language="python", hash="1", size=1, symbols=[],
+                imports=[{'module': 'lib', 'level': 0, 'type': 'from', 'names': names}]
+            ))
+        
+        def top(n):
+            return [s.name for s in cache.get_files(["lib.py"], max_symbols_per_file=n)["lib.py"].symbols]
+        
+        # Kept symbols are shown in source order
+        assert top(1) == ["Engine"]
+        assert top(3) == ["Engine", "__init__", "run"]
+        # Methods rank with their class; public names win ties
+        assert top(5) == ["Engine", "__init__", "_stop", "run", "last"]
+        assert top(6) == ["_helper", "Engine", "__init__", "_stop", "run", "last"]
+        
+        # A file's own imports do not count
+        cache.save_file(FileInfo(
+            path="user_2.py", language="python", hash="2", size=1, symbols=[], imports=[]
+        ))
+        assert top(2) == ["Engine", "__init__"]
+        cache.delete_files(["user_1.py", "user_0.py"])
+        assert top(2) == ["first", "Engine"]
+        
+        cache.close()
+
+
+def test_delete_files():
+    """Test that deleting files also deletes their symbols."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        
+        for i in range(3):
+            path = f"mod_{i}.py"
+            cache.save_file(FileInfo(
+                path=path, language="python", hash=str(i), size=1,
+                symbols=[
+                    Symbol(
+                        name=f"func_{i}", type=SymbolType.FUNCTION, file_path=path,
+                        line_start=1, line_end=2, signature=f"def func_{i}():", parent=None
+                    )
+                ],
+                imports=[]
+            ))
+        generation = cache.get_generation()
+        
+        assert cache.delete_files(["mod_0.py", "mod_2.py", "missing.py"]) == 2
+        assert cache.list_paths() == ["mod_1.py"]
+        assert cache.get_stats()['total_symbols'] == 1
+        assert cache.search_symbols("func_0") == []
+        assert cache.get_changes_since(generation) == ([], ["mod_0.py", "mod_2.py"])
+        assert cache.delete_files([]) == 0
+        
+        cache.close()
+
+
+def test_symbol_diff():
+    """Test that saving a changed file only rewrites changed symbols."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        
+        def make_file(specs):
+            return FileInfo(
+                path="mod.py", language="python", hash=str(specs), size=1,
+                symbols=[
+                    Symbol(
+                        name=name, type=SymbolType.FUNCTION, file_path="mod.py",
+                        line_start=line, line_end=line + 1, signature=f"def {name}():",
+                        parent=None, content_hash=content_hash
+                    )
+                    for name, line, content_hash in specs
+                ],
+                imports=[]
+            )
+        
+        def symbol_ids():
+            cursor = cache.conn.cursor()
+            cursor.execute("SELECT name, id FROM symbols")
+            return {row['name']: row['id'] for row in cursor.fetchall()}
+        
+        cache.save_file(make_file([("keep", 1, "k"), ("move", 3, "m"), ("edit", 5, "e1"), ("drop", 7, "d")]))
+        ids = symbol_ids()
+        generation = cache.get_generation()
+        
+        cache.save_file(make_file([("keep", 1, "k"), ("edit", 3, "e2"), ("move", 5, "m"), ("add", 7, "a")]))
+        after = symbol_ids()
+        assert after["keep"] == ids["keep"]
+        assert after["move"] == ids["move"]
+        assert after["edit"] == ids["edit"]
+        assert "drop" not in after
+        
+        saved = cache.get_file("mod.py")
+        assert [(s.name, s.line_start, s.content_hash) for s in saved.symbols] == [
+            ("keep", 1, "k"), ("edit", 3, "e2"), ("move", 5, "m"), ("add", 7, "a")
+        ]
+        assert cache.search_symbols("add")[0].name == "add"
+        
+        changed, removed = cache.get_symbol_changes_since(generation)
+        assert [s.name for s in changed] == ["edit", "add"]
+        assert removed == [("mod.py", None, "drop", SymbolType.FUNCTION)]
+        
+        # Re-added symbols are reported as changed only
+        cache.save_file(make_file([("drop", 1, "d")]))
+        changed, removed = cache.get_symbol_changes_since(generation)
+        assert [s.name for s in changed] == ["drop"]
+        assert [name for _, _, name, _ in removed] == ["add", "edit", "keep", "move"]
+        
+        # Deleting the file removes the rest
+        cache.delete_file("mod.py")
+        assert len(cache.get_symbol_changes_since(generation)[1]) == 5
+        assert cache.get_symbol_changes_since(cache.get_generation()) == ([], [])
+        
+        cache.close()
+
+
+
+def test_refs():
+    """Test storing, replacing and deleting references."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        assert not cache.refs_enabled()
+        
+        def make_file(path, content_hash, names):
+            return FileInfo(
+                path=path, language="python", hash=content_hash, size=1,
+                symbols=[], imports=[],
+                refs=[Reference(name, path, line, f"self.{name}") for line, name in enumerate(names, 1)]
+            )
+        
+        cache.save_file(make_file("a.py", "1", ["save_file", "load"]))
+        cache.save_file(make_file("b.py", "1", ["save_file"]))
+        assert [(r.file_path, r.line) for r in cache.find_refs("save_file")] == [("a.py", 1), ("b.py", 1)]
+        assert cache.find_refs("load")[0].expression == "self.load"
+        
+        # A changed file replaces its references
+        cache.save_file(make_file("a.py", "2", ["load", "load", "save_file"]))
+        assert [(r.file_path, r.line) for r in cache.find_refs("save_file")] == [("a.py", 3), ("b.py", 1)]
+        
+        cache.delete_files(["b.py"])
+        assert [r.file_path for r in cache.find_refs("save_file")] == ["a.py"]
+        
+        cache.set_refs_enabled(True)
+        assert cache.refs_enabled()
+        cache.set_refs_enabled(False)
+        assert cache.find_refs("load") == []
+        
+        cache.close()
+
+
 if __name__ == "__main__":
     # Run tests
     test_cache_initialization()
@@ -375,5 +773,15 @@ if __name__ == "__main__":
     test_get_stats()
     test_delete_file()
     test_clear_cache()
+    test_get_all_files_bulk()
+    test_search_symbols_ranking()
+    test_rank_match()
+    test_generation_and_graph()
+    test_file_states()
+    test_get_files_capped()
+    test_get_files_ranked()
+    test_delete_files()
+    test_symbol_diff()
+    test_refs()
     
     print("✅ All cache tests passed!")
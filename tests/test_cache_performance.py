@@ -191,11 +191,102 @@ def test_update_performance():
         assert elapsed < 1.0, f"Updates too slow: {elapsed:.2f}s"
 
 
+def test_batched_write_throughput():
+    """Benchmark per-file save_file against batched save_files at 10k files."""
+    num_files = 10_000
+    symbols_per_file = 5
+    
+    def make_files():
+        for i in range(num_files):
+            yield FileInfo(
+                path=f"pkg/module_{i}.py",
+                language="python",
+                hash=f"hash_{i}",
+                size=1000,
+                symbols=[
+                    Symbol(
+                        name=f"func_{j}",
+                        type=SymbolType.FUNCTION,
+                        file_path=f"pkg/module_{i}.py",
+                        line_start=j * 10,
+                        line_end=j * 10 + 5,
+                        signature=f"def func_{j}(x: int) -> str:",
+                        parent=None
+                    )
+                    for j in range(symbols_per_file)
+                ],
+                imports=[{'module': 'os', 'level': 0, 'type': 'import'}]
+            )
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # One transaction per file
+        cache = CacheManager(Path(tmpdir) / "per_file")
+        start_time = time.time()
+        for file_info in make_files():
+            cache.save_file(file_info)
+        per_file_elapsed = time.time() - start_time
+        per_file_stats = cache.get_stats()
+        cache.close()
+        
+        # Batched transactions with executemany
+        cache = CacheManager(Path(tmpdir) / "batched")
+        start_time = time.time()
+        saved = cache.save_files(make_files())
+        batched_elapsed = time.time() - start_time
+        batched_stats = cache.get_stats()
+        
+        # Re-saving updates rows in place instead of duplicating them
+        cache.save_files(make_files())
+        assert cache.get_stats() == batched_stats
+        cache.close()
+    
+    assert saved == num_files
+    assert per_file_stats == batched_stats
+    assert batched_stats['total_symbols'] == num_files * symbols_per_file
+    
+    print(f"✅ Write throughput ({num_files:,} files): "
+          f"save_file {num_files/per_file_elapsed:,.0f} files/s, "
+          f"save_files {num_files/batched_elapsed:,.0f} files/s "
+          f"({per_file_elapsed/batched_elapsed:.1f}x)")
+    assert batched_elapsed < per_file_elapsed, "Batched writes should be faster"
+
+
+def test_batch_rollback():
+    """Test that a failing batch leaves the cache unchanged."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = CacheManager(Path(tmpdir) / ".code-compass")
+        file_info = FileInfo(
+            path="app.py",
+            language="python",
+            hash="v1",
+            size=100,
+            symbols=[],
+            imports=[]
+        )
+        
+        try:
+            with cache.batch():
+                cache.save_file(file_info)
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        
+        assert cache.get_file("app.py") is None
+        
+        with cache.batch():
+            cache.save_file(file_info)
+        assert cache.get_file("app.py") is not None
+        
+        cache.close()
+
+
 if __name__ == "__main__":
     # Run tests
     test_pragma_settings()
     test_bulk_insert_performance()
     test_query_performance()
     test_update_performance()
+    test_batched_write_throughput()
+    test_batch_rollback()
     
     print("\n✅ All performance tests passed!")
@@ -0,0 +1,160 @@
+"""Tests for the index daemon."""
+
+import json
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from ai_code_compass.daemon import DaemonClient, DaemonError, IndexDaemon
+from ai_code_compass.map_generator import MapGenerator
+
+
+def _start_daemon(project_root: Path, cache_dir: Path) -> threading.Thread:
+    """Run a daemon in a background thread and wait for its socket."""
+    def run():
+        # Created in the serving thread: SQLite connections are per-thread
+        daemon = IndexDaemon(project_root, cache_dir=cache_dir)
+        try:
+            daemon.serve_forever()
+        finally:
+            daemon.close()
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    client = DaemonClient(cache_dir / "daemon.sock")
+    for _ in range(200):
+        if client.is_alive():
+            break
+        time.sleep(0.01)
+    client.close()
+    return thread
+
+
+def test_daemon_requests():
+    """Test that daemon answers match the local generator."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        (project_root / "pkg").mkdir(parents=True)
+        (project_root / "pkg" / "__init__.py").write_text("")
+        (project_root / "pkg" / "core.py").write_text("class Engine:\n    def run(self):\n        pass\n")
+        (project_root / "pkg" / "app.py").write_text("from .core import Engine\ndef main():\n    pass\n")
+        cache_dir = Path(tmpdir) / "cache"
+        
+        local = MapGenerator(project_root, cache_dir=cache_dir)
+        local.index(refs=True)
+        
+        thread = _start_daemon(project_root, cache_dir)
+        client = DaemonClient(cache_dir / "daemon.sock")
+        
+        assert client.generate_map(top_percent=1.0) == local.generate_map(top_percent=1.0)
+        assert client.generate_map(max_tokens=30) == local.generate_map(max_tokens=30)
+        assert client.generate_map(focus=["Engine"]) == local.generate_map(focus=["Engine"])
+        assert client.impacted(["pkg/core.py"]) == local.impacted(["pkg/core.py"])
+        assert client.find_references("run") == local.find_references("run")
+        assert client.find_symbols("Engine") == local.find_symbols("Engine")
+        assert client.find_symbols("eng", fuzzy=True) == local.find_symbols("eng", fuzzy=True)
+        assert client.get_stats()['total_files'] == 3
+        
+        # Errors are reported without killing the daemon
+        try:
+            client.call("nope")
+            assert False, "Expected DaemonError"
+        except DaemonError as e:
+            assert "Unknown method" in str(e)
+        
+        # Writes from another process are visible on the next request
+        (project_root / "pkg" / "extra.py").write_text("def helper():\n    pass\n")
+        local.index()
+        assert client.get_stats()['total_files'] == 4
+        assert "pkg/extra.py" in client.generate_map(top_percent=1.0)
+        
+        # Requests are cheap once the daemon is warm
+        start = time.perf_counter()
+        for _ in range(100):
+            client.generate_map(top_percent=1.0)
+        elapsed = (time.perf_counter() - start) / 100
+        print(f"✅ Daemon map round trip: {elapsed * 1000:.3f}ms")
+        
+        client.call("shutdown")
+        client.close()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert not (cache_dir / "daemon.sock").exists()
+        assert DaemonClient.for_project(project_root) is None
+        
+        local.close()
+
+
+def test_concurrent_clients():
+    """Test that a connected client does not block other clients."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        (project_root / "core.py").write_text("def run():\n    pass\n")
+        cache_dir = Path(tmpdir) / "cache"
+        MapGenerator(project_root, cache_dir=cache_dir).index()
+        
+        thread = _start_daemon(project_root, cache_dir)
+        first = DaemonClient(cache_dir / "daemon.sock")
+        assert first.is_alive()
+        
+        # The first connection stays open while a second client is served
+        second = DaemonClient(cache_dir / "daemon.sock", timeout=3.0)
+        assert second.get_stats()['total_files'] == 1
+        assert first.find_symbols("run")[0].file_path == "core.py"
+        
+        # A client vanishing mid-request leaves the daemon serving
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(cache_dir / "daemon.sock"))
+        sock.sendall(b'{"method": "map", "params": {}}\n{"method": "stats"')
+        sock.close()
+        assert second.is_alive()
+        
+        # Lines that are not request objects get an error, not a crash
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(cache_dir / "daemon.sock"))
+        reader = sock.makefile("rb")
+        for line in (b'[1, 2]', b'"x"', b'{"method": "ping", "params": [1]}'):
+            sock.sendall(line + b"\n")
+            assert json.loads(reader.readline())["ok"] is False
+        sock.sendall(b'{"method": "ping"}\n')
+        assert json.loads(reader.readline())["ok"] is True
+        reader.close()
+        sock.close()
+        assert second.is_alive()
+        
+        second.call("shutdown")
+        first.close()
+        second.close()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def test_stale_socket():
+    """Test that a leftover socket file does not block a new daemon."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        cache_dir = Path(tmpdir) / "cache"
+        cache_dir.mkdir()
+        (cache_dir / "daemon.sock").write_text("")
+        
+        client = DaemonClient(cache_dir / "daemon.sock")
+        assert not client.is_alive()
+        
+        thread = _start_daemon(project_root, cache_dir)
+        assert client.is_alive()
+        client.call("shutdown")
+        client.close()
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    # Run tests
+    test_daemon_requests()
+    test_concurrent_clients()
+    test_stale_socket()
+    
+    print("✅ All daemon tests passed!")
@@ -0,0 +1,157 @@
+"""Tests for git-based change detection."""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from ai_code_compass import map_generator
+from ai_code_compass.git import changed_files, git_snapshot
+from ai_code_compass.map_generator import MapGenerator
+
+
+def _git(repo: Path, *args: str):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True
+    )
+
+
+def _backdate(root: Path):
+    """Make every file old enough for its stat metadata to be trusted."""
+    old_time = 1_000_000_000
+    for py_file in root.rglob("*.py"):
+        os.utime(py_file, (old_time, old_time))
+
+
+def test_git_snapshot():
+    """Test listing clean, modified and untracked files."""
+    if shutil.which("git") is None:
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = Path(tmpdir)
+        (repo / "src").mkdir()
+        (repo / "src" / "a.py").write_text("def a():\n    pass\n")
+        (repo / "src" / "b.py").write_text("def b():\n    pass\n")
+        (repo / "top.py").write_text("")
+        _git(repo, "init", "-q")
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-q", "-m", "init")
+        
+        (repo / "src" / "b.py").write_text("def b2():\n    pass\n")
+        (repo / "src" / "new.py").write_text("")
+        
+        # Paths are relative to the project, which may be a subdirectory
+        snapshot = git_snapshot(repo / "src")
+        assert set(snapshot.blobs) == {"a.py"}
+        assert len(snapshot.blobs["a.py"]) == 40
+        assert snapshot.dirty == {"b.py", "new.py"}
+
+
+def test_changed_files():
+    """Test listing files changed since a revision."""
+    if shutil.which("git") is None:
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = Path(tmpdir)
+        (repo / "src").mkdir()
+        (repo / "src" / "a.py").write_text("")
+        (repo / "src" / "b.py").write_text("")
+        (repo / "setup.py").write_text("")
+        _git(repo, "init", "-q")
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-q", "-m", "init")
+        
+        (repo / "src" / "a.py").write_text("x = 1\n")
+        (repo / "src" / "b.py").unlink()
+        (repo / "setup.py").write_text("x = 1\n")
+        
+        assert sorted(changed_files(repo / "src", "HEAD")) == ["a.py", "b.py"]
+        assert sorted(changed_files(repo, "HEAD")) == ["setup.py", "src/a.py", "src/b.py"]
+
+
+def test_index_with_git():
+    """Test that clean files are skipped without I/O and checkouts re-parse only changed files."""
+    if shutil.which("git") is None:
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = Path(tmpdir) / "project"
+        (repo / "pkg").mkdir(parents=True)
+        for i in range(5):
+            (repo / "pkg" / f"mod_{i}.py").write_text(f"def handler_{i}():\n    pass\n")
+        _backdate(repo)
+        _git(repo, "init", "-q", "-b", "main")
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-q", "-m", "init")
+        
+        _git(repo, "checkout", "-q", "-b", "feature")
+        (repo / "pkg" / "mod_0.py").write_text("def renamed():\n    pass\n")
+        _backdate(repo)
+        _git(repo, "commit", "-q", "-am", "rename")
+        
+        generator = MapGenerator(repo, cache_dir=Path(tmpdir) / "cache")
+        stats = generator.index(git=True)
+        assert stats['total_files'] == 5
+        assert stats['parsed_files'] == 5
+        
+        stat_calls = []
+        original = map_generator._stat_key
+        
+        def spy(py_file, racy_after_ns):
+            stat_calls.append(py_file)
+            return original(py_file, racy_after_ns)
+        
+        map_generator._stat_key = spy
+        try:
+            # Nothing changed: no file is even stat'ed
+            stats = generator.index(git=True)
+            assert stats['cached_files'] == 5
+            assert stat_calls == []
+            
+            # Switching branches re-parses only the file that differs
+            _git(repo, "checkout", "-q", "main")
+            stats = generator.index(git=True)
+            assert stats['parsed_files'] == 1
+            assert generator.find_symbols("handler_0")
+            assert not generator.find_symbols("renamed")
+            
+            # Files written just now are only trusted once they are older
+            _backdate(repo)
+            generator.index(git=True)
+            
+            # Modified and untracked files are read from disk
+            stat_calls.clear()
+            (repo / "pkg" / "mod_1.py").write_text("def edited():\n    pass\n")
+            (repo / "pkg" / "extra.py").write_text("def extra():\n    pass\n")
+            stats = generator.index(git=True)
+            assert stats['parsed_files'] == 2
+            assert sorted(p.name for p in stat_calls) == ["extra.py", "mod_1.py"]
+        finally:
+            map_generator._stat_key = original
+        
+        generator.close()
+
+
+def test_index_with_git_outside_work_tree():
+    """Test falling back to walking the tree."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        (project_root / "a.py").write_text("def a():\n    pass\n")
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        stats = generator.index(git=True)
+        assert stats['parsed_files'] == 1
+        generator.close()
+
+
+if __name__ == "__main__":
+    # Run tests
+    test_git_snapshot()
+    test_changed_files()
+    test_index_with_git()
+    test_index_with_git_outside_work_tree()
+    
+    print("✅ All git tests passed!")
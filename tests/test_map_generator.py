@@ -0,0 +1,755 @@
+"""Tests for map generator indexing."""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from ai_code_compass import map_generator
+from ai_code_compass.blobstore import PARSE_VERSION
+from ai_code_compass.graph import DependencyBuilder, DependencyGraph
+from ai_code_compass.map_generator import MapGenerator
+from ai_code_compass.tokens import TokenCounter, count_tokens_rough
+
+
+def _write_project(root: Path, num_modules: int = 12):
+    """Create a small package where every module imports the core module."""
+    pkg = root / "pkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "core.py").write_text(
+        "class Engine:\n"
+        "    def run(self, x: int) -> int:\n"
+        "        return x\n"
+    )
+    for i in range(num_modules):
+        (pkg / f"mod_{i}.py").write_text(
+            "import pkg.core\n"
+            f"def handler_{i}(data: dict) -> None:\n"
+            "    pass\n"
+        )
+
+
+def test_index_serial():
+    """Test serial indexing and incremental re-indexing."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root)
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        
+        stats = generator.index()
+        assert stats['total_files'] == 14
+        assert stats['parsed_files'] == 14
+        assert stats['cached_files'] == 0
+        
+        # Second run: everything comes from the cache
+        stats = generator.index()
+        assert stats['parsed_files'] == 0
+        assert stats['cached_files'] == 14
+        assert stats['total_symbols'] == 14
+        
+        generator.close()
+
+
+def test_index_parallel_matches_serial():
+    """Test that parallel indexing produces the same cache and map as serial."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root)
+        
+        serial = MapGenerator(project_root, cache_dir=Path(tmpdir) / "serial")
+        parallel = MapGenerator(project_root, cache_dir=Path(tmpdir) / "parallel")
+        
+        serial_stats = serial.index()
+        parallel_stats = parallel.index(jobs=4)
+        assert serial_stats == parallel_stats
+        
+        assert serial.cache.get_all_files() == parallel.cache.get_all_files()
+        assert serial.generate_map(top_percent=1.0) == parallel.generate_map(top_percent=1.0)
+        
+        # Warm parallel run only reports cached files
+        stats = parallel.index(jobs=4)
+        assert stats['parsed_files'] == 0
+        assert stats['cached_files'] == 14
+        
+        serial.close()
+        parallel.close()
+
+
+def test_index_skips_unchanged_stat():
+    """Test that files with unchanged stat metadata are not re-read."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=2)
+        
+        # Backdate files so their mtime is trusted
+        old_time = 1_000_000_000
+        for py_file in project_root.rglob("*.py"):
+            os.utime(py_file, (old_time, old_time))
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        states = generator.cache.get_file_states()
+        assert states["pkg/core.py"].mtime_ns == old_time * 1_000_000_000
+        assert states["pkg/core.py"].size == (project_root / "pkg/core.py").stat().st_size
+        
+        stats = generator.index()
+        assert stats['cached_files'] == 4
+        assert stats['total_symbols'] == 4
+        
+        # Content change with identical size and mtime is only caught by hashing
+        core = project_root / "pkg" / "core.py"
+        core.write_text(core.read_text().replace("run", "go_"))
+        os.utime(core, (old_time, old_time))
+        assert generator.index()['parsed_files'] == 0
+        stats = generator.index(verify_hashes=True)
+        assert stats['parsed_files'] == 1
+        assert generator.find_symbol("go_")
+        
+        generator.close()
+
+
+def test_index_prunes_deleted_files():
+    """Test that deleted and renamed files leave the index."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=3)
+        pkg = project_root / "pkg"
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        (pkg / "mod_0.py").unlink()
+        (pkg / "mod_1.py").rename(pkg / "renamed.py")
+        stats = generator.index()
+        assert stats['pruned_files'] == 2
+        assert stats['total_files'] == 4
+        assert generator.cache.list_paths() == [
+            "pkg/__init__.py", "pkg/core.py", "pkg/mod_2.py", "pkg/renamed.py"
+        ]
+        assert generator.cache.get_stats()['total_symbols'] == stats['total_symbols']
+        assert not generator.find_symbols("handler_0")
+        assert "pkg/mod_0.py" not in generator.get_importance()
+        
+        # Force mode prunes too
+        (pkg / "mod_2.py").unlink()
+        assert generator.index(force=True)['pruned_files'] == 1
+        assert generator.index()['pruned_files'] == 0
+        
+        generator.close()
+
+
+def test_shared_blob_store():
+    """Test that a copy of an indexed project reuses its parses."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        blob_store = Path(tmpdir) / "blobs.db"
+        first = Path(tmpdir) / "first"
+        first.mkdir()
+        _write_project(first, num_modules=6)
+        
+        generator = MapGenerator(first, cache_dir=Path(tmpdir) / "cache1", blob_store=blob_store)
+        stats = generator.index()
+        assert stats['parsed_files'] == 8
+        assert stats['reused_files'] == 0
+        assert generator.blob_store.count() == 8
+        generator.close()
+        
+        # Same content at another path: nothing is parsed
+        second = Path(tmpdir) / "second"
+        shutil.copytree(first, second)
+        (second / "pkg" / "mod_0.py").write_text("def changed():\n    pass\n")
+        for jobs in (1, 2):
+            cache_dir = Path(tmpdir) / f"cache2_{jobs}"
+            generator = MapGenerator(second, cache_dir=cache_dir, blob_store=blob_store)
+            stats = generator.index(jobs=jobs)
+            assert stats['parsed_files'] == (1 if jobs == 1 else 0)
+            assert stats['reused_files'] == (7 if jobs == 1 else 8)
+            assert generator.cache.get_file("pkg/core.py").symbols[0].file_path == "pkg/core.py"
+            assert generator.find_symbols("changed")
+            
+            # force bypasses the store
+            assert generator.index(force=True)['parsed_files'] == 8
+            generator.close()
+        
+        # Parses stored without references are re-parsed once to add them
+        for name, parsed in (("cache3", 8), ("cache4", 0)):
+            generator = MapGenerator(second, cache_dir=Path(tmpdir) / name, blob_store=blob_store)
+            stats = generator.index(refs=True)
+            assert stats['parsed_files'] == parsed
+            assert [r.file_path for r in generator.find_references("dict")][:1] == ["pkg/mod_1.py"]
+            generator.close()
+
+
+def test_scores_persisted():
+    """Test that maps reuse stored scores until the index changes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=3)
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        cache = generator.cache
+        assert cache.get_graph_generation() == cache.get_generation()
+        assert ("pkg/mod_0.py", "pkg/core.py") in cache.get_edges()
+        scores = cache.get_scores()
+        assert max(scores, key=scores.get) == "pkg/core.py"
+        
+        # Unchanged index: no graph rebuild
+        original = DependencyBuilder.build_from_imports
+        DependencyBuilder.build_from_imports = None
+        try:
+            generator.index()
+            generated = generator.generate_map(top_percent=1.0)
+        finally:
+            DependencyBuilder.build_from_imports = original
+        assert "pkg/core.py" in generated
+        
+        # Changed file: new generation, graph recomputed
+        (project_root / "pkg" / "mod_0.py").write_text("def alone():\n    pass\n")
+        generation = cache.get_generation()
+        generator.index(verify_hashes=True)
+        assert cache.get_generation() == generation + 1
+        assert cache.get_graph_generation() == generation + 1
+        assert ("pkg/mod_0.py", "pkg/core.py") not in cache.get_edges()
+        
+        generator.close()
+
+
+def test_incremental_ranking():
+    """Test that warm-started rankings match a full solve."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=30)
+        pkg = project_root / "pkg"
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        warm_starts = []
+        original = DependencyGraph.compute_importance
+        
+        def spy(self, *args, **kwargs):
+            warm_starts.append(kwargs.get('initial') is not None)
+            return original(self, *args, **kwargs)
+        
+        def check_against_full():
+            full = DependencyBuilder(project_root).build_from_imports(
+                generator.cache.get_imports()
+            )
+            expected = full.compute_importance(tol=1e-10, max_iter=1000)
+            scores = generator.cache.get_scores()
+            assert scores.keys() == expected.keys()
+            assert all(abs(scores[p] - expected[p]) < 1e-3 for p in expected)
+            assert set(generator.cache.get_edges()) == {
+                (src, dst) for src, targets in full.edges.items() for dst in targets
+            }
+        
+        DependencyGraph.compute_importance = spy
+        try:
+            # One file gains an import: warm start
+            (pkg / "mod_1.py").write_text("import pkg.mod_0\nimport pkg.core\n")
+            generator.index(verify_hashes=True)
+            assert warm_starts == [True]
+            check_against_full()
+            
+            # A new file and a deleted file: edges re-resolved, still warm
+            (pkg / "extra.py").write_text("from . import mod_0\n")
+            (pkg / "mod_2.py").unlink()
+            assert generator.index(verify_hashes=True)['pruned_files'] == 1
+            assert warm_starts[-1] is True
+            check_against_full()
+            
+            # Body-only change: graph unchanged, no ranking at all
+            count = len(warm_starts)
+            (pkg / "core.py").write_text("class Engine:\n    pass\n")
+            generator.index(verify_hashes=True)
+            assert len(warm_starts) == count
+            
+            # Single-file updates load neither every score nor every path
+            full_loads = []
+            get_scores = generator.cache.get_scores
+            list_paths = generator.cache.list_paths
+            generator.cache.get_scores = lambda paths=None: (
+                full_loads.append(paths is None) or get_scores(paths)
+            )
+            generator.cache.list_paths = lambda prefix="": (
+                full_loads.append(True) or list_paths(prefix)
+            )
+            (pkg / "mod_4.py").write_text("import pkg.core\nx = 1\n")
+            generator.index_paths([pkg / "mod_4.py"])
+            assert len(warm_starts) == count
+            assert not any(full_loads)
+            
+            # A relative and a suffix import: re-ranked, edges as a full build
+            (pkg / "mod_4.py").write_text("from .mod_5 import x\nimport mod_6\n")
+            generator.index_paths([pkg / "mod_4.py"])
+            assert warm_starts[-1] is True
+            assert full_loads[-1] is True
+            check_against_full()
+            assert generator.get_importance() == get_scores()
+            
+            # Most edges removed: full solve
+            for i in range(3, 30):
+                (pkg / f"mod_{i}.py").write_text("")
+            generator.index(verify_hashes=True)
+            assert warm_starts[-1] is False
+            check_against_full()
+        finally:
+            DependencyGraph.compute_importance = original
+        
+        generator.close()
+
+
+def test_index_paths():
+    """Test re-indexing a named set of files."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=10)
+        pkg = project_root / "pkg"
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        scores = generator.get_importance()
+        
+        # Body-only edit: parsed, graph stamped, scores kept
+        (pkg / "core.py").write_text("class Engine:\n    def start(self):\n        pass\n")
+        stats = generator.index_paths([pkg / "core.py"])
+        assert stats['total_files'] == 1
+        assert stats['parsed_files'] == 1
+        assert generator.cache.get_graph_generation() == generator.cache.get_generation()
+        assert generator.get_importance() == scores
+        assert generator.find_symbols("start")
+        
+        # Relative paths, deletions and paths outside the project
+        (pkg / "mod_1.py").write_text("import pkg.mod_0\n")
+        (pkg / "mod_2.py").unlink()
+        stats = generator.index_paths(["pkg/mod_1.py", "pkg/mod_2.py", Path(tmpdir) / "other.py"])
+        assert stats['parsed_files'] == 1
+        assert stats['pruned_files'] == 1
+        assert ("pkg/mod_1.py", "pkg/mod_0.py") in generator.cache.get_edges()
+        assert "pkg/mod_2.py" not in generator.get_importance()
+        
+        generator.close()
+
+
+def test_focused_map():
+    """Test ranking around a focus set."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=10)
+        payments = project_root / "payments"
+        payments.mkdir()
+        (payments / "__init__.py").write_text("")
+        (payments / "models.py").write_text("class Invoice:\n    pass\n")
+        (payments / "api.py").write_text(
+            "import payments.models\n"
+            "import pkg.core\n"
+            "def charge(invoice):\n"
+            "    pass\n"
+        )
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        top_global = max(generator.get_importance().items(), key=lambda x: x[1])[0]
+        assert top_global == "pkg/core.py"
+        
+        focused = generator.get_focused_importance(["payments/api.py"])
+        ranked = sorted(focused, key=focused.get, reverse=True)
+        assert ranked[0] == "payments/api.py"
+        assert set(ranked[:3]) == {"payments/api.py", "payments/models.py", "pkg/core.py"}
+        assert focused["pkg/mod_0.py"] == 0
+        
+        # Directories, symbols and absolute paths select the same files
+        assert generator.get_focused_importance(["charge"]) == focused
+        assert generator.get_focused_importance([str(payments / "api.py")]) == focused
+        assert generator.get_focused_importance(["payments"])["payments/__init__.py"] > 0
+        
+        # Unreachable files follow in global order, importers included
+        repo_map = generator.generate_map(top_percent=1.0, focus=["payments/models.py"])
+        order = [line.split()[1] for line in repo_map.splitlines() if line.startswith("## ")]
+        assert order[:2] == ["payments/models.py", "pkg/core.py"]
+        assert "payments/api.py" in order and "handler_0" in repo_map
+        assert len(order) == len(focused)
+        
+        try:
+            generator.generate_map(focus=["no_such_thing"])
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        
+        generator.close()
+
+
+def test_symbol_at():
+    """Test mapping lines to their innermost symbols."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        (project_root / "app.py").write_text(
+            "import os\n"                      # 1
+            "\n"                               # 2
+            "class Service:\n"                 # 3
+            "    timeout = 5\n"                # 4
+            "\n"                               # 5
+            "    def start(self):\n"           # 6
+            "        return 1\n"               # 7
+            "\n"                               # 8
+            "    def stop(self):\n"            # 9
+            "        return 2\n"               # 10
+            "\n"                               # 11
+            "    retries = 3\n"                # 12
+            "\n"                               # 13
+            "def main():\n"                    # 14
+            "    pass\n"                       # 15
+        )
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        def name(symbol):
+            return symbol.name if symbol else None
+        
+        assert name(generator.symbol_at("app.py", 1)) is None
+        assert name(generator.symbol_at("app.py", 4)) == "Service"
+        assert name(generator.symbol_at("app.py", 7)) == "start"
+        assert name(generator.symbol_at(project_root / "app.py", 10)) == "stop"
+        assert name(generator.symbol_at("app.py", 12)) == "Service"
+        assert name(generator.symbol_at("app.py", 15)) == "main"
+        
+        # Batch lookups keep input order and tolerate unknown files
+        locations = [("app.py", line) for line in range(1, 16)] * 100
+        locations += [("missing.py", 3), ("/usr/lib/python3/os.py", 10)]
+        results = generator.symbols_at(locations)
+        assert len(results) == len(locations)
+        assert [name(s) for s in results[:15]] == [
+            None, None, "Service", "Service", "Service", "start", "start", "Service",
+            "stop", "stop", "Service", "Service", None, "main", "main"
+        ]
+        assert results[-2:] == [None, None]
+        
+        # Lookups follow re-indexing
+        (project_root / "app.py").write_text("def first():\n    pass\n")
+        generator.index_paths(["app.py"])
+        assert name(generator.symbol_at("app.py", 1)) == "first"
+        
+        generator.close()
+
+
+def test_impacted():
+    """Test transitive dependents of changed files."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=3)
+        (project_root / "app.py").write_text("import pkg.mod_0\n")
+        (project_root / "cli.py").write_text("import app\n")
+        (project_root / "tool.py").write_text("import os\n")
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        assert generator.impacted(["pkg/core.py"]) == {
+            "pkg/core.py": 0,
+            "pkg/mod_0.py": 1, "pkg/mod_1.py": 1, "pkg/mod_2.py": 1,
+            "app.py": 2,
+            "cli.py": 3
+        }
+        assert set(generator.impacted(["pkg/core.py"], depth=1)) == {
+            "pkg/core.py", "pkg/mod_0.py", "pkg/mod_1.py", "pkg/mod_2.py"
+        }
+        
+        # Several sources at once, absolute paths and directories
+        assert generator.impacted([project_root / "app.py", "tool.py"]) == {
+            "app.py": 0, "cli.py": 1, "tool.py": 0
+        }
+        in_pkg = generator.impacted(["pkg"])
+        assert in_pkg["pkg/mod_0.py"] == 0
+        assert in_pkg["app.py"] == 1
+        assert generator.impacted(["missing.py"]) == {}
+        
+        # Repeated queries are memoized; callers get their own copy
+        result = generator.impacted(["app.py"])
+        result["extra.py"] = 9
+        assert generator.impacted(["app.py"]) == {"app.py": 0, "cli.py": 1}
+        
+        # Results follow re-indexing
+        (project_root / "tool.py").write_text("import cli\n")
+        generator.index_paths(["tool.py"])
+        assert generator.impacted(["app.py"]) == {"app.py": 0, "cli.py": 1, "tool.py": 2}
+        
+        generator.close()
+
+
+def test_upgraded_index_reparsed():
+    """Test that an index saved by an older version is re-parsed once."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=3)
+        (project_root / "app.py").write_text("from pkg.core import Engine\n")
+        cache_dir = Path(tmpdir) / "cache"
+        
+        generator = MapGenerator(project_root, cache_dir=cache_dir)
+        generator.index()
+        
+        # What an index saved before parse versions were recorded looks like
+        conn = generator.cache.conn
+        conn.execute("DELETE FROM meta WHERE key = 'parse_version'")
+        conn.execute("UPDATE files SET import_count = NULL")
+        conn.execute("UPDATE symbols SET content_hash = NULL")
+        conn.execute("DELETE FROM imported_names")
+        conn.commit()
+        generator.close()
+        
+        generator = MapGenerator(project_root, cache_dir=cache_dir)
+        assert generator.cache.get_parse_version() == 0
+        stats = generator.index()
+        assert stats['parsed_files'] == stats['total_files'] == 6
+        assert generator.cache.get_parse_version() == PARSE_VERSION
+        
+        # Only once
+        assert generator.index()['parsed_files'] == 0
+        
+        # Symbol ranking has its imported names back
+        core = generator.cache.get_files(["pkg/core.py"])["pkg/core.py"]
+        assert generator.cache.get_name_uses([core])["pkg/core.py"]["Engine"] == 1
+        
+        # Symbol diffs compare real content hashes from then on
+        count = generator.cache.conn.execute(
+            "SELECT COUNT(*) FROM symbols WHERE content_hash IS NULL"
+        ).fetchone()[0]
+        assert count == 0
+        generation = generator.cache.get_generation()
+        (project_root / "pkg" / "mod_0.py").write_text(
+            "import pkg.core\n"
+            "def handler_0(data: dict) -> None:\n"
+            "    return None\n"
+        )
+        generator.index(verify_hashes=True)
+        changed, removed = generator.cache.get_symbol_changes_since(generation)
+        assert [s.name for s in changed] == ["handler_0"] and removed == []
+        generator.close()
+
+
+def test_references():
+    """Test that references are opt-in and follow file changes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=2)
+        (project_root / "app.py").write_text(
+            "from pkg.core import Engine\n"
+            "def main():\n"
+            "    return Engine().run(1)\n"
+        )
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        try:
+            generator.find_references("run")
+            assert False, "Expected ValueError"
+        except ValueError:
+            pass
+        
+        # An interrupted run leaves references off, so the next one starts over
+        save_file = generator.cache.save_file
+        
+        def interrupted(file_info, **kwargs):
+            if file_info.path == "pkg/mod_0.py":
+                raise KeyboardInterrupt
+            return save_file(file_info, **kwargs)
+        
+        generator.cache.save_file = interrupted
+        try:
+            generator.index(refs=True)
+            assert False, "Expected KeyboardInterrupt"
+        except KeyboardInterrupt:
+            pass
+        generator.cache.save_file = save_file
+        assert not generator.cache.refs_enabled()
+        
+        # Enabling references re-parses every file once
+        stats = generator.index(refs=True)
+        assert stats['parsed_files'] == stats['total_files']
+        refs = generator.find_references("Engine.run")
+        assert [(r.file_path, r.line, r.expression) for r in refs] == [("app.py", 3, "(...).run")]
+        assert [r.file_path for r in generator.find_references("Engine")] == ["app.py", "app.py"]
+        
+        # The setting sticks; only changed files are re-parsed
+        (project_root / "pkg" / "mod_0.py").write_text("import pkg.core\nx = pkg.core.Engine\n")
+        stats = generator.index()
+        assert stats['parsed_files'] == 1
+        assert [r.file_path for r in generator.find_references("Engine")] == ["app.py", "app.py", "pkg/mod_0.py"]
+        
+        (project_root / "app.py").unlink()
+        generator.index_paths(["app.py"])
+        assert generator.find_references("run") == []
+        
+        # Dropping references changes symbol rankings: new generation
+        generation = generator.cache.get_generation()
+        generator.index(refs=False)
+        assert generator.cache.get_generation() > generation
+        try:
+            generator.find_references("Engine")
+            assert False, "Expected ValueError"
+        except ValueError:
+            pass
+        
+        generator.close()
+
+
+def test_generate_map_loads_selected_files_only():
+    """Test that map generation never loads the whole index."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=20)
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        loaded = []
+        original = generator.cache.get_files
+        generator.cache.get_files = lambda paths, **kw: loaded.extend(paths) or original(loaded, **kw)
+        generator.cache.iter_files = None
+        
+        text = generator.generate_map(top_percent=0.1, max_symbols_per_file=1)
+        assert len(loaded) == 2
+        assert loaded[0] == "pkg/core.py"
+        assert "## pkg/core.py" in text
+        assert "class Engine:" in text
+        # Capped at one symbol: the method is not shown
+        assert "def run" not in text
+        
+        generator.close()
+
+
+def test_map_keeps_used_symbols():
+    """Test that capped files show the symbols other files use."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        helpers = "".join(f"def helper_{i}():\n    pass\n" for i in range(10))
+        (project_root / "lib.py").write_text(
+            helpers +
+            "class Client:\n"
+            "    def _connect(self):\n"
+            "        pass\n"
+            "    def send(self, data):\n"
+            "        pass\n"
+        )
+        for i in range(3):
+            (project_root / f"user_{i}.py").write_text(
+                "from lib import Client\n"
+                "def main():\n"
+                "    Client().send(1)\n"
+            )
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        text = generator.generate_map(top_percent=0.25, max_symbols_per_file=3)
+        assert "## lib.py" in text
+        assert "class Client:" in text
+        assert "def _connect(self):" in text
+        assert "def helper_0" not in text
+        
+        # With references, method calls count too
+        generator.index(refs=True)
+        text = generator.generate_map(top_percent=0.25, max_symbols_per_file=2)
+        assert "class Client:" in text
+        assert "def send(self, data):" in text
+        assert "_connect" not in text
+        
+        generator.close()
+
+
+def test_token_budget():
+    """Test that budgeted maps fit and degrade detail before dropping files."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        project_root.mkdir()
+        _write_project(project_root, num_modules=30)
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        
+        full = generator.generate_map(top_percent=1.0)
+        assert generator.generate_map(max_tokens=count_tokens_rough(full)) == full
+        
+        previous_files = 33
+        for budget in (600, 300, 150, 60, 20):
+            for format in ('text', 'json'):
+                output = generator.generate_map(max_tokens=budget, format=format)
+                assert count_tokens_rough(output) <= budget
+            
+            # Fewer files only once every file is down to its header
+            files = output.count("## ")
+            assert files <= previous_files
+            if files < 32:
+                assert "def " not in output and "class " not in output
+            previous_files = files
+        
+        # Names only: signatures are shortened before any file is dropped
+        names_only = generator.generate_map(max_tokens=count_tokens_rough(full) - 10)
+        assert names_only.count("## ") == 32
+        assert "│def handler_9\n" in names_only
+        assert "class Engine:" in names_only
+        
+        # Pluggable, cached counter
+        calls = []
+        counter = TokenCounter(lambda text: calls.append(text) or len(text.split()))
+        output = generator.generate_map(max_tokens=50, token_counter=counter)
+        assert len(output.split()) <= 50
+        assert len(calls) == len(set(calls))
+        
+        # A coarse counter makes the estimate far off: still few full renders
+        renders = []
+        original = map_generator._render
+        map_generator._render = lambda *args: renders.append(args) or original(*args)
+        try:
+            for format in ('text', 'json'):
+                renders.clear()
+                output = generator.generate_map(
+                    max_tokens=30, format=format, token_counter=lambda text: len(text) // 40
+                )
+                assert len(output) // 40 <= 30
+                assert len(renders) <= 15
+        finally:
+            map_generator._render = original
+        
+        generator.close()
+
+
+if __name__ == "__main__":
+    # Run tests
+    test_index_serial()
+    test_index_parallel_matches_serial()
+    test_index_skips_unchanged_stat()
+    test_index_prunes_deleted_files()
+    test_shared_blob_store()
+    test_scores_persisted()
+    test_incremental_ranking()
+    test_index_paths()
+    test_upgraded_index_reparsed()
+    test_references()
+    test_generate_map_loads_selected_files_only()
+    test_map_keeps_used_symbols()
+    test_focused_map()
+    test_symbol_at()
+    test_impacted()
+    test_token_budget()
+    
+    print("✅ All map generator tests passed!")
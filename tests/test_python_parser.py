@@ -1,5 +1,6 @@
 """Tests for Python parser."""
 
+import hashlib
 import tempfile
 from pathlib import Path
 
@@ -159,6 +160,8 @@ from ..parent import something
         assert "typing" in import_modules
         # Check we got the relative import
         assert len(file_info.imports) >= 5
+        # Names imported with from ... import
+        assert file_info.imports[3]['names'] == ["List", "Dict"]
 
 
 def test_parse_inheritance():
@@ -224,6 +227,98 @@ def process(
         assert "->" in symbol.signature
 
 
+def test_parse_preloaded_source():
+    """Test parsing content that was already read and hashed."""
+    code = "\ufeffdef hello(name: str) -> str:\n    return name\n"
+    source = code.encode("utf-8")
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir)
+        test_file = project_root / "test.py"
+        test_file.write_bytes(source)
+        
+        parser = PythonParser()
+        from_disk = parser.parse_file(test_file, project_root)
+        preloaded = parser.parse_file(test_file, project_root, source=source)
+        
+        # Hash covers the raw bytes, size is in bytes
+        assert from_disk == preloaded
+        assert preloaded.hash == hashlib.sha256(source).hexdigest()
+        assert preloaded.size == len(source)
+        assert preloaded.symbols[0].name == "hello"
+        
+        # The file is not read again when content is provided
+        test_file.unlink()
+        reused = parser.parse_file(test_file, project_root, source=source, file_hash="h1")
+        assert reused is not None
+        assert reused.hash == "h1"
+
+
+def test_symbol_hashes():
+    """Test that symbol hashes follow content, not position."""
+    code = (
+        "class Engine:\n"
+        "    def run(self):\n"
+        "        return 1\n"
+        "\n"
+        "def helper():\n"
+        "    return 2\n"
+    )
+    edited = "import os\n\n" + code.replace("return 1", "return 3")
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir)
+        test_file = project_root / "test.py"
+        parser = PythonParser()
+        
+        test_file.write_text(code)
+        before = {s.name: s.content_hash for s in parser.parse_file(test_file, project_root).symbols}
+        test_file.write_text(edited)
+        after = {s.name: s.content_hash for s in parser.parse_file(test_file, project_root).symbols}
+        
+        assert all(before.values())
+        # Moved only
+        assert after["helper"] == before["helper"]
+        # Body changed: the method and its class
+        assert after["run"] != before["run"]
+        assert after["Engine"] != before["Engine"]
+
+
+def test_parse_references():
+    """Test collecting name and attribute references, function bodies included."""
+    code = (
+        "from .cache import CacheManager\n"
+        "\n"
+        "class Indexer(Base):\n"
+        "    def run(self, info):\n"
+        "        self.cache.save_file(info)\n"
+        "        result = helper(info).value\n"
+        "        return result\n"
+    )
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir)
+        test_file = project_root / "test.py"
+        test_file.write_text(code)
+        parser = PythonParser()
+        
+        assert parser.parse_file(test_file, project_root).refs is None
+        
+        refs = parser.parse_file(test_file, project_root, refs=True).refs
+        found = {(r.name, r.line, r.expression) for r in refs}
+        assert ("CacheManager", 1, ".cache.CacheManager") in found
+        assert ("Base", 3, "Base") in found
+        assert ("save_file", 5, "self.cache.save_file") in found
+        assert ("cache", 5, "self.cache") in found
+        assert ("value", 6, "(...).value") in found
+        assert ("helper", 6, "helper") in found
+        assert ("result", 7, "result") in found
+        # Receivers and assignment targets are not references
+        assert not any(r.name == "self" for r in refs)
+        assert ("result", 6, "result") not in found
+        assert all(r.file_path == "test.py" for r in refs)
+
+
 if __name__ == "__main__":
     # Run tests
     test_parse_simple_function()
@@ -233,5 +328,8 @@ if __name__ == "__main__":
     test_parse_imports()
     test_parse_inheritance()
     test_complex_type_annotations()
+    test_parse_preloaded_source()
+    test_symbol_hashes()
+    test_parse_references()
     
     print("✅ All tests passed!")
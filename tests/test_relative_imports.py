@@ -159,9 +159,45 @@ from typing import List, Dict
         assert len(relative_imports) == 2  # local_utils, parent_utils
 
 
+def test_absolute_suffix_resolution():
+    """Test partial absolute imports resolve through the suffix index."""
+    from ai_code_compass.models import FileInfo
+    
+    def make(path, imports=()):
+        return FileInfo(
+            path=path, language="python", hash="", size=0, symbols=[],
+            imports=[{'module': m, 'level': 0, 'type': 'import'} for m in imports]
+        )
+    
+    files = [
+        make("src/pkg/utils.py"),
+        make("lib/utils.py"),
+        make("src/pkg/core/models.py"),
+        make("app.py", ["utils", "pkg.core.models", "core.models", "os", "src.pkg.utils"]),
+        make("other.py", ["utils"]),
+    ]
+    
+    builder = DependencyBuilder(Path("/tmp"))
+    graph = builder.build(files)
+    
+    # "utils" is ambiguous: the shorter module (lib.utils) wins
+    assert builder.suffix_to_module["utils"] == "lib.utils"
+    assert graph.get_dependencies("app.py") == {
+        "lib/utils.py", "src/pkg/core/models.py", "src/pkg/utils.py"
+    }
+    assert graph.get_dependencies("other.py") == {"lib/utils.py"}
+    
+    # Partial segments never match
+    assert builder._resolve_import({'module': 'ils', 'level': 0}, "app.py") is None
+    
+    # Absolute imports are memoized independently of the importing file
+    assert ("utils", 0, "") in builder._resolved
+
+
 if __name__ == "__main__":
     # Run tests
     test_parse_relative_imports()
+    test_absolute_suffix_resolution()
     test_resolve_relative_imports()
     test_from_dot_import()
     test_mixed_imports()
@@ -0,0 +1,173 @@
+"""Tests for source file walker."""
+
+import tempfile
+from pathlib import Path
+
+from ai_code_compass.walker import FileWalker, compile_pattern
+
+
+def _touch(root: Path, rel_path: str, content: str = ""):
+    """Create a file (and its parent directories)."""
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def _walk(root: Path, config: dict = None) -> list[str]:
+    """Walk a tree and return sorted relative paths."""
+    walker = FileWalker(root, config=config)
+    return sorted(str(p.relative_to(root)) for p in walker)
+
+
+def test_prunes_default_directories():
+    """Test that VCS, virtualenv and cache directories are skipped."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        _touch(root, "app.py")
+        _touch(root, "pkg/core.py")
+        _touch(root, ".git/hooks/pre-commit.py")
+        _touch(root, ".venv/lib/site.py")
+        _touch(root, "node_modules/x/y.py")
+        _touch(root, "pkg/__pycache__/core.cpython-311.py")
+        _touch(root, "pkg/thing.egg-info/setup.py")
+        _touch(root, "myenv/pyvenv.cfg")
+        _touch(root, "myenv/lib/os.py")
+        _touch(root, "build/lib/pkg/core.py")
+        _touch(root, "dist/pkg/core.py")
+        _touch(root, "README.md")
+        
+        assert _walk(root) == ["app.py", "pkg/core.py"]
+        
+        # Build output names are only pruned at the root
+        _touch(root, "src/build/steps.py")
+        _touch(root, "pkg/dist/upload.py")
+        assert _walk(root) == ["app.py", "pkg/core.py", "pkg/dist/upload.py", "src/build/steps.py"]
+        
+        # Include patterns that spell out a pruned directory win
+        assert _walk(root, config={"include": ["src/build/**", "build/lib/"]}) == [
+            "build/lib/pkg/core.py", "src/build/steps.py"
+        ]
+
+
+def test_walk_is_lazy():
+    """Test that the walker is a generator, not a prebuilt list."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        _touch(root, "a.py")
+        _touch(root, "b.py")
+        
+        it = iter(FileWalker(root, config={}))
+        assert next(it).name == "a.py"
+        assert next(it).name == "b.py"
+
+
+def test_gitignore():
+    """Test root and nested .gitignore handling."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        _touch(root, ".gitignore", "# comment\n*_pb2.py\n/generated/\ndocs/**/conf.py\n!keep_pb2.py\n")
+        _touch(root, "main.py")
+        _touch(root, "api_pb2.py")
+        _touch(root, "keep_pb2.py")
+        _touch(root, "generated/models.py")
+        _touch(root, "src/generated/models.py")
+        _touch(root, "docs/source/conf.py")
+        _touch(root, "src/.gitignore", "local.py\n")
+        _touch(root, "src/local.py")
+        _touch(root, "local.py")
+        
+        assert _walk(root) == [
+            "keep_pb2.py",
+            "local.py",
+            "main.py",
+            "src/generated/models.py",
+        ]
+        
+        # Can be disabled from config
+        assert "api_pb2.py" in _walk(root, config={"gitignore": False})
+
+
+def test_pyproject_include_exclude():
+    """Test [tool.code-compass] include/exclude settings."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        _touch(root, "pyproject.toml", (
+            "[tool.code-compass]\n"
+            "include = [\"src\", \"manage.py\"]\n"
+            "exclude = [\"src/legacy/\", \"test_*.py\"]\n"
+        ))
+        _touch(root, "manage.py")
+        _touch(root, "setup.py")
+        _touch(root, "src/app/core.py")
+        _touch(root, "src/app/test_core.py")
+        _touch(root, "src/legacy/old.py")
+        
+        assert _walk(root) == ["manage.py", "src/app/core.py"]
+
+
+def test_partial_walks():
+    """Test subtree walks, directory listing and single-file checks."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        _touch(root, ".gitignore", "*_pb2.py\n")
+        _touch(root, "src/.gitignore", "gen/\n")
+        _touch(root, "src/app/core.py")
+        _touch(root, "src/app/api_pb2.py")
+        _touch(root, "src/gen/out.py")
+        _touch(root, "build/lib.py")
+        _touch(root, "top.py")
+        
+        walker = FileWalker(root, config={})
+        assert [p.relative_to(root).as_posix() for p in walker.walk(root / "src")] == ["src/app/core.py"]
+        assert list(walker.walk(root / "src" / "gen")) == []
+        assert list(walker.walk(root / "build")) == []
+        assert [p.relative_to(root).as_posix() for p in walker.walk(directories=True)] == [
+            ".", "src", "src/app"
+        ]
+        
+        # Same answers as a full walk, for existing and new files
+        assert walker.accepts(root / "src/app/core.py")
+        assert walker.accepts(root / "src/app/new.py")
+        assert not walker.accepts(root / "src/app/api_pb2.py")
+        assert not walker.accepts(root / "src/gen/out.py")
+        assert not walker.accepts(root / "build/lib.py")
+        assert not walker.accepts(root / "README.md")
+        assert not walker.accepts(root.parent / "elsewhere.py")
+
+
+def test_compile_pattern():
+    """Test .gitignore pattern semantics."""
+    rule = compile_pattern("*.py")
+    assert rule.matches("a.py", False)
+    assert rule.matches("x/y/a.py", False)
+    
+    rule = compile_pattern("/top.py")
+    assert rule.matches("top.py", False)
+    assert not rule.matches("sub/top.py", False)
+    
+    rule = compile_pattern("out/")
+    assert rule.matches("a/out", True)
+    assert not rule.matches("a/out", False)
+    
+    rule = compile_pattern("a/**/b.py")
+    assert rule.matches("a/b.py", False)
+    assert rule.matches("a/x/y/b.py", False)
+    
+    rule = compile_pattern("mod[0-9].py", base="pkg/")
+    assert rule.matches("pkg/mod1.py", False)
+    assert not rule.matches("mod1.py", False)
+    
+    assert compile_pattern("# comment") is None
+    assert compile_pattern("   ") is None
+
+
+if __name__ == "__main__":
+    # Run tests
+    test_prunes_default_directories()
+    test_walk_is_lazy()
+    test_gitignore()
+    test_pyproject_include_exclude()
+    test_partial_walks()
+    test_compile_pattern()
+    
+    print("✅ All walker tests passed!")
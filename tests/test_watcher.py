@@ -0,0 +1,144 @@
+"""Tests for filesystem watchers and path syncing."""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from ai_code_compass.map_generator import MapGenerator
+from ai_code_compass.walker import FileWalker
+from ai_code_compass.watcher import InotifyWatcher, PollingWatcher, Watcher
+
+
+def _collect(watcher, expected: set[str]) -> set[str]:
+    """Read batches until the expected paths were reported."""
+    changed = set()
+    for _ in range(20):
+        changed |= watcher.read_events(0.5)
+        if expected <= changed:
+            break
+    return changed
+
+
+def test_sync_paths():
+    """Test re-indexing and pruning only the given paths."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_root = Path(tmpdir) / "project"
+        (project_root / "pkg" / "sub").mkdir(parents=True)
+        (project_root / "pkg" / "core.py").write_text("def run():\n    pass\n")
+        (project_root / "pkg" / "app.py").write_text("import pkg.core\n")
+        (project_root / "pkg" / "sub" / "a.py").write_text("def a():\n    pass\n")
+        (project_root / "pkg" / "sub" / "b.py").write_text("def b():\n    pass\n")
+        
+        generator = MapGenerator(project_root, cache_dir=Path(tmpdir) / "cache")
+        generator.index()
+        assert ("pkg/app.py", "pkg/core.py") in generator.cache.get_edges()
+        
+        # Edited file: parsed, edges updated
+        (project_root / "pkg" / "app.py").write_text("def main():\n    pass\n")
+        stats = generator._sync_paths(["pkg/app.py"])
+        assert stats['total_files'] == 1
+        assert stats['parsed_files'] == 1
+        assert generator.cache.get_edges() == []
+        assert generator.find_symbols("main")
+        
+        # Deleted file and deleted directory: pruned
+        (project_root / "pkg" / "core.py").unlink()
+        shutil.rmtree(project_root / "pkg" / "sub")
+        stats = generator._sync_paths(["pkg/core.py", "pkg/sub"])
+        assert stats['pruned_files'] == 3
+        assert generator.cache.list_paths() == ["pkg/app.py"]
+        assert set(generator.get_importance()) == {"pkg/app.py"}
+        
+        # Whole-project resync picks up new files
+        (project_root / "new.py").write_text("def fresh():\n    pass\n")
+        stats = generator._sync_paths([""])
+        assert stats['parsed_files'] == 1
+        assert stats['cached_files'] == 1
+        
+        # Paths that were never indexed are ignored
+        assert generator._sync_paths(["missing.py", "README.md"])['pruned_files'] == 0
+        
+        generator.close()
+
+
+def test_inotify_watcher():
+    """Test inotify events for edits, new directories and deletions."""
+    if not sys.platform.startswith("linux"):
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "pkg").mkdir()
+        (root / "pkg" / "core.py").write_text("")
+        (root / ".git").mkdir()
+        
+        with InotifyWatcher(FileWalker(root)) as watcher:
+            (root / "pkg" / "core.py").write_text("x = 1\n")
+            (root / "notes.txt").write_text("ignored")
+            (root / ".git" / "hook.py").write_text("")
+            assert _collect(watcher, {"pkg/core.py"}) == {"pkg/core.py"}
+            
+            # New directory: reported as a whole, then watched
+            (root / "pkg" / "sub").mkdir()
+            (root / "pkg" / "sub" / "mod.py").write_text("")
+            assert "pkg/sub" in _collect(watcher, {"pkg/sub"})
+            (root / "pkg" / "sub" / "mod.py").write_text("y = 2\n")
+            assert "pkg/sub/mod.py" in _collect(watcher, {"pkg/sub/mod.py"})
+            
+            # Atomic save (write to temp file, rename over)
+            (root / "pkg" / "tmp123").write_text("z = 3\n")
+            os.replace(root / "pkg" / "tmp123", root / "pkg" / "core.py")
+            assert "pkg/core.py" in _collect(watcher, {"pkg/core.py"})
+            
+            (root / "pkg" / "core.py").unlink()
+            assert "pkg/core.py" in _collect(watcher, {"pkg/core.py"})
+            
+            # Config changes resync everything, with the new rules
+            (root / "pyproject.toml").write_text('[tool.code-compass]\nexclude = ["pkg/sub/"]\n')
+            assert "" in _collect(watcher, {""})
+            assert not watcher.walker.accepts(root / "pkg" / "sub" / "mod.py")
+            (root / ".gitignore").write_text("gen/\n")
+            assert "" in _collect(watcher, {""})
+
+
+def test_polling_watcher():
+    """Test stat polling reports added, modified and removed files."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "a.py").write_text("")
+        (root / "b.py").write_text("")
+        
+        watcher = PollingWatcher(FileWalker(root, config={}), interval=0.01)
+        assert watcher.read_events(0.01) == set()
+        
+        (root / "a.py").write_text("changed = True\n")
+        (root / "b.py").unlink()
+        (root / "c.py").write_text("")
+        assert watcher.read_events(0.01) == {"a.py", "b.py", "c.py"}
+        
+        # Batches group consecutive changes
+        (root / "d.py").write_text("")
+        assert next(watcher.batches(debounce=0.01)) == {"d.py"}
+        
+        # A new ignore rule resyncs everything, and the ignored file is gone
+        (root / ".gitignore").write_text("d.py\n")
+        assert watcher.read_events(0.01) == {""}
+        (root / "d.py").write_text("changed = True\n")
+        assert watcher.read_events(0.01) == set()
+        
+        # Watchers must implement read_events
+        try:
+            Watcher(FileWalker(root, config={}))
+            assert False, "Expected TypeError"
+        except TypeError:
+            pass
+
+
+if __name__ == "__main__":
+    # Run tests
+    test_sync_paths()
+    test_inotify_watcher()
+    test_polling_watcher()
+    
+    print("✅ All watcher tests passed!")